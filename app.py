@@ -12,7 +12,14 @@ load_dotenv()
 
 # Import from our modules
 from config import RESTAURANT_INFO
-from ml_utils import get_model_status
+from ml_utils import get_model_status, get_model_state, get_inference_metrics, forecast_demand
+from occupancy_ledger import start_ledger_loading, get_ledger_state
+from availability_heatmap import stream_heatmap_json, validate_heatmap_request, get_heatmap_metrics, opening_hours
+from datetime_utils import parse_reservation_date
+from sheets_manager import get_sheets_health, get_reservation_cache_metrics, get_append_queue_metrics, get_row_index_metrics, get_sync_metrics, get_quota_metrics
+import reservation_storage
+from reservation_storage import get_all_reservations
+from outbox import start_outbox, get_outbox_metrics
 
 # Import modularized handlers for different functionality areas
 from reservation_handlers import (
@@ -33,6 +40,12 @@ from info_handlers import (
     handle_restaurant_location
 )
 
+# Build the occupancy ledger from confirmed reservations without blocking startup
+start_ledger_loading(get_all_reservations)
+
+# Drain the durable outbox of reservation side effects (replaying whatever a previous process left pending)
+start_outbox()
+
 # Initialize Flask application with CORS support for cross-origin requests
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes to allow frontend integration
@@ -342,6 +355,85 @@ def ping():
     })
 
 
+@app.route('/ready')
+def ready():
+    """
+    Readiness endpoint - 503 while the ML model is still loading, 200 once loading has finished
+    A failed load (e.g. no model file) is reported in the body but still serves traffic on the fallback availability check
+    """
+    model_state = get_model_state()
+    status_code = 503 if model_state['state'] == 'loading' else 200
+    return jsonify({
+        'ready': status_code == 200,
+        'model': model_state,
+        'ledger': get_ledger_state(),
+        'timestamp': datetime.now().isoformat()
+    }), status_code
+
+
+@app.route('/metrics')
+def metrics():
+    """Runtime metrics for tuning (inference micro-batching, heatmap cache, Google Sheets connection, caches, append queue)"""
+    return jsonify({
+        'timestamp': datetime.now().isoformat(),
+        'model_version': get_model_state()['version'],
+        'storage_backend': reservation_storage.storage.name,
+        'inference_batcher': get_inference_metrics(),
+        'availability_heatmap': get_heatmap_metrics(),
+        'google_sheets': get_sheets_health(),
+        'reservation_cache': get_reservation_cache_metrics(),
+        'sheets_append_queue': get_append_queue_metrics(),
+        'sheets_row_index': get_row_index_metrics(),
+        'sheets_sync': get_sync_metrics(),
+        'sheets_quota': get_quota_metrics(),
+        'outbox': get_outbox_metrics()
+    })
+
+
+@app.route('/availability/heatmap')
+def availability_heatmap():
+    """Free-table counts for every opening hour of the next N days (?guests=4&days=7&start=YYYY-MM-DD)"""
+    try:
+        guest_count = int(request.args.get('guests', 2))
+        num_days = int(request.args.get('days', 7))
+    except (ValueError, TypeError):
+        return jsonify({'error': 'guests and days must be integers'}), 400
+    
+    start_date = parse_reservation_date(request.args['start']) if request.args.get('start') else datetime.now().date()
+    if start_date is None:
+        return jsonify({'error': 'start must be a date (YYYY-MM-DD)'}), 400
+    
+    error = validate_heatmap_request(guest_count, num_days)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    return Response(stream_heatmap_json(guest_count, start_date, num_days), mimetype='application/json')
+
+
+@app.route('/forecast/demand')
+def demand_forecast():
+    """Expected occupied tables per weekday and hour (?mix=2:0.5,4:0.3,8:0.2&all_hours=1)"""
+    try:
+        forecast = forecast_demand(request.args.get('mix') or None)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': f'invalid party mix: {e}'}), 400
+    
+    if forecast is None:
+        return jsonify({'error': 'ML model not loaded', 'model': get_model_state()['state']}), 503
+    
+    hours = list(range(24)) if request.args.get('all_hours') == '1' else list(opening_hours())
+    expected = forecast['expected_occupied'][:, hours]
+    return jsonify({
+        'model_version': forecast['model_version'],
+        'party_mix': {str(guests): round(weight, 4) for guests, weight in forecast['party_mix'].items()},
+        'tables': forecast['tables'],
+        'hours': hours,
+        'days': ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'],
+        'expected_occupied': [[round(float(value), 3) for value in row] for row in expected],
+        'occupancy_rate': [[round(float(value) / forecast['tables'], 4) for value in row] for row in expected]
+    })
+
+
 @app.route('/debug-ml')
 def debug_ml():
     """Endpoint for debugging ML model functionality"""
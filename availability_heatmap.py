@@ -0,0 +1,156 @@
+"""
+Availability heatmap - free-table counts for every opening hour of the next N days
+Computed in one vectorized pass over the availability engine, merged with confirmed bookings
+and cached per (party size, day); ledger changes invalidate the affected day
+"""
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from config import HEATMAP_MAX_DAYS, HEATMAP_CACHE_DAYS
+import ml_utils
+import occupancy_ledger
+import table_inventory
+from datetime_utils import check_restaurant_hours
+
+# date ISO string -> {guest_count: (engine tag, tuple of free-table counts per opening hour)}
+# Ordered by last use so the least recently used days are evicted first
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_generation = 0  # Bumped on every invalidation so results computed across a change are not cached
+
+heatmap_stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'computed_days': 0}
+_opening_hours = None
+
+
+def opening_hours():
+    """Hours the restaurant takes reservations (restaurant hours rule from datetime_utils)"""
+    global _opening_hours
+    if _opening_hours is None:
+        _opening_hours = tuple(hour for hour in range(24) if check_restaurant_hours(hour)[0])
+    return _opening_hours
+
+
+def _engine_tag():
+    """Identifies the predictions a cached row was computed from"""
+    return 'forced' if ml_utils.force_available else ml_utils.get_model_version()
+
+
+def invalidate_day(date_iso=None):
+    """Drop cached rows of one day (every day when date_iso is None) - registered as a ledger listener"""
+    global _generation
+    with _cache_lock:
+        _generation += 1
+        heatmap_stats['invalidations'] += 1
+        if date_iso is None:
+            _cache.clear()
+        else:
+            _cache.pop(date_iso, None)
+
+
+def _compute_rows(guest_count, dates):
+    """Free-table counts for each date x opening hour: one availability_matrix call, then ledger bookings"""
+    hours = opening_hours()
+    tables = np.array(table_inventory.tables_for_party(guest_count))
+    days = np.repeat([d.weekday() for d in dates], len(hours))
+    slot_hours = np.tile(hours, len(dates))
+
+    available = ml_utils.availability_matrix(tables, guest_count, days, slot_hours)
+    counts = available.sum(axis=0)
+
+    # Confirmed bookings on tables the engine considers free
+    table_index = {int(table): i for i, table in enumerate(tables)}
+    for slot, (day, hour) in enumerate((d, h) for d in dates for h in hours):
+        booked = occupancy_ledger.booked_tables(day.isoformat(), hour)
+        for table in booked:
+            i = table_index.get(table)
+            if i is not None and available[i, slot]:
+                counts[slot] -= 1
+
+    counts = counts.reshape(len(dates), len(hours))
+    return [tuple(int(count) for count in row) for row in counts]
+
+
+def _mask_past_hours(dates, rows, now):
+    """Zero the hours that can no longer be booked: every hour of past days, and today's hours before the current one"""
+    today, hours = now.date(), opening_hours()
+    for day in dates:
+        if day < today:
+            rows[day] = (0,) * len(hours)
+        elif day == today:
+            rows[day] = tuple(0 if hour < now.hour else count for hour, count in zip(hours, rows[day]))
+
+
+def get_heatmap(guest_count, start_date, num_days, now=None):
+    """
+    Returns (opening hours, [(date ISO, counts per opening hour), ...], model version) for num_days days from start_date
+    Cached days are served directly; the missing ones are computed together in one pass
+    Hours already past (relative to now) are reported as 0 free tables; the cache keeps the unmasked counts
+    """
+    tag = _engine_tag()
+    dates = [start_date + timedelta(days=offset) for offset in range(num_days)]
+    rows = {}
+
+    with _cache_lock:
+        generation = _generation
+        for day in dates:
+            entry = _cache.get(day.isoformat(), {}).get(guest_count)
+            if entry is not None and entry[0] == tag:
+                rows[day] = entry[1]
+                _cache.move_to_end(day.isoformat())
+        heatmap_stats['hits'] += len(rows)
+        heatmap_stats['misses'] += len(dates) - len(rows)
+
+    missing = [day for day in dates if day not in rows]
+    if missing:
+        computed = _compute_rows(guest_count, missing)
+        rows.update(zip(missing, computed))
+
+        with _cache_lock:
+            heatmap_stats['computed_days'] += len(missing)
+            # A booking changed while computing - serve the result but do not cache it
+            if generation == _generation:
+                for day, counts in zip(missing, computed):
+                    _cache.setdefault(day.isoformat(), {})[guest_count] = (tag, counts)
+                    _cache.move_to_end(day.isoformat())
+                while len(_cache) > HEATMAP_CACHE_DAYS:
+                    _cache.popitem(last=False)
+
+    _mask_past_hours(dates, rows, now or datetime.now())
+    return opening_hours(), [(day.isoformat(), rows[day]) for day in dates], tag
+
+
+def validate_heatmap_request(guest_count, num_days):
+    """Error message for an invalid heatmap request, or None"""
+    if not (1 <= guest_count <= table_inventory.max_party_size()):
+        return f"guests must be between 1 and {table_inventory.max_party_size()}"
+    if not (1 <= num_days <= HEATMAP_MAX_DAYS):
+        return f"days must be between 1 and {HEATMAP_MAX_DAYS}"
+    return None
+
+
+def stream_heatmap_json(guest_count, start_date, num_days):
+    """
+    Compact JSON, streamed one day at a time:
+    {"guests":4,"model_version":"...","hours":[9,...,21],"days":[["2026-10-16",3,5,...],...]}
+    Each day row is the date followed by the free-table count of every opening hour
+    """
+    hours, rows, version = get_heatmap(guest_count, start_date, num_days)
+    yield '{"guests":%d,"model_version":%s,"hours":%s,"days":[' % (
+        guest_count, json.dumps(version), json.dumps(list(hours), separators=(',', ':')))
+    for index, (day, counts) in enumerate(rows):
+        yield (',' if index else '') + json.dumps([day, *counts], separators=(',', ':'))
+    yield ']}'
+
+
+def get_heatmap_metrics():
+    """Cache metrics for the /metrics endpoint"""
+    with _cache_lock:
+        return dict(heatmap_stats, cached_days=len(_cache))
+
+
+# Confirmed booking changes invalidate the affected day
+occupancy_ledger.add_change_listener(invalidate_day)
@@ -0,0 +1,76 @@
+"""
+Benchmark: per-request availability latency with and without the precomputed grid
+
+Usage (from the repository root, with restaurant_model_client.pkl available):
+    python benchmarks/bench_availability_grid.py [iterations]
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ml_utils
+
+
+def time_calls(func, scenarios, iterations):
+    """Return per-call latencies in milliseconds (debug output is discarded)"""
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(iterations):
+            args = scenarios[i % len(scenarios)]
+            start = time.perf_counter()
+            func(*args)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def report(label, latencies):
+    """Print a one-line latency summary"""
+    print(f"  {label:<28} mean={latencies.mean():8.3f}ms  "
+          f"p50={np.percentile(latencies, 50):8.3f}ms  p99={np.percentile(latencies, 99):8.3f}ms")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    
+    if not ml_utils.wait_for_model():
+        print("❌ Model not loaded - place restaurant_model_client.pkl next to ml_utils.py")
+        return 1
+    
+    # Realistic request mix: party sizes, weekdays and opening hours
+    rng = np.random.default_rng(42)
+    find_scenarios = [(int(g), int(d), int(h)) for g, d, h in zip(
+        rng.integers(1, 9, 64), rng.integers(0, 7, 64), rng.integers(9, 22, 64))]
+    check_scenarios = [(int(rng.integers(1, 21)),) + s for s in find_scenarios]
+    
+    results = {}
+    for mode in ('model', 'grid'):
+        if mode == 'model':
+            ml_utils.invalidate_availability_grid()
+        else:
+            start = time.perf_counter()
+            ml_utils.build_availability_grid()
+            print(f"Grid build time: {(time.perf_counter() - start) * 1000:.1f}ms")
+        
+        results[mode] = {
+            'find_available_table': time_calls(ml_utils.find_available_table, find_scenarios, iterations),
+            'check_table_availability': time_calls(ml_utils.check_table_availability, check_scenarios, iterations),
+        }
+    
+    for name in ('find_available_table', 'check_table_availability'):
+        print(f"\n{name} ({iterations} calls)")
+        report('model inference', results['model'][name])
+        report('grid lookup', results['grid'][name])
+        speedup = np.median(results['model'][name]) / np.median(results['grid'][name])
+        print(f"  p50 speedup: {speedup:.1f}x")
+    
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""
+Benchmark suite for the availability hot path
+
+Covers the ML model (precomputed grid and direct inference), the rule-based fallback and the
+batched paths. Reports ops/sec, p50/p99 latency and memory allocated per call, and writes
+machine-readable JSON that can be diffed between releases.
+
+When restaurant_model_client.pkl is not available, a synthetic RandomForest trained on the same
+four features (table_number, guest_count, day_of_week, hour_of_day) is used instead.
+
+Usage (from the repository root):
+    python benchmarks/bench_suite.py [--iterations 500] [--json results.json] [--compare baseline.json]
+    python benchmarks/bench_suite.py --synthetic      # always use the synthetic model
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+MODEL_FILENAME = 'restaurant_model_client.pkl'
+
+
+def train_synthetic_model(directory, seed=0, rows=20000):
+    """Train a RandomForest on synthetic bookings with the production feature layout and save it"""
+    import joblib
+    from sklearn.ensemble import RandomForestClassifier
+
+    rng = np.random.default_rng(seed)
+    features = np.column_stack([
+        rng.integers(1, 21, rows),   # table_number
+        rng.integers(1, 21, rows),   # guest_count
+        rng.integers(0, 7, rows),    # day_of_week
+        rng.integers(0, 24, rows)    # hour_of_day
+    ])
+    # Busier on weekends and at lunch/dinner peaks, like the fallback rules
+    occupied_probability = (0.3 + 0.3 * (features[:, 2] >= 5)
+                            + 0.2 * np.isin(features[:, 3], [12, 13, 19, 20]) - 0.01 * features[:, 0])
+    reserved = (rng.random(rows) < occupied_probability).astype(int)
+
+    model = RandomForestClassifier(n_estimators=50, max_depth=12, random_state=seed).fit(features, reserved)
+    path = os.path.join(directory, MODEL_FILENAME)
+    joblib.dump(model, path)
+    return path
+
+
+def real_model_available():
+    """True when the production model file is where ml_utils looks for it"""
+    return any(os.path.exists(path) for path in (
+        MODEL_FILENAME,
+        os.path.join(REPO_ROOT, MODEL_FILENAME),
+        os.path.join('models', MODEL_FILENAME)
+    ))
+
+
+def measure(func, scenarios, iterations, warmup=20):
+    """Run func over the scenarios; returns latency and allocation statistics (debug output discarded)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(warmup):
+            func(*scenarios[i % len(scenarios)])
+
+        # Timing pass (no tracing overhead)
+        latencies = np.empty(iterations)
+        total_start = time.perf_counter()
+        for i in range(iterations):
+            args = scenarios[i % len(scenarios)]
+            start = time.perf_counter()
+            func(*args)
+            latencies[i] = time.perf_counter() - start
+        total = time.perf_counter() - total_start
+
+        # Allocation pass: peak traced memory of each call, and memory still held afterwards
+        allocation_calls = min(iterations, 200)
+        peaks = np.empty(allocation_calls)
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        for i in range(allocation_calls):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            func(*scenarios[i % len(scenarios)])
+            peaks[i] = tracemalloc.get_traced_memory()[1] - before
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+
+    latencies *= 1000
+    return {
+        'iterations': iterations,
+        'ops_per_sec': round(iterations / total, 1),
+        'mean_ms': round(float(latencies.mean()), 4),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 4),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 4),
+        'alloc_peak_bytes_per_call': int(np.median(peaks)),
+        'alloc_retained_bytes_per_call': round(retained / allocation_calls, 1)
+    }
+
+
+@contextlib.contextmanager
+def engine_mode(ml_utils, mode):
+    """Put the availability engine in 'grid', 'model' (direct inference) or 'fallback' mode"""
+    engine = ml_utils.active_engine
+    if mode == 'rules':
+        yield
+    elif mode == 'grid':
+        if engine['grid'] is None:
+            ml_utils.build_availability_grid()
+        yield
+    elif mode == 'model':
+        ml_utils.invalidate_availability_grid()
+        try:
+            yield
+        finally:
+            ml_utils.build_availability_grid()
+    else:
+        # No engine: every call takes the rule-based path
+        ml_utils.active_engine = None
+        try:
+            yield
+        finally:
+            ml_utils.active_engine = engine
+
+
+def build_scenarios(seed, table_count, max_guests):
+    """Deterministic realistic request mix: party sizes, weekdays and opening hours"""
+    rng = np.random.default_rng(seed)
+    parties = rng.integers(1, min(9, max_guests) + 1, 64)
+    days = rng.integers(0, 7, 64)
+    hours = rng.integers(9, 22, 64)
+    tables = rng.integers(1, table_count + 1, 64)
+
+    upcoming = datetime.now().date() + timedelta(days=7)
+    return {
+        'find': [(int(g), int(d), int(h)) for g, d, h in zip(parties, days, hours)],
+        'check': [(int(t), int(g), int(d), int(h)) for t, g, d, h in zip(tables, parties, days, hours)],
+        'slots': [(int(g), (upcoming + timedelta(days=int(d))).isoformat(), int(h)) for g, d, h in zip(parties, days, hours)]
+    }
+
+
+def run_suite(ml_utils, iterations, seed):
+    """Run every benchmark case; returns a list of result dicts"""
+    import table_inventory
+
+    scenarios = build_scenarios(seed, table_inventory.max_table_number(), table_inventory.max_party_size())
+    all_tables = list(table_inventory.table_numbers())
+    batch_scenarios = [(all_tables, g, d, h) for g, d, h in scenarios['find']]
+
+    cases = [
+        ('check_table_availability', ('grid', 'model', 'fallback'), ml_utils.check_table_availability, scenarios['check']),
+        ('find_available_table', ('grid', 'model', 'fallback'), ml_utils.find_available_table, scenarios['find']),
+        ('check_tables_availability', ('grid', 'model'), ml_utils.check_tables_availability, batch_scenarios),
+        ('find_next_available_slots', ('grid', 'model'), ml_utils.find_next_available_slots, scenarios['slots']),
+        ('fallback_availability_check', ('rules',), ml_utils.fallback_availability_check, scenarios['check'])
+    ]
+
+    results = []
+    for name, modes, func, case_scenarios in cases:
+        for mode in modes:
+            with contextlib.redirect_stdout(io.StringIO()), engine_mode(ml_utils, mode):
+                stats = measure(func, case_scenarios, iterations)
+            results.append(dict(name=name, mode=mode, **stats))
+            print(f"  {name:<28} {mode:<9} {stats['ops_per_sec']:>10.1f} ops/s  "
+                  f"p50={stats['p50_ms']:8.3f}ms  p99={stats['p99_ms']:8.3f}ms  "
+                  f"peak={stats['alloc_peak_bytes_per_call']:>8d}B/call")
+    return results
+
+
+def compare(results, baseline_path):
+    """Print the p50 change of every case against a previous JSON run"""
+    with open(baseline_path) as f:
+        baseline = {(r['name'], r['mode']): r for r in json.load(f)['results']}
+
+    print(f"\nComparison with {baseline_path} (p50, lower is better)")
+    for result in results:
+        previous = baseline.get((result['name'], result['mode']))
+        if previous is None:
+            print(f"  {result['name']:<28} {result['mode']:<9} (new)")
+            continue
+        ratio = result['p50_ms'] / previous['p50_ms'] if previous['p50_ms'] else float('inf')
+        print(f"  {result['name']:<28} {result['mode']:<9} {previous['p50_ms']:8.3f}ms -> "
+              f"{result['p50_ms']:8.3f}ms  ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Availability hot path benchmark suite')
+    parser.add_argument('--iterations', type=int, default=500, help='timed calls per case')
+    parser.add_argument('--seed', type=int, default=42, help='seed for the request mix and the synthetic model')
+    parser.add_argument('--synthetic', action='store_true', help='use the synthetic model even if the real one exists')
+    parser.add_argument('--json', help="write results to this file ('-' for stdout)")
+    parser.add_argument('--compare', help='previous JSON results to compare against')
+    args = parser.parse_args()
+
+    # Output paths are resolved before a possible chdir into the synthetic model directory
+    json_path = os.path.abspath(args.json) if args.json and args.json != '-' else args.json
+    compare_path = os.path.abspath(args.compare) if args.compare else None
+
+    synthetic = args.synthetic or not real_model_available()
+    workdir = None
+    if synthetic:
+        # ml_utils looks in the working directory first, so the synthetic model (and its caches) live there
+        workdir = tempfile.TemporaryDirectory(prefix='bench-model-')
+        train_synthetic_model(workdir.name, seed=args.seed)
+        os.chdir(workdir.name)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import ml_utils
+        loaded = ml_utils.wait_for_model()
+    if not loaded:
+        print(f"❌ Model failed to load: {ml_utils.get_model_state()['error']}")
+        return 1
+
+    state = ml_utils.get_model_state()
+    print(f"Availability benchmark - {'synthetic' if synthetic else 'production'} model {state['version']}, "
+          f"{args.iterations} calls per case\n")
+    results = run_suite(ml_utils, args.iterations, args.seed)
+
+    import sklearn
+    from config import ML_COMPILED_FOREST, ML_MICROBATCH
+    output = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'sklearn': sklearn.__version__,
+            'platform': platform.platform(),
+            'model': 'synthetic' if synthetic else 'production',
+            'model_version': state['version'],
+            'compiled_forest': state['compiled_forest'],
+            'config': {'ML_COMPILED_FOREST': ML_COMPILED_FOREST, 'ML_MICROBATCH': ML_MICROBATCH},
+            'iterations': args.iterations,
+            'seed': args.seed
+        },
+        'results': results
+    }
+
+    if workdir is not None:
+        os.chdir(REPO_ROOT)
+        workdir.cleanup()
+
+    if compare_path:
+        compare(results, compare_path)
+    if json_path == '-':
+        print(json.dumps(output, indent=2))
+    elif json_path:
+        with open(json_path, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f"\n✅ Results written to {json_path}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""
+In-memory stand-in for the gspread worksheet used by sheets_manager
+
+Implements the worksheet methods sheets_manager calls (get_all_records, get_all_values, row_values,
+batch_get, append_row, append_rows, update_cell, batch_update, delete_rows) over a list of rows,
+with configurable per-call latency and injected API errors, so the webhook can be load-tested
+without touching Google Sheets.
+
+Usage:
+    from fake_sheets import FakeWorksheet, install
+    sheet = FakeWorksheet(rows, latency_ms=80, error_rate=0.01)
+    install(sheet)   # every sheets_manager call now goes to the fake worksheet
+"""
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from gspread.exceptions import APIError
+from gspread.utils import a1_range_to_grid_range, a1_to_rowcol, numericise_all
+
+HEADER = ['Timestamp', 'Name', 'Phone', 'Email', 'Guests', 'Date', 'Time', 'Table', 'Status']
+
+# Methods that count against the write quota (latency can be configured separately)
+WRITE_METHODS = ('append_row', 'append_rows', 'update_cell', 'batch_update', 'delete_rows')
+
+
+class FakeResponse:
+    """Minimal requests.Response for gspread.exceptions.APIError"""
+
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.text = f'Injected error {status_code}'
+
+    def json(self):
+        return {'error': {'code': self.status_code, 'message': self.text, 'status': 'INJECTED'}}
+
+
+class FakeCredentials:
+    """Credentials that never expire, so sheets_manager never tries to refresh a token"""
+    expiry = datetime.utcnow() + timedelta(days=3650)
+    valid = True
+
+    def refresh(self, request):
+        pass
+
+
+class FakeWorksheet:
+    """
+    Thread-safe in-memory worksheet
+    latency_ms/jitter_ms delay every call (write_latency_ms overrides the latency of writes);
+    error_rate is the probability that a call fails with an APIError of error_status (e.g. 429, 500)
+    """
+
+    def __init__(self, rows=None, latency_ms=0.0, write_latency_ms=None, jitter_ms=0.0,
+                 error_rate=0.0, error_status=429, seed=0, title='Sheet1'):
+        self.title = title
+        self.rows = [list(HEADER)] if rows is None else [[str(cell) for cell in row] for row in rows]
+        self.latency_ms = latency_ms
+        self.write_latency_ms = latency_ms if write_latency_ms is None else write_latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.calls = {}
+        self.errors = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _call(self, method):
+        """Count the call, sleep the configured latency and raise an injected error if drawn"""
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+            failed = self.error_rate > 0 and self._random.random() < self.error_rate
+            if failed:
+                self.errors[method] = self.errors.get(method, 0) + 1
+        latency = self.write_latency_ms if method in WRITE_METHODS else self.latency_ms
+        delay = max(0.0, latency + jitter) / 1000.0
+        if delay:
+            time.sleep(delay)
+        if failed:
+            raise APIError(FakeResponse(self.error_status))
+
+    # Reads
+
+    def get_all_values(self, range_name=None):
+        self._call('get_all_values')
+        with self._lock:
+            rows = self._range(range_name) if range_name else self.rows
+            return [list(row) for row in rows]
+
+    def get_all_records(self):
+        self._call('get_all_records')
+        with self._lock:
+            header, rows = self.rows[0], [list(row) for row in self.rows[1:]]
+        return [dict(zip(header, numericise_all(row + [''] * (len(header) - len(row))))) for row in rows]
+
+    def row_values(self, row):
+        self._call('row_values')
+        with self._lock:
+            return list(self.rows[row - 1]) if 0 < row <= len(self.rows) else []
+
+    def batch_get(self, ranges):
+        self._call('batch_get')
+        with self._lock:
+            return [[list(row) for row in self._range(range_name)] for range_name in ranges]
+
+    def _range(self, range_name):
+        """Rows of an A1 range such as 'A5:I' or 'A1:I200' (lock must be held)"""
+        grid = a1_range_to_grid_range(range_name.split('!')[-1])
+        start = grid.get('startRowIndex', 0)
+        end = grid.get('endRowIndex', len(self.rows))
+        first_column = grid.get('startColumnIndex', 0)
+        last_column = grid.get('endColumnIndex')
+        return [row[first_column:last_column] for row in self.rows[start:end]]
+
+    # Writes
+
+    def append_row(self, values, **kwargs):
+        self._call('append_row')
+        return self._append([values])
+
+    def append_rows(self, values, **kwargs):
+        self._call('append_rows')
+        return self._append(values)
+
+    def _append(self, values):
+        with self._lock:
+            first_row = len(self.rows) + 1
+            self.rows.extend([str(cell) for cell in row] for row in values)
+            last_row = len(self.rows)
+        return {'updates': {'updatedRange': f"{self.title}!A{first_row}:I{last_row}", 'updatedRows': len(values)}}
+
+    def update_cell(self, row, col, value):
+        self._call('update_cell')
+        with self._lock:
+            self._set(row, col, value)
+
+    def batch_update(self, data, raw=True, **kwargs):
+        self._call('batch_update')
+        with self._lock:
+            for update in data:
+                row, col = a1_to_rowcol(update['range'].split('!')[-1])
+                self._set(row, col, update['values'][0][0])
+
+    def _set(self, row, col, value):
+        while len(self.rows) < row:
+            self.rows.append([''] * len(HEADER))
+        cells = self.rows[row - 1]
+        cells.extend([''] * (col - len(cells)))
+        cells[col - 1] = str(value)
+
+    def delete_rows(self, start_index, end_index=None):
+        self._call('delete_rows')
+        with self._lock:
+            del self.rows[start_index - 1:(end_index or start_index)]
+
+    def get_stats(self):
+        """Calls and injected errors per method"""
+        with self._lock:
+            return {'rows': len(self.rows), 'calls': dict(self.calls), 'errors': dict(self.errors)}
+
+
+def install(worksheet):
+    """Route every sheets_manager call to worksheet (drops any existing Google Sheets handle)"""
+    import sheets_manager
+
+    sheets_manager._connect_google_sheets = lambda: (worksheet, FakeCredentials())
+    sheets_manager.invalidate_google_sheets('fake worksheet installed')
+    sheets_manager._next_connect_attempt = 0.0
+
+    # Forget everything read from a previous worksheet
+    with sheets_manager._row_write_lock:
+        sheets_manager._mirror.update(rows=None, checksums=[], synced_at=None)
+        sheets_manager._row_index = None
+    sheets_manager.invalidate_reservation_cache()
+    return worksheet
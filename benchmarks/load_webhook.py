@@ -0,0 +1,379 @@
+"""
+End-to-end load harness for /dialogflow-webhook
+
+Replays a realistic mix of Dialogflow fulfillment payloads (bookings, lookups, modifications,
+cancellations, table checks and info intents) against the Flask app with a pool of concurrent
+clients, and reports throughput and p50/p95/p99 latency per intent.
+
+Google Sheets is replaced by the in-memory FakeWorksheet (benchmarks/fake_sheets.py), seeded with
+synthetic reservations, with configurable per-call latency and injected API errors. Outbox and
+SQLite files go to a temporary directory. With --url the payloads are sent over HTTP to a running
+server instead (its own storage is used).
+
+Usage (from the repository root):
+    python benchmarks/load_webhook.py [--requests 2000] [--concurrency 16] [--sheet-latency-ms 80]
+    python benchmarks/load_webhook.py --error-rate 0.02 --error-status 429 --json load.json
+    python benchmarks/load_webhook.py --url http://localhost:5000/dialogflow-webhook
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+# Default intent mix (weights), roughly what the production agent sees
+INTENT_MIX = {
+    'check.my.reservation': 25,
+    'make.reservation': 20,
+    'check.table.specific': 15,
+    'opening.hours': 8,
+    'show.menu': 8,
+    'restaurant.info': 4,
+    'modify.reservation.time': 6,
+    'modify.reservation.date': 4,
+    'modify.reservation.guests': 4,
+    'cancel.reservation': 6
+}
+
+FIRST_NAMES = ['Nimal', 'Kasun', 'Amaya', 'Dilani', 'Ruwan', 'Sara', 'Marco', 'Giulia', 'Ravi', 'Anna']
+
+
+def parse_intent_mix(text):
+    """'make.reservation:20,check.my.reservation:30' -> {intent: weight}"""
+    mix = {}
+    for item in text.split(','):
+        intent, _, weight = item.partition(':')
+        mix[intent.strip()] = float(weight or 1)
+    return mix
+
+
+def dialogflow_payload(intent, parameters, query_text, language_code='en'):
+    """Dialogflow ES v2 fulfillment request"""
+    session = uuid.uuid4().hex
+    return {
+        'responseId': str(uuid.uuid4()),
+        'session': f'projects/restaurant-agent/agent/sessions/{session}',
+        'queryResult': {
+            'queryText': query_text,
+            'parameters': parameters,
+            'allRequiredParamsPresent': True,
+            'intent': {'name': f'projects/restaurant-agent/agent/intents/{uuid.uuid5(uuid.NAMESPACE_DNS, intent)}',
+                       'displayName': intent},
+            'intentDetectionConfidence': 1,
+            'languageCode': language_code
+        }
+    }
+
+
+class PayloadGenerator:
+    """Deterministic stream of webhook payloads over a pool of known guests"""
+
+    def __init__(self, guests, intent_mix, seed, table_count, max_party):
+        self.guests = guests  # [(name, phone, email)] with existing reservations
+        self.intents = list(intent_mix)
+        weights = np.array([intent_mix[intent] for intent in self.intents], dtype=float)
+        self.weights = weights / weights.sum()
+        self.rng = np.random.default_rng(seed)
+        self.table_count = table_count
+        self.max_party = min(max_party, 10)
+        self.today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def _date(self):
+        return (self.today + timedelta(days=int(self.rng.integers(1, 30)))).strftime('%Y-%m-%dT12:00:00+05:30')
+
+    def _time(self):
+        return self.today.replace(hour=int(self.rng.integers(10, 21))).strftime('%Y-%m-%dT%H:00:00+05:30')
+
+    def next(self):
+        """(intent, payload) for the next request"""
+        with self._lock:
+            intent = self.intents[int(self.rng.choice(len(self.intents), p=self.weights))]
+            name, phone, email = self.guests[int(self.rng.integers(len(self.guests)))]
+            self._counter += 1
+
+            if intent == 'make.reservation':
+                # Mostly new guests, so bookings do not collide with the duplicate check
+                name = f'{FIRST_NAMES[self._counter % len(FIRST_NAMES)]} Load{self._counter}'
+                phone = f'07{self._counter % 100000000:08d}'
+                parameters = {'name': name, 'phone_number': phone, 'email': f'load{self._counter}@example.com',
+                              'guest_count': int(self.rng.integers(1, self.max_party + 1)),
+                              'date': self._date(), 'time': self._time()}
+                text = f'Book a table for {parameters["guest_count"]}'
+            elif intent == 'check.table.specific':
+                parameters = {'table_number': int(self.rng.integers(1, self.table_count + 1)),
+                              'date': self._date(), 'time': self._time()}
+                text = f'Is table {parameters["table_number"]} free?'
+            elif intent == 'modify.reservation.time':
+                parameters = {'phone_number': phone, 'new_time': self._time()}
+                text = 'Change my reservation time'
+            elif intent == 'modify.reservation.date':
+                parameters = {'phone_number': phone, 'new_date': self._date()}
+                text = 'Move my reservation to another day'
+            elif intent == 'modify.reservation.guests':
+                parameters = {'phone_number': phone, 'new_guests': int(self.rng.integers(1, self.max_party + 1))}
+                text = 'Change the number of guests'
+            elif intent in ('check.my.reservation', 'cancel.reservation'):
+                parameters = {'phone_number': phone}
+                text = 'Check my reservation' if intent == 'check.my.reservation' else 'Cancel my reservation'
+            else:
+                parameters = {}
+                text = intent.replace('.', ' ')
+
+            return intent, dialogflow_payload(intent, parameters, text)
+
+
+def seed_reservations(count, seed, table_count):
+    """Synthetic sheet rows (header first) and the guests they belong to"""
+    from datetime_utils import format_date_readable, format_time_readable
+    from fake_sheets import HEADER
+
+    rng = np.random.default_rng(seed)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    rows, guests = [list(HEADER)], []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(count):
+            name = f'{FIRST_NAMES[i % len(FIRST_NAMES)]} Guest{i}'
+            phone = f'077{i:07d}'
+            email = f'guest{i}@example.com'
+            day = today + timedelta(days=int(rng.integers(-60, 30)))  # History plus upcoming bookings
+            hour = int(rng.integers(10, 21))
+            status = 'Confirmed' if rng.random() < 0.85 else 'Cancelled'
+            rows.append([
+                (day - timedelta(days=3)).strftime('%Y-%m-%d %H:%M:%S'), name, phone, email,
+                str(int(rng.integers(1, 7))), format_date_readable(day.strftime('%Y-%m-%d')),
+                format_time_readable(f'{hour:02d}:00'), str(int(rng.integers(1, table_count + 1))), status
+            ])
+            guests.append((name, phone, email))
+    return rows, guests
+
+
+def make_sender(url):
+    """Function sending one payload; returns (status code, response JSON or None)"""
+    if url:
+        import requests
+        session = requests.Session()
+
+        def send(payload):
+            response = session.post(url, json=payload, timeout=30)
+            try:
+                return response.status_code, response.json()
+            except ValueError:
+                return response.status_code, None
+        return send
+
+    from app import app
+    app.testing = True
+    local = threading.local()
+
+    def send(payload):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        response = local.client.post('/dialogflow-webhook', json=payload)
+        return response.status_code, response.get_json(silent=True)
+    return send
+
+
+def run_load(send, generator, total_requests, concurrency, duration):
+    """Replay payloads from concurrency clients; returns {intent: {'latencies': [...], 'errors': n}}"""
+    results = {}
+    results_lock = threading.Lock()
+    issued = [0]
+    deadline = time.perf_counter() + duration if duration else None
+
+    def client():
+        while True:
+            with results_lock:
+                if issued[0] >= total_requests or (deadline and time.perf_counter() >= deadline):
+                    return
+                issued[0] += 1
+            intent, payload = generator.next()
+            started = time.perf_counter()
+            try:
+                status, body = send(payload)
+                failed = status != 200 or not body or 'fulfillmentText' not in body
+            except Exception:
+                failed = True
+            latency = (time.perf_counter() - started) * 1000
+            with results_lock:
+                entry = results.setdefault(intent, {'latencies': [], 'errors': 0})
+                entry['latencies'].append(latency)
+                entry['errors'] += failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(client) for _ in range(concurrency)]:
+            future.result()
+    return results, time.perf_counter() - started
+
+
+def summarize(results, elapsed):
+    """Per-intent and overall throughput / latency rows"""
+    def row(name, latencies, errors):
+        latencies = np.array(latencies)
+        return {
+            'intent': name,
+            'requests': int(latencies.size),
+            'errors': int(errors),
+            'throughput_rps': round(latencies.size / elapsed, 1),
+            'mean_ms': round(float(latencies.mean()), 2),
+            'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+            'p95_ms': round(float(np.percentile(latencies, 95)), 2),
+            'p99_ms': round(float(np.percentile(latencies, 99)), 2),
+            'max_ms': round(float(latencies.max()), 2)
+        }
+
+    rows = [row(intent, entry['latencies'], entry['errors']) for intent, entry in sorted(results.items())]
+    all_latencies = [latency for entry in results.values() for latency in entry['latencies']]
+    total = row('ALL', all_latencies, sum(entry['errors'] for entry in results.values())) if all_latencies else None
+    return rows, total
+
+
+def wait_until(predicate, timeout, interval=0.05):
+    """Poll predicate() until it is true or timeout seconds pass; returns the seconds waited"""
+    started = time.perf_counter()
+    while not predicate() and time.perf_counter() - started < timeout:
+        time.sleep(interval)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load harness for the Dialogflow webhook')
+    parser.add_argument('--requests', type=int, default=1000, help='total requests to send')
+    parser.add_argument('--duration', type=float, help='stop after this many seconds instead')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--seed', type=int, default=42, help='seed for the payload stream and the seeded sheet')
+    parser.add_argument('--mix', help="intent weights, e.g. 'make.reservation:20,check.my.reservation:30'")
+    parser.add_argument('--reservations', type=int, default=2000, help='reservations seeded in the fake sheet')
+    parser.add_argument('--sheet-latency-ms', type=float, default=80.0, help='fake worksheet latency per read call')
+    parser.add_argument('--sheet-write-latency-ms', type=float, help='fake worksheet latency per write call')
+    parser.add_argument('--sheet-jitter-ms', type=float, default=20.0, help='uniform jitter added to the latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='probability that a sheet call fails')
+    parser.add_argument('--error-status', type=int, default=429, help='HTTP status of injected sheet errors')
+    parser.add_argument('--sheets-per-minute', type=float,
+                        help='override the client-side Sheets quota (reads and writes per minute)')
+    parser.add_argument('--synthetic', action='store_true', help='use the synthetic model even if the real one exists')
+    parser.add_argument('--url', help='send to a running server instead of the in-process app')
+    parser.add_argument('--verbose', action='store_true', help='keep the application log output')
+    parser.add_argument('--json', help="write results to this file ('-' for stdout)")
+    args = parser.parse_args()
+
+    json_path = os.path.abspath(args.json) if args.json and args.json != '-' else args.json
+    intent_mix = parse_intent_mix(args.mix) if args.mix else INTENT_MIX
+
+    workdir = tempfile.TemporaryDirectory(prefix='load-webhook-')
+    if not args.url:
+        # Keep the outbox journal and SQLite files out of the working tree (read by config on import)
+        os.environ.setdefault('OUTBOX_DB_PATH', os.path.join(workdir.name, 'outbox.db'))
+        os.environ.setdefault('RESERVATION_DB_PATH', os.path.join(workdir.name, 'reservations.db'))
+
+    sheet = None
+    drain_seconds = None
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        import table_inventory
+        table_count = table_inventory.max_table_number()
+        rows, guests = seed_reservations(args.reservations, args.seed, table_count)
+
+        if not args.url:
+            from bench_suite import real_model_available, train_synthetic_model
+            if args.synthetic or not real_model_available():
+                # ml_utils looks in the working directory first, so the synthetic model (and its caches) live there
+                train_synthetic_model(workdir.name, seed=args.seed)
+                os.chdir(workdir.name)
+
+            from fake_sheets import FakeWorksheet, install
+            sheet = install(FakeWorksheet(
+                rows, latency_ms=args.sheet_latency_ms, write_latency_ms=args.sheet_write_latency_ms,
+                jitter_ms=args.sheet_jitter_ms, error_rate=args.error_rate, error_status=args.error_status,
+                seed=args.seed))
+
+            import sheets_manager
+            if args.sheets_per_minute:
+                for name in sheets_manager.quota_buckets:
+                    sheets_manager.quota_buckets[name] = sheets_manager.QuotaBucket(
+                        name, args.sheets_per_minute, sheets_manager.SHEETS_QUOTA_BURST)
+
+        send = make_sender(args.url)
+        if not args.url:
+            import ml_utils
+            from occupancy_ledger import ledger_state
+            ml_utils.wait_for_model()
+            wait_until(lambda: ledger_state['loaded'] or ledger_state['error'], timeout=60)
+
+        generator = PayloadGenerator(guests, intent_mix, args.seed, table_count, table_inventory.max_party_size())
+        total_requests = args.requests if not args.duration else sys.maxsize
+        results, elapsed = run_load(send, generator, total_requests, args.concurrency, args.duration)
+
+        if not args.url:
+            # Background writes confirmed during the run still have to reach the sheet
+            from outbox import get_outbox_metrics
+            drain_seconds = wait_until(lambda: get_outbox_metrics()['pending'] == 0, timeout=120)
+
+    rows_out, total = summarize(results, elapsed)
+    target = args.url or 'in-process app + fake worksheet'
+    print(f"Webhook load test - {target}, {args.concurrency} clients, {elapsed:.1f}s\n")
+    print(f"  {'intent':<28} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for row in rows_out + ([total] if total else []):
+        print(f"  {row['intent']:<28} {row['requests']:>8} {row['errors']:>6} {row['throughput_rps']:>8.1f} "
+              f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['max_ms']:>9.2f}")
+    if sheet is not None:
+        print(f"\n  Outbox drained {drain_seconds:.1f}s after the last response")
+        print(f"  Fake worksheet: {sheet.get_stats()}")
+
+    output = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'target': target,
+            'requests': sum(row['requests'] for row in rows_out),
+            'concurrency': args.concurrency,
+            'elapsed_s': round(elapsed, 3),
+            'outbox_drain_s': round(drain_seconds, 3) if drain_seconds is not None else None,
+            'seed': args.seed,
+            'intent_mix': intent_mix,
+            'sheet': None if args.url else {
+                'reservations': args.reservations,
+                'latency_ms': args.sheet_latency_ms,
+                'write_latency_ms': args.sheet_write_latency_ms,
+                'jitter_ms': args.sheet_jitter_ms,
+                'error_rate': args.error_rate,
+                'error_status': args.error_status,
+                'stats': sheet.get_stats() if sheet is not None else None
+            }
+        },
+        'results': rows_out,
+        'total': total
+    }
+
+    os.chdir(REPO_ROOT)
+    workdir.cleanup()
+
+    if json_path == '-':
+        print(json.dumps(output, indent=2))
+    elif json_path:
+        with open(json_path, 'w') as f:
+            json.dump(output, f, indent=2)
+        print(f"\n✅ Results written to {json_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,7 @@
 """
 Configuration and constants for the restaurant application
 """
+import os
 
 # Google Sheets API Configuration
 # These scopes define what permissions the application needs to access Google services
@@ -14,6 +15,83 @@ SCOPES = [
 # Format: https://docs.google.com/spreadsheets/d/{SHEET_ID}/edit
 SHEET_ID = "1CyXLrD9qltqODWzPI3Nx8bLec29dtm_thqBGf_bi35I"
 
+# Reservation storage backend: 'sheets' (Google Sheets) or 'sqlite' (local database at RESERVATION_DB_PATH)
+RESERVATION_STORAGE = os.environ.get('RESERVATION_STORAGE', 'sheets')
+RESERVATION_DB_PATH = os.environ.get('RESERVATION_DB_PATH', 'reservations.db')
+
+# Phone numbers are stored and matched in E.164 form; numbers without a country code get this one (Sri Lanka)
+PHONE_DEFAULT_COUNTRY_CODE = os.environ.get('PHONE_DEFAULT_COUNTRY_CODE', '94')
+PHONE_NATIONAL_DIGITS = int(os.environ.get('PHONE_NATIONAL_DIGITS', '9'))  # Digits after the trunk prefix 0
+
+# Shared Google Sheets connection
+SHEETS_TOKEN_REFRESH_MARGIN = int(os.environ.get('SHEETS_TOKEN_REFRESH_MARGIN', '300'))  # Refresh the token this many seconds before expiry
+SHEETS_RECONNECT_BACKOFF = int(os.environ.get('SHEETS_RECONNECT_BACKOFF', '10'))        # Seconds between attempts after a failed connect
+# Seconds the phone-indexed cache of confirmed reservations is served before re-reading the sheet (0 disables it)
+RESERVATION_CACHE_TTL = int(os.environ.get('RESERVATION_CACHE_TTL', '60'))
+# Write-behind queue coalescing reservation appends into one append_rows call (set to "0" to append row by row)
+SHEETS_APPEND_QUEUE = os.environ.get('SHEETS_APPEND_QUEUE', '1') == '1'
+SHEETS_APPEND_FLUSH_MS = float(os.environ.get('SHEETS_APPEND_FLUSH_MS', '500'))   # Max time a row waits for its batch
+SHEETS_APPEND_MAX_ROWS = int(os.environ.get('SHEETS_APPEND_MAX_ROWS', '50'))      # Flush as soon as this many rows are queued
+SHEETS_APPEND_QUEUE_SIZE = int(os.environ.get('SHEETS_APPEND_QUEUE_SIZE', '500')) # Pending rows before writers fall back to direct appends
+# Incremental sync of the local sheet mirror: rows per checksum block, and seconds the mirror is served between syncs
+# Appended rows are picked up by the next sync, but each sync verifies only ONE block of older rows (in rotation),
+# so an edit made directly in the sheet is seen after up to ceil(rows / SHEETS_SYNC_BLOCK_ROWS) syncs, i.e. at least
+# that many times SHEETS_SYNC_INTERVAL seconds (2,000 rows: 10 blocks, 50 s or more); our own writes are applied at once
+SHEETS_SYNC_BLOCK_ROWS = int(os.environ.get('SHEETS_SYNC_BLOCK_ROWS', '200'))
+SHEETS_SYNC_INTERVAL = float(os.environ.get('SHEETS_SYNC_INTERVAL', '5'))
+# Client-side Google Sheets quota: token buckets for reads and writes (the API allows 60 of each per minute per user)
+SHEETS_READ_PER_MINUTE = float(os.environ.get('SHEETS_READ_PER_MINUTE', '60'))
+SHEETS_WRITE_PER_MINUTE = float(os.environ.get('SHEETS_WRITE_PER_MINUTE', '60'))
+SHEETS_QUOTA_BURST = int(os.environ.get('SHEETS_QUOTA_BURST', '10'))             # Calls allowed back to back after an idle period
+SHEETS_RATE_LIMIT_RETRIES = int(os.environ.get('SHEETS_RATE_LIMIT_RETRIES', '3'))  # Retries of a call rejected with 429
+SHEETS_BACKOFF_BASE = float(os.environ.get('SHEETS_BACKOFF_BASE', '1'))            # Seconds; doubled after every 429
+SHEETS_BACKOFF_MAX = float(os.environ.get('SHEETS_BACKOFF_MAX', '32'))
+SHEETS_INTERACTIVE_MAX_WAIT = float(os.environ.get('SHEETS_INTERACTIVE_MAX_WAIT', '2.5'))  # Seconds a guest-facing call waits for quota
+
+# Durable outbox journaling reservation side effects (storage writes, emails) before the guest is answered
+OUTBOX_DB_PATH = os.environ.get('OUTBOX_DB_PATH', 'outbox.db')
+OUTBOX_WORKERS = int(os.environ.get('OUTBOX_WORKERS', '4'))                # Side effects executed concurrently
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '8'))      # Attempts before an entry is kept as 'dead'
+OUTBOX_BACKOFF_BASE = float(os.environ.get('OUTBOX_BACKOFF_BASE', '2'))    # Seconds; doubled on every retry
+OUTBOX_BACKOFF_MAX = float(os.environ.get('OUTBOX_BACKOFF_MAX', '300'))    # Cap on the retry delay in seconds
+OUTBOX_LEASE_SECONDS = float(os.environ.get('OUTBOX_LEASE_SECONDS', '300'))  # Claim on a running entry; must outlast the slowest side effect
+
+# ML availability engine
+# Precompute the model over its whole input space at load time (set to "0" to disable)
+ML_AVAILABILITY_GRID = os.environ.get('ML_AVAILABILITY_GRID', '1') == '1'
+# Share the precomputed grid between worker processes through memory-mapped .npy files
+# written next to the model; the sklearn model is only unpickled when they are missing or stale
+ML_GRID_MMAP = os.environ.get('ML_GRID_MMAP', '0') == '1'
+# Serve predictions from the forest compiled into NumPy arrays (cached as .npz next to the model)
+ML_COMPILED_FOREST = os.environ.get('ML_COMPILED_FOREST', '1') == '1'
+# Seconds between checks of the model files for a retrained model (0 disables hot reload)
+ML_RELOAD_INTERVAL = int(os.environ.get('ML_RELOAD_INTERVAL', '30'))
+# Opt-in micro-batching of request-time predictions across concurrent webhook threads
+ML_MICROBATCH = os.environ.get('ML_MICROBATCH', '0') == '1'
+ML_MICROBATCH_WAIT_MS = float(os.environ.get('ML_MICROBATCH_WAIT_MS', '2'))    # Max time a batch waits to fill
+ML_MICROBATCH_MAX_ROWS = int(os.environ.get('ML_MICROBATCH_MAX_ROWS', '256'))  # Flush as soon as this many rows are queued
+# Table allocation scorer: 'lowest_risk' (predict_proba ranked) or 'first_fit' (lowest table number)
+TABLE_SCORER = os.environ.get('TABLE_SCORER', 'lowest_risk')
+
+# Table inventory (floor plan)
+# One entry per table: capacity = largest party it seats, zone = dining area,
+# combinable = can be pushed together with other combinable tables of the same zone
+TABLE_INVENTORY = (
+    [{'table': t, 'capacity': 2, 'zone': 'window', 'combinable': True} for t in range(1, 9)] +     # Small tables
+    [{'table': t, 'capacity': 4, 'zone': 'main', 'combinable': True} for t in range(9, 16)] +      # Medium tables
+    [{'table': t, 'capacity': 20, 'zone': 'hall', 'combinable': False} for t in range(16, 21)]     # Large tables
+)
+# Optional JSON file with the same list of entries, replacing the floor plan above without a code change
+TABLE_INVENTORY_FILE = os.environ.get('TABLE_INVENTORY_FILE')
+
+# Availability heatmap endpoint
+HEATMAP_MAX_DAYS = int(os.environ.get('HEATMAP_MAX_DAYS', '31'))          # Longest range served in one call
+HEATMAP_CACHE_DAYS = int(os.environ.get('HEATMAP_CACHE_DAYS', '400'))     # Days kept in the (party size, day) cache
+
+# Demand forecast: default party-size mix {guests: share of reservations}, override as "2:0.5,4:0.3,8:0.2"
+FORECAST_PARTY_MIX = os.environ.get('FORECAST_PARTY_MIX', '1:0.1,2:0.4,3:0.1,4:0.25,6:0.1,10:0.05')
+FORECAST_CACHE_SIZE = int(os.environ.get('FORECAST_CACHE_SIZE', '32'))   # Party mixes memoized per model version (LRU)
+
 # Restaurant Information - UPDATED FOR RESTORAN
 # This dictionary contains all the essential business information
 # Used throughout the application for contact details, confirmations, and customer communications
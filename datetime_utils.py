@@ -373,6 +373,30 @@ def parse_dialogflow_datetime(date_param, time_param, language_code='en'):
         return 5, 19, f"Sorry, I had trouble understanding the date or time. Please try again."
 
 
+def parse_reservation_date(date_string):
+    """
+    Parse a reservation date from Dialogflow (ISO) or Google Sheets (readable) format
+    Returns: datetime.date or None if it can't be parsed
+    """
+    if not date_string:
+        return None
+    
+    date_str = str(date_string).strip()
+    
+    # ISO format with time part (2025-06-23T12:00:00+02:00)
+    if len(date_str) > 10 and date_str[4] == '-' and date_str[7] == '-' and date_str[10] == 'T':
+        date_str = date_str[:10]
+    
+    # YYYY-MM-DD, "Monday, June 23, 2025" and "June 23, 2025"
+    for date_format in ('%Y-%m-%d', '%A, %B %d, %Y', '%B %d, %Y'):
+        try:
+            return datetime.strptime(date_str, date_format).date()
+        except ValueError:
+            continue
+    
+    return None
+
+
 def format_date_readable(date_string):
     """
     Convert date from ISO format to readable format
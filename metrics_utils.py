@@ -0,0 +1,11 @@
+"""
+Utility functions for the latency figures reported by the metrics endpoints
+"""
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a list of numbers (0.0 when empty)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return float(ordered[min(len(ordered) - 1, int(round(percent / 100.0 * (len(ordered) - 1))))])
@@ -1,104 +1,819 @@
 """
 ML Utilities and table availability management
 """
+import glob
+import hashlib
 import joblib
 import numpy as np
 import os
-from datetime import datetime
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+from datetime import datetime, timedelta
+
+from config import (
+    ML_AVAILABILITY_GRID, ML_GRID_MMAP, ML_COMPILED_FOREST, ML_RELOAD_INTERVAL,
+    ML_MICROBATCH, ML_MICROBATCH_WAIT_MS, ML_MICROBATCH_MAX_ROWS, TABLE_SCORER, FORECAST_PARTY_MIX,
+    FORECAST_CACHE_SIZE
+)
+import occupancy_ledger
+import table_inventory
+from datetime_utils import check_restaurant_hours, parse_reservation_date, format_time_readable
 
 # Global variable for the ML model
 model = None
 model_loaded = False
 
+# Testing switch set by force_enable_availability()
+force_available = False
+
+# Precomputed availability grid over the model's whole input space
+# Axes: table (1..highest table number), guests (1..largest table capacity), day of week (0-6), hour of day (0-23)
+# Sized from the table inventory at import (20 x 20 x 7 x 24 for the default floor plan)
+GRID_SHAPE = (table_inventory.max_table_number(), table_inventory.max_party_size(), 7, 24)
+
+# Active availability engine - one dict per model version, replaced atomically on reload
+# Keys: version, path, model, forest (compile_forest), grid (bool), proba (float32), loaded_at
+# Requests read this reference once, so in-flight calls keep using the version they started with
+active_engine = None
+_reload_lock = threading.Lock()
+
+# Background loader state: 'loading', 'ready' or 'failed'
+model_state = 'loading'
+model_state_info = {'started_at': None, 'finished_at': None, 'error': None, 'reloads': 0, 'last_reload': None}
+_model_ready_event = threading.Event()
+
+MODEL_FILENAME = 'restaurant_model_client.pkl'
+MODEL_INFO_FILENAME = 'model_info_client.json'
+
+
+def find_model_path(verbose=True):
+    """Return the first existing model file path, or None"""
+    # Try different paths for the model file
+    possible_paths = [
+        MODEL_FILENAME,                                         # Current directory
+        './' + MODEL_FILENAME,                                  # Explicit current directory
+        os.path.join(os.path.dirname(__file__), MODEL_FILENAME),  # Same directory as this file
+        'models/' + MODEL_FILENAME                              # Models subdirectory
+    ]
+    
+    for path in possible_paths:
+        if os.path.exists(path):
+            return path
+    
+    if verbose:
+        print("❌ Model file not found in any expected location!")
+        print(f"🔧 DEBUG - Tried paths: {possible_paths}")
+        print(f"🔧 DEBUG - Current working directory: {os.getcwd()}")
+        print(f"🔧 DEBUG - Files in current directory: {os.listdir('.')}")
+    return None
+
+
+def find_model_info_path(model_path):
+    """model_info_client.json lives next to the model or next to this file"""
+    for info_dir in (os.path.dirname(model_path), os.path.dirname(__file__)):
+        info_path = os.path.join(info_dir, MODEL_INFO_FILENAME)
+        if os.path.exists(info_path):
+            return info_path
+    return None
+
+
 def load_model():
     """Load ML model with improved checks and fallback handling"""
-    global model, model_loaded
-    
     try:
-        # Try different paths for the model file
-        possible_paths = [
-            'restaurant_model_client.pkl',           # Current directory
-            './restaurant_model_client.pkl',         # Explicit current directory
-            os.path.join(os.path.dirname(__file__), 'restaurant_model_client.pkl'),  # Same directory as this file
-            'models/restaurant_model_client.pkl'     # Models subdirectory
-        ]
-        
-        model_found = False
-        for path in possible_paths:
-            if os.path.exists(path):
-                print(f"🔧 DEBUG - Found model at: {path}")
-                model = joblib.load(path)
-                model_loaded = True
-                model_found = True
-                print("✅ ML Model loaded successfully!")
-                break
+        path = find_model_path()
+        if path is None:
+            _install_engine(None)
+            return
         
-        if not model_found:
-            print("❌ Model file not found in any expected location!")
-            print(f"🔧 DEBUG - Tried paths: {possible_paths}")
-            print(f"🔧 DEBUG - Current working directory: {os.getcwd()}")
-            print(f"🔧 DEBUG - Files in current directory: {os.listdir('.')}")
-            model_loaded = False
+        print(f"🔧 DEBUG - Found model at: {path}")
+        _install_engine(_load_engine(path))
             
     except Exception as e:
         print(f"❌ Error loading ML model: {e}")
         print(f"🔧 DEBUG - Error type: {type(e)}")
-        model = None
-        model_loaded = False
+        _install_engine(None)
+
+
+def _load_engine(path):
+    """Build a complete availability engine for a model file (does not install it)"""
+    fingerprint = model_fingerprint(path)
+    engine = {
+        'version': fingerprint,
+        'path': path,
+        'model': None,
+        'forest': None,
+        'grid': None,
+        'proba': None,
+        'loaded_at': datetime.now().isoformat()
+    }
+    
+    # Shared mode: map the precomputed tensors instead of unpickling the forest
+    if ML_GRID_MMAP:
+        shared = load_shared_grid(path, fingerprint)
+        if shared is not None:
+            engine['grid'], engine['proba'] = shared
+            print("✅ Availability grid mapped from disk - sklearn model not loaded")
+            return engine
+    
+    # Compiled forest cache: plain NumPy arrays, no sklearn import needed
+    if ML_COMPILED_FOREST:
+        engine['forest'] = load_compiled_forest(path, fingerprint)
+    
+    if engine['forest'] is not None:
+        print("✅ Compiled forest loaded from disk - sklearn model not loaded")
+    else:
+        engine['model'] = joblib.load(path)
+        print("✅ ML Model loaded successfully!")
+        
+        if ML_COMPILED_FOREST:
+            try:
+                forest = compile_forest(engine['model'])
+                if verify_compiled_forest(forest, engine['model']):
+                    engine['forest'] = forest
+                    save_compiled_forest(path, fingerprint, forest)
+            except Exception as e:
+                print(f"❌ Error compiling forest: {e}")
+    
+    if ML_AVAILABILITY_GRID or ML_GRID_MMAP:
+        grid = compute_availability_grid(engine)
+        if grid is not None:
+            engine['grid'], engine['proba'] = grid
+            if ML_GRID_MMAP:
+                save_shared_grid(path, fingerprint, *grid)
+    
+    return engine
+
+
+def _install_engine(engine):
+    """Atomically publish a new engine (a single reference assignment)"""
+    global active_engine, model, model_loaded
+    active_engine = engine
+    model = engine['model'] if engine else None
+    model_loaded = engine is not None
+    if engine:
+        print(f"✅ Availability engine active: version {engine['version']}")
+
+
+def model_fingerprint(model_path):
+    """Hash of the model file plus its model_info JSON (identifies a trained model)"""
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    
+    info_path = find_model_info_path(model_path)
+    if info_path:
+        with open(info_path, 'rb') as f:
+            digest.update(f.read())
+    
+    return digest.hexdigest()[:16]
+
+
+def model_cache_path(model_path, fingerprint, suffix):
+    """Path of a derived cache file stored next to the model (e.g. suffix 'grid.npy')"""
+    base = os.path.splitext(model_path)[0]
+    return f"{base}.{fingerprint}.{suffix}"
+
+
+def _write_model_cache(model_path, fingerprint, suffix, write_func):
+    """Atomically write a cache file next to the model and remove older versions of it"""
+    path = model_cache_path(model_path, fingerprint, suffix)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        write_func(f)
+    os.replace(tmp_path, path)
+    
+    # Remove caches that belong to previous model versions
+    for old_path in glob.glob(model_cache_path(model_path, '*', suffix)):
+        if old_path != path:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+    return path
+
+
+def load_shared_grid(model_path, fingerprint):
+    """Memory-map the precomputed tensors if they match the current model files"""
+    try:
+        grid_path = model_cache_path(model_path, fingerprint, 'grid.npy')
+        proba_path = model_cache_path(model_path, fingerprint, 'proba.npy')
+        if not (os.path.exists(grid_path) and os.path.exists(proba_path)):
+            print("🔧 DEBUG - Shared availability grid missing or stale")
+            return None
+        
+        # mmap_mode='r' lets the OS share the pages between worker processes
+        grid = np.load(grid_path, mmap_mode='r')
+        proba = np.load(proba_path, mmap_mode='r')
+        if grid.shape != GRID_SHAPE or proba.shape != GRID_SHAPE:
+            print(f"❌ Shared availability grid has wrong shape: {grid.shape}")
+            return None
+        
+        print(f"🔧 DEBUG - Mapped shared availability grid: {grid_path}")
+        return grid, proba
+        
+    except Exception as e:
+        print(f"❌ Error mapping shared availability grid: {e}")
+        return None
+
+
+def save_shared_grid(model_path, fingerprint, grid, proba):
+    """Write the tensors next to the model for the other workers"""
+    try:
+        grid = np.ascontiguousarray(grid)
+        proba = np.ascontiguousarray(proba)
+        grid_path = _write_model_cache(model_path, fingerprint, 'grid.npy', lambda f: np.save(f, grid))
+        _write_model_cache(model_path, fingerprint, 'proba.npy', lambda f: np.save(f, proba))
+        print(f"✅ Shared availability grid written: {grid_path}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error writing shared availability grid: {e}")
+        return False
+
+
+def compile_forest(forest):
+    """
+    Flatten every tree of a fitted RandomForestClassifier into contiguous arrays
+    Leaves point to themselves so all trees can be walked in lock-step
+    """
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        n_nodes = tree.node_count
+        node_ids = np.arange(n_nodes)
+        is_leaf = tree.children_left == -1
+        
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold).astype(np.float64))
+        lefts.append((np.where(is_leaf, node_ids, tree.children_left) + offset).astype(np.intp))
+        rights.append((np.where(is_leaf, node_ids, tree.children_right) + offset).astype(np.intp))
+        
+        # Per-node class distribution normalised like DecisionTreeClassifier.predict_proba
+        value = tree.value[:, 0, :].astype(np.float64)
+        normalizer = value.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        values.append(value / normalizer)
+        
+        roots.append(offset)
+        offset += n_nodes
+        max_depth = max(max_depth, tree.max_depth)
+    
+    return {
+        'feature': np.concatenate(features),
+        'threshold': np.concatenate(thresholds),
+        'left': np.concatenate(lefts),
+        'right': np.concatenate(rights),
+        'value': np.concatenate(values),
+        'roots': np.array(roots, dtype=np.intp),
+        'max_depth': np.array(max_depth),
+        'classes': np.asarray(forest.classes_),
+    }
+
+
+def compiled_predict_proba(forest, input_data):
+    """Vectorized evaluation of a compiled forest: walks all trees at once for a batch of rows"""
+    # Trees compare float32 features against float64 thresholds, as sklearn does
+    X = np.asarray(input_data, dtype=np.float32)
+    rows = np.arange(X.shape[0])[:, np.newaxis]
+    
+    feature, threshold = forest['feature'], forest['threshold']
+    left, right = forest['left'], forest['right']
+    
+    # One current node per (row, tree)
+    nodes = np.broadcast_to(forest['roots'], (X.shape[0], forest['roots'].shape[0]))
+    for _ in range(int(forest['max_depth'])):
+        go_left = X[rows, feature[nodes]] <= threshold[nodes]
+        nodes = np.where(go_left, left[nodes], right[nodes])
+    
+    # Accumulate tree by tree in estimator order, then average (same arithmetic as sklearn)
+    leaf_values = forest['value'][nodes]
+    proba = np.zeros((X.shape[0], leaf_values.shape[2]), dtype=np.float64)
+    for tree_index in range(leaf_values.shape[1]):
+        proba += leaf_values[:, tree_index, :]
+    proba /= leaf_values.shape[1]
+    return proba
+
+
+def compiled_predict(forest, input_data):
+    """Class predictions of a compiled forest (argmax of the averaged probabilities)"""
+    proba = compiled_predict_proba(forest, input_data)
+    return forest['classes'].take(np.argmax(proba, axis=1), axis=0)
+
+
+def verify_compiled_forest(forest, reference_model, input_data=None):
+    """Check the compiled forest reproduces model.predict bit for bit on a validation set"""
+    if input_data is None:
+        input_data = _grid_inputs()
+    
+    expected = reference_model.predict(input_data)
+    actual = compiled_predict(forest, input_data)
+    if not np.array_equal(expected, actual):
+        mismatches = int(np.count_nonzero(expected != actual))
+        print(f"❌ Compiled forest mismatch on {mismatches}/{len(expected)} validation rows")
+        return False
+    
+    print(f"✅ Compiled forest verified on {len(expected)} validation rows")
+    return True
+
+
+def load_compiled_forest(model_path, fingerprint):
+    """Load the compiled forest cache (.npz) if it matches the current model files"""
+    try:
+        forest_path = model_cache_path(model_path, fingerprint, 'forest.npz')
+        if not os.path.exists(forest_path):
+            print("🔧 DEBUG - Compiled forest cache missing or stale")
+            return None
+        
+        with np.load(forest_path, allow_pickle=False) as data:
+            forest = {key: data[key] for key in data.files}
+        print(f"🔧 DEBUG - Loaded compiled forest: {forest_path}")
+        return forest
+        
+    except Exception as e:
+        print(f"❌ Error loading compiled forest: {e}")
+        return None
+
+
+def save_compiled_forest(model_path, fingerprint, forest):
+    """Write the compiled forest next to the model so later starts skip sklearn"""
+    try:
+        forest_path = _write_model_cache(model_path, fingerprint, 'forest.npz', lambda f: np.savez(f, **forest))
+        print(f"✅ Compiled forest written: {forest_path}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error writing compiled forest: {e}")
+        return False
+
+
+def predict_proba_rows(input_data, engine=None):
+    """predict_proba through the compiled forest when available, else through sklearn"""
+    engine = engine or active_engine
+    if engine['forest'] is not None:
+        return compiled_predict_proba(engine['forest'], input_data)
+    return engine['model'].predict_proba(input_data)
 
-# Load the model on import
-load_model()
 
-def check_table_availability(table_number, guest_count, day_of_week, hour_of_day, language_code='en'):
-    """Use ML model to check table availability with intelligent fallback and multilingual support"""
-    global model, model_loaded
+def predict_rows(input_data, engine=None):
+    """predict through the compiled forest when available, else through sklearn"""
+    engine = engine or active_engine
+    if engine['forest'] is not None:
+        return compiled_predict(engine['forest'], input_data)
+    return engine['model'].predict(input_data)
+
+
+def model_classes(engine=None):
+    """Class labels of the engine's model"""
+    engine = engine or active_engine
+    if engine['forest'] is not None:
+        return engine['forest']['classes']
+    return engine['model'].classes_
+
+
+class InferenceBatcher:
+    """
+    Cross-request micro-batching: collects prediction requests from concurrent webhook threads
+    for up to max_wait_ms or max_rows, runs ONE batched predict_proba and resolves each caller's future
+    """
+    
+    def __init__(self, max_wait_ms=2, max_rows=256, history=1000):
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_rows = max_rows
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = deque(maxlen=history)   # rows per batch
+        self._wait_times = deque(maxlen=history)    # ms each request waited before its batch ran
+        self._totals = {'batches': 0, 'requests': 0, 'rows': 0, 'errors': 0}
+        
+        self._thread = threading.Thread(target=self._run, name='inference-batcher')
+        self._thread.daemon = True
+        self._thread.start()
+    
+    def submit(self, input_data, engine):
+        """Queue rows for the next batch; returns a Future resolving to their class probabilities"""
+        future = Future()
+        self._queue.put((np.asarray(input_data), engine, future, time.perf_counter()))
+        return future
     
-    print(f"🔧 DEBUG - check_table_availability called with: table={table_number}, guests={guest_count}, day={day_of_week}, hour={hour_of_day}")
+    def _collect(self):
+        """Block for the first request, then gather more until the wait or row budget runs out"""
+        batch = [self._queue.get()]
+        rows = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while rows < self.max_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+    
+    def _run(self):
+        """Worker loop: one predict per engine version present in the collected batch"""
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            
+            # Requests that started on different model versions are never mixed
+            by_engine = {}
+            for item in batch:
+                by_engine.setdefault(id(item[1]), []).append(item)
+            
+            for items in by_engine.values():
+                try:
+                    predictions = predict_proba_rows(np.vstack([item[0] for item in items]), items[0][1])
+                    offset = 0
+                    for input_data, _, future, _ in items:
+                        future.set_result(predictions[offset:offset + len(input_data)])
+                        offset += len(input_data)
+                except Exception as e:
+                    with self._lock:
+                        self._totals['errors'] += 1
+                    for _, _, future, _ in items:
+                        if not future.done():
+                            future.set_exception(e)
+                
+                with self._lock:
+                    rows = sum(len(item[0]) for item in items)
+                    self._batch_sizes.append(rows)
+                    self._wait_times.extend((started - item[3]) * 1000 for item in items)
+                    self._totals['batches'] += 1
+                    self._totals['requests'] += len(items)
+                    self._totals['rows'] += rows
+    
+    def get_metrics(self):
+        """Batch size and queue wait statistics over the recent history"""
+        with self._lock:
+            sizes = np.array(self._batch_sizes, dtype=np.float64)
+            waits = np.array(self._wait_times, dtype=np.float64)
+            metrics = dict(self._totals)
+        
+        metrics.update({
+            'max_wait_ms': self.max_wait * 1000,
+            'max_rows': self.max_rows,
+            'queue_depth': self._queue.qsize(),
+            'batch_size_mean': float(sizes.mean()) if sizes.size else 0.0,
+            'batch_size_max': float(sizes.max()) if sizes.size else 0.0,
+            'wait_ms_p50': float(np.percentile(waits, 50)) if waits.size else 0.0,
+            'wait_ms_p99': float(np.percentile(waits, 99)) if waits.size else 0.0
+        })
+        return metrics
+
+
+# Opt-in micro-batching scheduler (ML_MICROBATCH=1)
+inference_batcher = InferenceBatcher(ML_MICROBATCH_WAIT_MS, ML_MICROBATCH_MAX_ROWS) if ML_MICROBATCH else None
+
+
+def predict_request_proba(input_data, engine=None):
+    """Request-path predict_proba: goes through the micro-batcher when enabled, direct otherwise"""
+    engine = engine or active_engine
+    batcher = inference_batcher
+    if batcher is None:
+        return predict_proba_rows(input_data, engine)
+    
+    try:
+        return batcher.submit(input_data, engine).result(timeout=5)
+    except FuturesTimeoutError:
+        print("⚠️ Inference batcher timed out, predicting directly")
+        return predict_proba_rows(input_data, engine)
+
+
+def predict_request_rows(input_data, engine=None):
+    """Request-path predict (argmax of predict_request_proba, the same rule as model.predict)"""
+    engine = engine or active_engine
+    proba = predict_request_proba(input_data, engine)
+    return model_classes(engine).take(np.argmax(proba, axis=1), axis=0)
+
+
+def get_inference_metrics():
+    """Micro-batching metrics (None when the batcher is disabled)"""
+    return inference_batcher.get_metrics() if inference_batcher is not None else None
+
+
+def _grid_inputs():
+    """Every (table, guests, day, hour) combination in C order of GRID_SHAPE"""
+    input_data = np.indices(GRID_SHAPE).reshape(4, -1).T
+    input_data[:, 0] += 1  # Tables start at 1
+    input_data[:, 1] += 1  # Guest counts start at 1
+    return input_data
+
+
+def compute_availability_grid(engine):
+    """Evaluate the engine's model once over every possible input; returns (grid, proba)"""
+    try:
+        start_time = datetime.now()
+        input_data = _grid_inputs()
+        
+        # Single predict_proba over the whole input space
+        proba = predict_proba_rows(input_data, engine)
+        classes = model_classes(engine)
+        
+        # Same decision rule as model.predict (argmax over classes, 0 = available)
+        predictions = classes.take(np.argmax(proba, axis=1), axis=0)
+        
+        grid = (predictions == 0).reshape(GRID_SHAPE)
+        proba_available = proba[:, list(classes).index(0)].astype(np.float32).reshape(GRID_SHAPE)
+        
+        elapsed = (datetime.now() - start_time).total_seconds()
+        print(f"✅ Availability grid built: {input_data.shape[0]} inputs in {elapsed:.2f}s")
+        return grid, proba_available
+        
+    except Exception as e:
+        print(f"❌ Error building availability grid: {e}")
+        return None
+
+
+def build_availability_grid():
+    """
+    (Re)build the grid for the active engine
+    Returns False when a hot reload swapped in another model while the grid was computed (its grid is kept)
+    """
+    engine = active_engine
+    if engine is None or (engine['model'] is None and engine['forest'] is None):
+        return False
+    
+    grid = compute_availability_grid(engine)
+    if grid is None:
+        return False
+    with _reload_lock:
+        if active_engine is not engine:
+            print("⚠️ Model reloaded while the availability grid was built - grid discarded")
+            return False
+        _install_engine(dict(engine, grid=grid[0], proba=grid[1]))
+    return True
+
+
+def invalidate_availability_grid():
+    """Cache-invalidation hook: drop the active engine's grid (lookups go back to inference)"""
+    with _reload_lock:
+        engine = active_engine
+        if engine is not None and engine['grid'] is not None and (engine['model'] is not None or engine['forest'] is not None):
+            _install_engine(dict(engine, grid=None, proba=None))
+
+
+def _engine_available(engine=None):
+    """True when predictions can be served (model, compiled forest or precomputed grid)"""
+    engine = engine or active_engine
+    return engine is not None and (engine['model'] is not None or engine['forest'] is not None or engine['grid'] is not None)
+
+
+def smoke_test_engine(engine):
+    """Validate a freshly loaded engine on a small fixed batch before it goes live"""
+    try:
+        if not _engine_available(engine):
+            return False, 'engine has no model, compiled forest or grid'
+        
+        # Fixed scenarios (those inside the floor plan) plus an evenly spaced sample of the whole input space
+        fixed = np.array([[1, 2, 0, 12], [1, 2, 1, 19], [5, 4, 5, 20], [10, 6, 6, 18]])
+        fixed = fixed[(fixed[:, 0] <= GRID_SHAPE[0]) & (fixed[:, 1] <= GRID_SHAPE[1])]
+        input_data = np.vstack([fixed, _grid_inputs()[::1051]])
+        
+        if engine['model'] is not None or engine['forest'] is not None:
+            predictions = predict_rows(input_data, engine)
+            if predictions.shape != (input_data.shape[0],):
+                return False, f'unexpected prediction shape {predictions.shape}'
+            if not set(np.unique(predictions)) <= {0, 1}:
+                return False, f'unexpected classes {np.unique(predictions)}'
+            if engine['grid'] is not None:
+                lookups = engine['grid'][input_data[:, 0] - 1, input_data[:, 1] - 1, input_data[:, 2], input_data[:, 3]]
+                if not np.array_equal(lookups, predictions == 0):
+                    return False, 'grid disagrees with model predictions'
+        elif engine['grid'].shape != GRID_SHAPE:
+            return False, f'unexpected grid shape {engine["grid"].shape}'
+        
+        return True, f'{input_data.shape[0]} rows OK'
+        
+    except Exception as e:
+        return False, f'smoke test error: {e}'
+
+
+def _model_files_signature():
+    """Cheap change detector: (path, mtime, size) of the model file and its model_info JSON"""
+    path = find_model_path(verbose=False)
+    if path is None:
+        return None
+    signature = [path]
+    for file_path in (path, find_model_info_path(path)):
+        if file_path:
+            stat = os.stat(file_path)
+            signature.extend([stat.st_mtime_ns, stat.st_size])
+    return tuple(signature)
+
+
+def reload_model_if_changed():
+    """
+    Hot reload: load a changed model in the background, smoke-test it, then swap it in
+    Returns True when a new version was installed
+    """
+    global model_state
+    
+    with _reload_lock:
+        path = find_model_path(verbose=False)
+        if path is None:
+            return False
+        
+        current = active_engine
+        fingerprint = model_fingerprint(path)
+        if current is not None and current['version'] == fingerprint:
+            return False
+        
+        print(f"🔄 Model files changed - loading version {fingerprint}")
+        try:
+            new_engine = _load_engine(path)
+        except Exception as e:
+            print(f"❌ Hot reload failed to load version {fingerprint}: {e}")
+            return False
+        
+        ok, message = smoke_test_engine(new_engine)
+        if not ok:
+            print(f"❌ Hot reload rejected version {fingerprint}: {message}")
+            return False
+        
+        _install_engine(new_engine)
+        model_state = 'ready'
+        model_state_info['reloads'] += 1
+        model_state_info['last_reload'] = datetime.now().isoformat()
+        print(f"✅ Hot reload complete: {current['version'] if current else None} -> {fingerprint} ({message})")
+        return True
+
+
+def _watch_model_files():
+    """Watcher thread: poll the model files and hot-reload when they change"""
+    signature = _model_files_signature()
+    while True:
+        time.sleep(ML_RELOAD_INTERVAL)
+        try:
+            new_signature = _model_files_signature()
+            if new_signature != signature:
+                signature = new_signature
+                reload_model_if_changed()
+        except Exception as e:
+            print(f"❌ Model watcher error: {e}")
+
+
+def start_model_watcher():
+    """Start the hot-reload watcher (disabled when ML_RELOAD_INTERVAL is 0)"""
+    if ML_RELOAD_INTERVAL <= 0:
+        return None
+    watcher_thread = threading.Thread(target=_watch_model_files, name='model-watcher')
+    watcher_thread.daemon = True
+    watcher_thread.start()
+    return watcher_thread
+
+
+def get_model_version():
+    """Version (fingerprint) of the active model, or 'fallback' when none is loaded"""
+    engine = active_engine
+    return engine['version'] if _engine_available(engine) else 'fallback'
+
+
+def _load_model_background():
+    """Loader thread body: load the model and publish the resulting state"""
+    global model_state
+    
+    try:
+        load_model()
+        if _engine_available():
+            model_state = 'ready'
+        else:
+            model_state = 'failed'
+            model_state_info['error'] = 'Model file not found or could not be loaded'
+    except Exception as e:
+        model_state = 'failed'
+        model_state_info['error'] = str(e)
+    finally:
+        model_state_info['finished_at'] = datetime.now().isoformat()
+        _model_ready_event.set()
+        print(f"🔧 DEBUG - Background model loading finished: {model_state}")
+    
+    # Keep watching for retrained models (also picks up a model deployed after a failed start)
+    start_model_watcher()
+
+
+def start_model_loading():
+    """Load the model in a background thread (requests use the fallback until it is ready)"""
+    global model_state
+    
+    model_state = 'loading'
+    model_state_info.update({'started_at': datetime.now().isoformat(), 'finished_at': None, 'error': None})
+    _model_ready_event.clear()
+    
+    loader_thread = threading.Thread(target=_load_model_background, name='model-loader')
+    loader_thread.daemon = True
+    loader_thread.start()
+    return loader_thread
+
+
+def wait_for_model(timeout=None):
+    """Block until the background loader has finished; returns True if the model is ready"""
+    _model_ready_event.wait(timeout)
+    return model_state == 'ready'
+
+
+def get_model_state():
+    """Return the loader state for readiness checks"""
+    engine = active_engine
+    return {
+        'state': model_state,
+        'version': get_model_version(),
+        'loaded_at': engine['loaded_at'] if engine else None,
+        'started_at': model_state_info['started_at'],
+        'finished_at': model_state_info['finished_at'],
+        'error': model_state_info['error'],
+        'reloads': model_state_info['reloads'],
+        'last_reload': model_state_info['last_reload'],
+        'grid': bool(engine and engine['grid'] is not None),
+        'compiled_forest': bool(engine and engine['forest'] is not None)
+    }
+
+
+# Load the model on import without blocking the application start
+start_model_loading()
+
+def check_table_availability(table_number, guest_count, day_of_week, hour_of_day, language_code='en', date=None, exclude_phone=None):
+    """
+    Use ML model to check table availability with intelligent fallback and multilingual support
+    When date is given, tables already booked in the occupancy ledger are never available
+    (bookings of exclude_phone are ignored, e.g. the guest's own reservation being modified)
+    """
+    # One engine reference for the whole decision (hot reloads do not affect this call)
+    engine = active_engine
+    
+    print(f"🔧 DEBUG - check_table_availability called with: table={table_number}, guests={guest_count}, day={day_of_week}, hour={hour_of_day}, date={date}")
     print(f"🔧 DEBUG - Model loaded: {model_loaded}, Model object: {model is not None}")
     
+    # Confirmed bookings win over the model prediction
+    if date and occupancy_ledger.is_booked(date, hour_of_day, table_number, exclude_phone):
+        print(f"🔧 DEBUG - Table {table_number} is booked in the occupancy ledger")
+        _audit_decision('check_table_availability', 'ledger', table_number, guest_count, day_of_week, hour_of_day, False)
+        return False
+    
     # Check if ML model is available, otherwise use fallback logic
-    if not model_loaded or model is None:
+    if not _engine_available(engine):
         print("⚠️ ML Model not available, using fallback logic")
         # Intelligent fallback based on simple rules
-        return fallback_availability_check(table_number, guest_count, day_of_week, hour_of_day)
+        is_available = fallback_availability_check(table_number, guest_count, day_of_week, hour_of_day)
+        _audit_decision('check_table_availability', 'fallback', table_number, guest_count, day_of_week, hour_of_day, is_available)
+        return is_available
     
     try:
         # Validate input parameters
-        if not (1 <= table_number <= 20):
+        if not table_inventory.is_valid_table(table_number):
             print(f"❌ Invalid table number: {table_number}")
+            _audit_decision('check_table_availability', 'invalid', table_number, guest_count, day_of_week, hour_of_day, False)
             return False
             
-        if not (1 <= guest_count <= 20):
-            print(f"❌ Invalid guest count: {guest_count}")
-            return False
-            
-        if not (0 <= day_of_week <= 6):
-            print(f"❌ Invalid day of week: {day_of_week}")
-            return False
-            
-        if not (0 <= hour_of_day <= 23):
-            print(f"❌ Invalid hour: {hour_of_day}")
+        if not _valid_request(guest_count, day_of_week, hour_of_day):
+            _audit_decision('check_table_availability', 'invalid', table_number, guest_count, day_of_week, hour_of_day, False)
             return False
         
+        # O(1) lookup in the precomputed grid when available
+        grid = engine['grid']
+        if grid is not None:
+            is_available = bool(grid[table_number - 1, guest_count - 1, day_of_week, hour_of_day])
+            print(f"🔧 DEBUG - Grid lookup, is available: {is_available}")
+            _audit_decision('check_table_availability', engine['version'], table_number, guest_count, day_of_week, hour_of_day, is_available)
+            return is_available
+        
         # Prepare input for ML model (must match training data format)
         input_data = np.array([[table_number, guest_count, day_of_week, hour_of_day]])
         print(f"🔧 DEBUG - ML input array: {input_data}")
         
         # Make prediction using trained model
-        prediction = model.predict(input_data)[0]
+        prediction = predict_request_rows(input_data, engine)[0]
         print(f"🔧 DEBUG - ML prediction: {prediction}")
         
         # Convert prediction to boolean (0 = available, 1 = occupied)
-        is_available = prediction == 0
+        is_available = bool(prediction == 0)
         print(f"🔧 DEBUG - Is available: {is_available}")
         
+        _audit_decision('check_table_availability', engine['version'], table_number, guest_count, day_of_week, hour_of_day, is_available)
         return is_available
         
     except Exception as e:
         print(f"❌ Error in ML prediction: {e}")
         print(f"🔧 DEBUG - Falling back to rule-based system")
         # Fallback in case of ML error
-        return fallback_availability_check(table_number, guest_count, day_of_week, hour_of_day, language_code)
+        is_available = fallback_availability_check(table_number, guest_count, day_of_week, hour_of_day, language_code)
+        _audit_decision('check_table_availability', 'fallback', table_number, guest_count, day_of_week, hour_of_day, is_available)
+        return is_available
+
+
+def _audit_decision(source, version, tables, guest_count, day_of_week, hour_of_day, result):
+    """Audit log line tagging every availability decision with the model version used"""
+    print(f"🧾 AUDIT - {source}: model_version={version} tables={tables} guests={guest_count} "
+          f"day={day_of_week} hour={hour_of_day} result={result}")
 
 
 def fallback_availability_check(table_number, guest_count, day_of_week, hour_of_day, language_code='en'):
@@ -134,46 +849,147 @@ def fallback_availability_check(table_number, guest_count, day_of_week, hour_of_
     return availability
 
 
-def find_available_table(guest_count, day_of_week, hour_of_day, language_code='en'):
+def _valid_request(guest_count, day_of_week, hour_of_day):
+    """Check the shared (non-table) inputs of an availability request"""
+    if not (1 <= guest_count <= table_inventory.max_party_size()):
+        print(f"❌ Invalid guest count: {guest_count}")
+        return False
+    if not (0 <= day_of_week <= 6):
+        print(f"❌ Invalid day of week: {day_of_week}")
+        return False
+    if not (0 <= hour_of_day <= 23):
+        print(f"❌ Invalid hour: {hour_of_day}")
+        return False
+    return True
+
+
+def check_tables_availability(table_numbers, guest_count, day_of_week, hour_of_day, language_code='en', date=None, exclude_phone=None):
+    """
+    Batched availability check - ONE model.predict call for all requested tables
+    Returns the set of available table numbers (same rules as check_table_availability)
+    """
+    risks, _ = _available_tables(table_numbers, guest_count, day_of_week, hour_of_day, language_code, date, exclude_phone)
+    return set(risks)
+
+
+def _available_tables(table_numbers, guest_count, day_of_week, hour_of_day, language_code='en', date=None, exclude_phone=None):
+    """
+    Batched availability check from a single predict_proba (or grid lookup)
+    Returns ({available table: occupancy risk}, model version used); risk = P(occupied), 0.0 without a model
+    """
+    # One engine reference for the whole decision (hot reloads do not affect this call)
+    engine = active_engine
+    
+    # Tables booked in the occupancy ledger are never available
+    booked = occupancy_ledger.booked_tables(date, hour_of_day, exclude_phone) if date else set()
+    table_numbers = [t for t in table_numbers if table_inventory.is_valid_table(t) and t not in booked]
+    
+    if force_available:
+        return {t: 0.0 for t in table_numbers}, 'forced'
+    
+    # Fallback logic when the ML model is not available
+    if not _engine_available(engine):
+        print("⚠️ ML Model not available, using fallback logic")
+        return {t: 0.0 for t in table_numbers
+                if fallback_availability_check(t, guest_count, day_of_week, hour_of_day, language_code)}, 'fallback'
+    
+    if not table_numbers or not _valid_request(guest_count, day_of_week, hour_of_day):
+        return {}, engine['version']
+    
+    try:
+        # Array indexing in the precomputed grid when available
+        grid = engine['grid']
+        if grid is not None:
+            row = grid[:, guest_count - 1, day_of_week, hour_of_day]
+            proba_row = engine['proba'][:, guest_count - 1, day_of_week, hour_of_day]
+            return {t: 1.0 - float(proba_row[t - 1]) for t in table_numbers if row[t - 1]}, engine['version']
+        
+        # Build the whole feature matrix once (must match training data format)
+        input_data = np.empty((len(table_numbers), 4), dtype=np.int64)
+        input_data[:, 0] = table_numbers
+        input_data[:, 1] = guest_count
+        input_data[:, 2] = day_of_week
+        input_data[:, 3] = hour_of_day
+        
+        # Single predict_proba for every table; decisions use the model.predict rule (0 = available)
+        proba = predict_request_proba(input_data, engine)
+        classes = model_classes(engine)
+        predictions = classes.take(np.argmax(proba, axis=1), axis=0)
+        available_column = list(classes).index(0)
+        return {t: 1.0 - float(p[available_column])
+                for t, prediction, p in zip(table_numbers, predictions, proba) if prediction == 0}, engine['version']
+        
+    except Exception as e:
+        print(f"❌ Error in batched ML prediction: {e}")
+        print(f"🔧 DEBUG - Falling back to rule-based system")
+        return {t: 0.0 for t in table_numbers
+                if fallback_availability_check(t, guest_count, day_of_week, hour_of_day, language_code)}, 'fallback'
+
+
+def score_lowest_risk(table_number, occupancy_risk, guest_count):
+    """Default scorer: lowest predicted occupancy risk, ties broken by table number"""
+    return (occupancy_risk, table_number)
+
+
+def score_first_fit(table_number, occupancy_risk, guest_count):
+    """Legacy scorer: lowest table number first"""
+    return (table_number,)
+
+
+# Pluggable table scoring - the table with the smallest score key is allocated
+TABLE_SCORERS = {
+    'lowest_risk': score_lowest_risk,
+    'first_fit': score_first_fit
+}
+table_scorer = TABLE_SCORERS.get(TABLE_SCORER, score_lowest_risk)
+
+
+def set_table_scorer(scorer):
+    """Select the allocation scorer by name or install a custom callable(table, risk, guests) -> sort key"""
+    global table_scorer
+    table_scorer = TABLE_SCORERS[scorer] if isinstance(scorer, str) else scorer
+    return table_scorer
+
+
+def find_available_table(guest_count, day_of_week, hour_of_day, language_code='en', date=None, exclude_phone=None):
     """
     Find available table automatically - IMPROVED VERSION with multilingual support
     Does NOT require table_number from customer - automatically selects best table
+    With a date, tables booked in the occupancy ledger are skipped (except bookings of exclude_phone)
     """
-    print(f"🔧 DEBUG - find_available_table called with: guests={guest_count}, day={day_of_week}, hour={hour_of_day}")
+    print(f"🔧 DEBUG - find_available_table called with: guests={guest_count}, day={day_of_week}, hour={hour_of_day}, date={date}")
     
-    available_tables = []
-    
-    # Check all tables (1-20) for availability
-    for table_number in range(1, 21):
-        if check_table_availability(table_number, guest_count, day_of_week, hour_of_day, language_code):
-            available_tables.append(table_number)
-            print(f"🔧 DEBUG - Table {table_number} is AVAILABLE")
-        else:
-            print(f"🔧 DEBUG - Table {table_number} is OCCUPIED")
+    # Only tables that seat the party (capacity index lookup), checked with a single batched prediction
+    groups = table_inventory.capacity_groups(guest_count)
+    risks, model_version = _available_tables(table_inventory.tables_for_party(guest_count), guest_count,
+                                             day_of_week, hour_of_day, language_code, date, exclude_phone)
+    available_tables = sorted(risks)
     
     print(f"🔧 DEBUG - Total available tables: {available_tables}")
     
     if available_tables:
-        # Choose the best table for the number of guests
-        # Table allocation strategy based on party size
-        if guest_count <= 2:
-            # Prefer small tables (1-8) for couples and small parties
-            small_tables = [t for t in available_tables if t <= 8]
-            best_table = small_tables[0] if small_tables else available_tables[0]
-        elif guest_count <= 4:
-            # Prefer medium tables (9-15) for small groups
-            medium_tables = [t for t in available_tables if 9 <= t <= 15]
-            best_table = medium_tables[0] if medium_tables else available_tables[0]
-        else:
-            # Prefer large tables (16-20) for big parties
-            large_tables = [t for t in available_tables if t >= 16]
-            best_table = large_tables[0] if large_tables else available_tables[0]
+        # Choose the best table for the number of guests:
+        # the smallest capacity class with a free table, so large tables stay free for large parties
+        candidates = []
+        for _, group_tables in groups:
+            candidates = [t for t in group_tables if t in risks]
+            if candidates:
+                break
+        
+        # Within the capacity class, pick the table the scorer ranks best (default: lowest occupancy risk)
+        scorer = table_scorer
+        best_table = min(candidates, key=lambda t: scorer(t, risks[t], guest_count))
+        table_info = table_inventory.get_table(best_table)
 
         # Return success result with assigned table
         result = {
             'available': True,
             'table_number': best_table,
-            'total_available': len(available_tables)
+            'capacity': table_info['capacity'],
+            'zone': table_info['zone'],
+            'occupancy_risk': round(risks[best_table], 4),
+            'total_available': len(available_tables),
+            'model_version': model_version
         }
         
     else:
@@ -181,17 +997,193 @@ def find_available_table(guest_count, day_of_week, hour_of_day, language_code='e
         result = {
             'available': False,
             'table_number': None,
-            'total_available': 0
+            'total_available': 0,
+            'model_version': model_version
         }
     
     print(f"🔧 DEBUG - find_available_table result: {result}")
+    _audit_decision('find_available_table', model_version, result['table_number'], guest_count, day_of_week, hour_of_day, result['available'])
     return result
 
 
+def availability_matrix(tables, guest_count, days, hours, language_code='en', engine=None):
+    """
+    Vectorized availability of many slots at once: available[index in tables, slot]
+    tables is an array of table numbers, days/hours are equal-length arrays describing the slots.
+    One grid gather (or a single batched prediction) - ledger bookings are NOT applied here.
+    """
+    tables = np.asarray(tables, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    hours = np.asarray(hours, dtype=np.int64)
+    engine = engine or active_engine
+    
+    if force_available:
+        return np.ones((len(tables), len(days)), dtype=bool)
+    if engine is not None and engine['grid'] is not None:
+        return np.asarray(engine['grid'][tables[:, None] - 1, guest_count - 1, days, hours])
+    if _engine_available(engine):
+        input_data = np.empty((len(tables) * len(days), 4), dtype=np.int64)
+        input_data[:, 0] = np.repeat(tables, len(days))
+        input_data[:, 1] = guest_count
+        input_data[:, 2] = np.tile(days, len(tables))
+        input_data[:, 3] = np.tile(hours, len(tables))
+        return (predict_request_rows(input_data, engine) == 0).reshape(len(tables), len(days))
+    return np.array([[fallback_availability_check(t, guest_count, d, h, language_code)
+                      for d, h in zip(days, hours)] for t in tables], dtype=bool).reshape(len(tables), len(days))
+
+
+def find_next_available_slots(guest_count, date, hour_of_day, window_hours=3, window_days=0, limit=3,
+                              language_code='en', exclude_phone=None):
+    """
+    Search the nearest open slots around a requested date and hour
+    Evaluates every candidate (day, hour, table) in one vectorized pass over the availability engine,
+    skips hours outside restaurant hours and slots already in the past, and removes ledger bookings.
+    Returns up to `limit` slots ordered by distance from the request:
+    [{'date': 'YYYY-MM-DD', 'date_readable': ..., 'hour': 19, 'time_readable': '7:00 PM', 'total_available': 3}]
+    """
+    base_date = parse_reservation_date(date)
+    if base_date is None or not (1 <= guest_count <= table_inventory.max_party_size()):
+        return []
+    
+    # Candidate slots (excluding the requested one, which is the slot that had no availability)
+    now = datetime.now()
+    opening_hours = {}
+    candidates = []
+    for day_offset in range(-window_days, window_days + 1):
+        slot_date = base_date + timedelta(days=day_offset)
+        for hour_offset in range(-window_hours, window_hours + 1):
+            hour = hour_of_day + hour_offset
+            if (day_offset == 0 and hour_offset == 0) or not (0 <= hour <= 23):
+                continue
+            if hour not in opening_hours:
+                opening_hours[hour] = check_restaurant_hours(hour, language_code)[0]
+            if not opening_hours[hour]:
+                continue
+            if datetime(slot_date.year, slot_date.month, slot_date.day, hour) < now:
+                continue
+            candidates.append((abs(day_offset * 24 + hour_offset), day_offset * 24 + hour_offset, slot_date, hour))
+    
+    if not candidates:
+        return []
+    
+    # Nearest first; on equal distance the earlier slot wins (deterministic order)
+    candidates.sort(key=lambda candidate: (candidate[0], candidate[1]))
+    days = np.array([candidate[2].weekday() for candidate in candidates])
+    hours = np.array([candidate[3] for candidate in candidates])
+    # Only tables that seat the party, evaluated in one vectorized pass
+    tables = np.array(table_inventory.tables_for_party(guest_count))
+    available = availability_matrix(tables, guest_count, days, hours, language_code)
+    
+    slots = []
+    for index, (_, _, slot_date, hour) in enumerate(candidates):
+        free_tables = set(tables[available[:, index]].tolist())
+        free_tables -= occupancy_ledger.booked_tables(slot_date.isoformat(), int(hour), exclude_phone)
+        if not free_tables:
+            continue
+        slots.append({
+            'date': slot_date.isoformat(),
+            'date_readable': slot_date.strftime('%A, %B %d, %Y'),
+            'hour': int(hour),
+            'time_readable': format_time_readable(int(hour)),
+            'total_available': len(free_tables)
+        })
+        if len(slots) >= limit:
+            break
+    
+    print(f"🔧 DEBUG - find_next_available_slots: {len(candidates)} candidates, returning {slots}")
+    return slots
+
+
+def parse_party_mix(party_mix):
+    """
+    Normalize a party-size mix to {guests: weight} with weights summing to 1
+    Accepts a dict or a "guests:weight,..." string; raises ValueError when invalid
+    """
+    if isinstance(party_mix, str):
+        pairs = [item.split(':') for item in party_mix.split(',') if item.strip()]
+        party_mix = {int(guests): float(weight) for guests, weight in pairs}
+    
+    mix = {}
+    for guests, weight in party_mix.items():
+        guests, weight = int(guests), float(weight)
+        if not (1 <= guests <= GRID_SHAPE[1]):
+            raise ValueError(f"party size {guests} outside 1-{GRID_SHAPE[1]}")
+        if weight < 0:
+            raise ValueError(f"negative weight for party size {guests}")
+        mix[guests] = mix.get(guests, 0.0) + weight
+    
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("party mix has no weight")
+    return {guests: weight / total for guests, weight in sorted(mix.items())}
+
+
+# Demand forecasts of the active model version, keyed by party mix (cleared when the version changes)
+# Mixes come from clients (?mix=), so only the FORECAST_CACHE_SIZE most recently used ones are kept
+_forecast_cache = {'version': None, 'forecasts': OrderedDict()}
+_forecast_lock = threading.Lock()
+
+
+def forecast_demand(party_mix=None):
+    """
+    Expected number of occupied tables for every (weekday, hour) under a party-size mix:
+    expected[day, hour] = sum over tables t and party sizes g of mix[g] * P(occupied | t, g, day, hour)
+    Served from the grid's predict_proba tensor, or ONE predict_proba over the tables x mix input grid.
+    Memoized per model version (LRU of FORECAST_CACHE_SIZE mixes). Returns None when no model is loaded.
+    {'model_version', 'party_mix', 'tables', 'expected_occupied': float array (7, 24)}
+    """
+    global _forecast_cache
+    engine = active_engine
+    if engine is None or (engine['proba'] is None and engine['model'] is None and engine['forest'] is None):
+        return None
+    
+    mix = parse_party_mix(party_mix if party_mix is not None else FORECAST_PARTY_MIX)
+    mix_key = tuple(mix.items())
+    
+    with _forecast_lock:
+        cache = _forecast_cache
+        if cache['version'] != engine['version']:
+            cache = _forecast_cache = {'version': engine['version'], 'forecasts': OrderedDict()}
+        forecast = cache['forecasts'].get(mix_key)
+        if forecast is not None:
+            cache['forecasts'].move_to_end(mix_key)
+            return forecast
+    
+    start_time = time.perf_counter()
+    tables = np.array(table_inventory.table_numbers())
+    guests = np.array(list(mix))
+    weights = np.array(list(mix.values()))
+    
+    if engine['proba'] is not None:
+        # P(available)[table, guests, day, hour] straight from the precomputed tensor
+        p_available = engine['proba'][np.ix_(tables - 1, guests - 1)].astype(np.float64)
+    else:
+        input_data = np.indices((len(tables), len(guests), 7, 24)).reshape(4, -1).T
+        input_data[:, 0] = tables[input_data[:, 0]]
+        input_data[:, 1] = guests[input_data[:, 1]]
+        proba = predict_proba_rows(input_data, engine)
+        p_available = proba[:, list(model_classes(engine)).index(0)].reshape(len(tables), len(guests), 7, 24)
+    
+    expected = np.einsum('tgdh,g->dh', 1.0 - p_available, weights)
+    
+    forecast = {
+        'model_version': engine['version'],
+        'party_mix': mix,
+        'tables': len(tables),
+        'expected_occupied': expected
+    }
+    with _forecast_lock:
+        cache['forecasts'][mix_key] = forecast
+        cache['forecasts'].move_to_end(mix_key)
+        while len(cache['forecasts']) > FORECAST_CACHE_SIZE:
+            cache['forecasts'].popitem(last=False)
+    print(f"🔧 DEBUG - Demand forecast computed in {(time.perf_counter() - start_time) * 1000:.1f}ms for mix {mix}")
+    return forecast
+
+
 def get_model_status():
     """Return the status of the ML model"""
-    global model_loaded, model
-    status = model_loaded and model is not None
+    status = _engine_available()
     print(f"🔧 DEBUG - get_model_status: {status}")
     return status
 
@@ -199,6 +1191,8 @@ def get_model_status():
 def force_enable_availability():
     """Force enable availability for all tables (testing purposes)"""
     print("🔧 DEBUG - FORCING AVAILABILITY FOR ALL TABLES")
+    global force_available
+    force_available = True
     
     def always_available(*args, **kwargs):
         """Function that always returns True for availability"""
@@ -257,4 +1251,5 @@ def test_ml_model():
 
 # Automatic test on import if in debug mode
 if __name__ == "__main__":
+    wait_for_model()
     test_ml_model()
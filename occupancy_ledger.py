@@ -0,0 +1,197 @@
+"""
+In-memory occupancy ledger of confirmed reservations
+Keyed by (date, hour, table) so availability checks never need to scan Google Sheets
+"""
+import threading
+
+from datetime_utils import parse_reservation_date, convert_time_to_hour_improved
+from phone_utils import canonical_phone
+
+# (date ISO string, hour, table) -> phone number of the booking guest
+_bookings = {}
+# (date ISO string, hour) -> {table: phone} - lets one slot be read without scanning all tables
+_slots = {}
+_lock = threading.RLock()
+
+ledger_state = {'loaded': False, 'loading': False, 'error': None, 'bookings': 0}
+
+# Callbacks notified with the date (ISO string) of every booking change, e.g. to invalidate availability caches
+_change_listeners = []
+
+
+def slot_key(date, time_or_hour):
+    """Normalize a reservation date and time (any supported format) to a (date, hour) slot"""
+    parsed_date = parse_reservation_date(date)
+    if parsed_date is None:
+        return None
+    
+    if isinstance(time_or_hour, int):
+        hour = time_or_hour
+    else:
+        hour = convert_time_to_hour_improved(time_or_hour)
+    
+    return parsed_date.isoformat(), hour
+
+
+def add_change_listener(callback):
+    """Register callback(date_iso) to be called whenever a booking on that date is added or removed"""
+    _change_listeners.append(callback)
+
+
+def _notify_change(date_iso):
+    """Tell listeners that bookings on a date changed (lock must be held; listeners must be quick)"""
+    for callback in _change_listeners:
+        try:
+            callback(date_iso)
+        except Exception as e:
+            print(f"⚠️ LEDGER - Change listener failed: {e}")
+
+
+def _add(slot, table, phone):
+    """Add a booking (lock must be held)"""
+    _bookings[slot + (table,)] = phone
+    _slots.setdefault(slot, {})[table] = phone
+    _notify_change(slot[0])
+
+
+def _remove(slot, table, phone=None):
+    """Remove a booking, optionally only if it belongs to phone (lock must be held)"""
+    key = slot + (table,)
+    if key not in _bookings or (phone is not None and _bookings[key] != phone):
+        return False
+    del _bookings[key]
+    tables = _slots.get(slot)
+    if tables is not None:
+        tables.pop(table, None)
+        if not tables:
+            del _slots[slot]
+    _notify_change(slot[0])
+    return True
+
+
+def is_booked(date, time_or_hour, table, exclude_phone=None):
+    """O(1) check whether a table is booked for a slot (ignoring bookings of exclude_phone)"""
+    slot = slot_key(date, time_or_hour)
+    if slot is None:
+        return False
+    with _lock:
+        phone = _bookings.get(slot + (int(table),))
+    return phone is not None and phone != canonical_phone(exclude_phone)
+
+
+def booked_tables(date, time_or_hour, exclude_phone=None):
+    """Set of tables booked for a slot (ignoring bookings of exclude_phone)"""
+    slot = slot_key(date, time_or_hour)
+    if slot is None:
+        return set()
+    exclude_phone = canonical_phone(exclude_phone)
+    with _lock:
+        tables = _slots.get(slot, {})
+        return {table for table, phone in tables.items() if phone != exclude_phone}
+
+
+def claim_table(date, time_or_hour, table, phone):
+    """
+    Atomically book a table if it is free (or already held by the same phone)
+    Returns False when another guest got the table first
+    """
+    slot = slot_key(date, time_or_hour)
+    if slot is None or table is None:
+        return True  # Unparseable slot - nothing to protect, let the booking through
+    
+    phone = canonical_phone(phone)
+    with _lock:
+        current = _bookings.get(slot + (int(table),))
+        if current is not None and current != phone:
+            print(f"⚠️ LEDGER - Table {table} already booked for {slot}")
+            return False
+        _add(slot, int(table), phone)
+        ledger_state['bookings'] = len(_bookings)
+    print(f"📒 LEDGER - Booked table {table} for {slot}")
+    return True
+
+
+def release_table(date, time_or_hour, table, phone=None):
+    """Remove a booking (on cancellation); returns True if one was removed"""
+    slot = slot_key(date, time_or_hour)
+    if slot is None or table in (None, ''):
+        return False
+    
+    with _lock:
+        removed = _remove(slot, int(table), canonical_phone(phone) if phone is not None else None)
+        ledger_state['bookings'] = len(_bookings)
+    if removed:
+        print(f"📒 LEDGER - Released table {table} for {slot}")
+    return removed
+
+
+def move_booking(phone, old_date, old_time, old_table, new_date, new_time, new_table):
+    """Atomically move a guest's booking to a new slot/table (on modification)"""
+    old_slot = slot_key(old_date, old_time)
+    new_slot = slot_key(new_date, new_time)
+    phone = canonical_phone(phone)
+    
+    with _lock:
+        if new_slot is not None and new_table not in (None, ''):
+            current = _bookings.get(new_slot + (int(new_table),))
+            if current is not None and current != phone:
+                print(f"⚠️ LEDGER - Table {new_table} already booked for {new_slot}")
+                return False
+        if old_slot is not None and old_table not in (None, ''):
+            _remove(old_slot, int(old_table), phone)
+        if new_slot is not None and new_table not in (None, ''):
+            _add(new_slot, int(new_table), phone)
+        ledger_state['bookings'] = len(_bookings)
+    
+    print(f"📒 LEDGER - Moved booking {old_slot}/T{old_table} -> {new_slot}/T{new_table}")
+    return True
+
+
+def load_from_records(records):
+    """
+    Add confirmed reservations from the reservation store (Google Sheets records)
+    Bookings made while the store was being read are kept (records are merged, not replaced)
+    """
+    added = 0
+    with _lock:
+        for record in records:
+            try:
+                if str(record.get('Status', '')).strip() != 'Confirmed':
+                    continue
+                slot = slot_key(record.get('Date', ''), str(record.get('Time', '')))
+                table = record.get('Table', '')
+                if slot is None or table in (None, ''):
+                    continue
+                _add(slot, int(table), canonical_phone(record.get('Phone', '')))
+                added += 1
+            except (ValueError, TypeError) as e:
+                print(f"⚠️ LEDGER - Skipping unreadable reservation: {e}")
+        ledger_state['bookings'] = len(_bookings)
+    print(f"✅ LEDGER - Loaded {added} confirmed reservations")
+    return added
+
+
+def start_ledger_loading(records_loader):
+    """Build the ledger in a background thread from records_loader() (e.g. get_reservations_from_sheets)"""
+    def _load():
+        ledger_state['loading'] = True
+        try:
+            load_from_records(records_loader() or [])
+            ledger_state['loaded'] = True
+            ledger_state['error'] = None
+        except Exception as e:
+            ledger_state['error'] = str(e)
+            print(f"❌ LEDGER - Failed to load reservations: {e}")
+        finally:
+            ledger_state['loading'] = False
+    
+    loader_thread = threading.Thread(target=_load, name='ledger-loader')
+    loader_thread.daemon = True
+    loader_thread.start()
+    return loader_thread
+
+
+def get_ledger_state():
+    """Return ledger status for health endpoints"""
+    with _lock:
+        return dict(ledger_state, slots=len(_slots))
@@ -0,0 +1,309 @@
+"""
+Durable outbox for reservation side effects (storage writes and emails)
+Each side effect is journaled in a local SQLite database before the guest gets the confirmation,
+then executed by background workers with retries and exponential backoff.
+Every process (e.g. gunicorn worker) sharing the journal claims an entry with a lease before running it, so an
+entry runs in one process at a time; a lease left behind by a process that died is expired and the entry
+retried (at-least-once delivery).
+"""
+import json
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (
+    OUTBOX_DB_PATH, OUTBOX_WORKERS, OUTBOX_MAX_ATTEMPTS, OUTBOX_BACKOFF_BASE, OUTBOX_BACKOFF_MAX,
+    OUTBOX_LEASE_SECONDS
+)
+from email_manager import get_email_config, send_confirmation_email, send_admin_notification
+import reservation_storage
+from metrics_utils import percentile
+from sheets_manager import background_calls
+
+
+def _email_configured():
+    """Emails cannot be sent without SMTP credentials - retrying would not help"""
+    email_config = get_email_config()
+    return bool(email_config['email_user'] and email_config['email_password'])
+
+
+def _save_reservation(payload, language_code, attempt):
+    """Store a new reservation; a retry first checks whether the previous attempt already landed"""
+    if attempt > 0 and reservation_storage.check_existing_reservation(
+            payload['name'], payload['phone'], payload['date'], payload['time']):
+        print(f"🔧 DEBUG - Outbox: reservation of {payload['name']} already stored by an earlier attempt")
+        return True
+    return reservation_storage.save_reservation(payload, language_code)
+
+
+def _update_reservation(payload, language_code, attempt):
+    """Apply a modification ({'phone', 'date', 'time', 'updates'}) to a stored reservation"""
+    return reservation_storage.update_reservation_fields(
+        payload['phone'], payload['date'], payload['time'], payload['updates'], language_code)
+
+
+def _send_confirmation_email(payload, language_code, attempt):
+    if not _email_configured() or not payload.get('email'):
+        print("⚠️ Outbox: confirmation email skipped (no email configuration or address)")
+        return True
+    return send_confirmation_email(payload, language_code)
+
+
+def _send_admin_notification(payload, language_code, attempt):
+    if not _email_configured():
+        print("⚠️ Outbox: admin notification skipped (no email configuration)")
+        return True
+    return send_admin_notification(payload, language_code)
+
+
+# Side effect kind -> handler(payload, language_code, attempt) returning True once done
+HANDLERS = {
+    'save_reservation': _save_reservation,
+    'update_reservation': _update_reservation,
+    'confirmation_email': _send_confirmation_email,
+    'admin_notification': _send_admin_notification
+}
+
+
+class Outbox:
+    """
+    SQLite journal of pending side effects drained by a dispatcher thread and a small worker pool
+    An entry is claimed ('pending' -> 'in_flight' with a lease) by one process before it runs; it is deleted once
+    its handler succeeds, and after max_attempts failures it is kept as 'dead'
+    """
+
+    def __init__(self, path=OUTBOX_DB_PATH, workers=OUTBOX_WORKERS, max_attempts=OUTBOX_MAX_ATTEMPTS,
+                 backoff_base=OUTBOX_BACKOFF_BASE, backoff_max=OUTBOX_BACKOFF_MAX,
+                 lease_seconds=OUTBOX_LEASE_SECONDS, history=1000):
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._in_flight = set()  # Entries claimed by this process
+        self._thread = None
+        self._executor = None
+        self._next_lease_check = 0.0
+        self._delivery_latencies = deque(maxlen=history)  # ms from journaling to successful delivery
+        self._totals = {'recorded': 0, 'delivered': 0, 'retries': 0, 'dead': 0, 'replayed': 0}
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            if path != ':memory:':
+                self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    language_code TEXT NOT NULL DEFAULT 'en',
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_error TEXT,
+                    lease_until REAL
+                )''')
+            columns = [row[1] for row in self._conn.execute('PRAGMA table_info(outbox)')]
+            if 'lease_until' not in columns:
+                # Journal written before entries were leased
+                self._conn.execute('ALTER TABLE outbox ADD COLUMN lease_until REAL')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt_at)')
+
+    def record(self, effects, language_code='en'):
+        """Journal side effects [(kind, payload), ...] in one transaction; returns once they are on disk"""
+        now = time.time()
+        rows = []
+        for kind, payload in effects:
+            if kind not in HANDLERS:
+                raise ValueError(f"unknown outbox side effect '{kind}'")
+            rows.append((kind, json.dumps(payload), language_code, now, now))
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT INTO outbox (kind, payload, language_code, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?)',
+                rows)
+            self._totals['recorded'] += len(rows)
+        self._wakeup.set()
+
+    def start(self):
+        """Start the workers; entries left in flight by a process that stopped are retried"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            expired = self._expire_leases()
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='outbox-worker')
+            self._thread = threading.Thread(target=self._run, name='outbox-dispatcher')
+            self._thread.daemon = True
+            self._thread.start()
+        if expired:
+            print(f"🔄 Outbox: retrying {expired} side effect(s) left in flight in {self.path}")
+
+    def _expire_leases(self):
+        """Return entries whose lease ran out (their process died mid-run) to 'pending'; returns how many (lock held)"""
+        now = time.time()
+        self._next_lease_check = now + self.lease_seconds / 4
+        with self._conn:
+            # Counted as an attempt, so the handler checks whether the interrupted run already landed
+            expired = self._conn.execute(
+                "UPDATE outbox SET status = 'pending', attempts = attempts + 1, lease_until = NULL, "
+                "last_error = 'lease expired' WHERE status = 'in_flight' AND lease_until < ?", (now,)).rowcount
+        self._totals['replayed'] += expired
+        return expired
+
+    def _claim_due_entries(self):
+        """
+        Claim due pending entries for this process's idle workers, oldest first
+        The conditional UPDATE succeeds in one process only, so no entry runs twice concurrently
+        """
+        now = time.time()
+        with self._lock:
+            if now >= self._next_lease_check:
+                self._expire_leases()
+
+            claimed = []
+            idle = self.workers - len(self._in_flight)
+            if idle > 0:
+                # Delivered entries are deleted, so the pending journal stays small
+                rows = self._conn.execute(
+                    "SELECT id, kind, payload, language_code, attempts, created_at FROM outbox "
+                    "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?", (now, idle * 2)).fetchall()
+                for row in rows:
+                    if len(claimed) == idle:
+                        break
+                    with self._conn:
+                        cursor = self._conn.execute(
+                            "UPDATE outbox SET status = 'in_flight', lease_until = ? WHERE id = ? AND status = 'pending'",
+                            (now + self.lease_seconds, row[0]))
+                    if cursor.rowcount == 1:  # Otherwise another process claimed it first
+                        claimed.append(row)
+                        self._in_flight.add(row[0])
+
+            # Finishing workers wake the dispatcher, so only entries not yet due set the next wakeup
+            next_due = self._conn.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending' AND next_attempt_at > ?",
+                (now,)).fetchone()[0]
+        return claimed, next_due
+
+    def _run(self):
+        """Dispatcher loop: hand claimed entries to the worker pool, then sleep until the next one is due"""
+        while True:
+            self._wakeup.clear()
+            try:
+                due, next_due = self._claim_due_entries()
+            except Exception as e:
+                print(f"❌ Outbox: error reading the journal: {e}")
+                due, next_due = [], None
+
+            for entry in due:
+                self._executor.submit(self._execute, entry)
+
+            timeout = 1.0 if next_due is None else min(max(next_due - time.time(), 0.05), 1.0)
+            self._wakeup.wait(timeout)
+
+    def _execute(self, entry):
+        """Run one side effect and record the outcome"""
+        entry_id, kind, payload, language_code, attempts, created_at = entry
+        try:
+            try:
+                # Google Sheets calls made by side effects yield quota to interactive lookups
+                with background_calls():
+                    delivered = HANDLERS[kind](json.loads(payload), language_code, attempts)
+                error = None if delivered else 'handler reported failure'
+            except Exception as e:
+                delivered, error = False, str(e)
+
+            with self._lock, self._conn:
+                if delivered:
+                    self._conn.execute('DELETE FROM outbox WHERE id = ?', (entry_id,))
+                    self._totals['delivered'] += 1
+                    self._delivery_latencies.append((time.time() - created_at) * 1000)
+                elif attempts + 1 >= self.max_attempts:
+                    self._conn.execute("UPDATE outbox SET status = 'dead', attempts = ?, lease_until = NULL, "
+                                       "last_error = ? WHERE id = ?", (attempts + 1, error, entry_id))
+                    self._totals['dead'] += 1
+                else:
+                    # Exponential backoff with full jitter, capped at backoff_max
+                    delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempts))
+                    self._conn.execute("UPDATE outbox SET status = 'pending', attempts = ?, next_attempt_at = ?, "
+                                       "lease_until = NULL, last_error = ? WHERE id = ?",
+                                       (attempts + 1, time.time() + delay, error, entry_id))
+                    self._totals['retries'] += 1
+
+            if delivered:
+                print(f"✅ Outbox: {kind} delivered (entry {entry_id})")
+            elif attempts + 1 >= self.max_attempts:
+                print(f"❌ Outbox: {kind} gave up after {attempts + 1} attempts (entry {entry_id}): {error}")
+            else:
+                print(f"⚠️ Outbox: {kind} failed (entry {entry_id}, attempt {attempts + 1}), retrying: {error}")
+        except Exception as e:
+            print(f"❌ Outbox: error recording the outcome of entry {entry_id}: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(entry_id)
+            self._wakeup.set()
+
+    def get_metrics(self):
+        """Journal depth, delivery counters and latency for the /metrics endpoint"""
+        with self._lock:
+            counts = dict(self._conn.execute('SELECT status, COUNT(*) FROM outbox GROUP BY status').fetchall())
+            oldest = self._conn.execute("SELECT MIN(created_at) FROM outbox WHERE status = 'pending'").fetchone()[0]
+            latencies = list(self._delivery_latencies)
+            metrics = dict(self._totals)
+            in_flight = len(self._in_flight)
+
+        metrics.update({
+            'running': self._thread is not None,
+            'pending': counts.get('pending', 0),
+            'dead_entries': counts.get('dead', 0),
+            'in_flight': in_flight,
+            'leased': counts.get('in_flight', 0),  # Running in any process sharing the journal
+            'oldest_pending_age': round(time.time() - oldest, 1) if oldest is not None else None,
+            'delivery_latency_ms_p50': percentile(latencies, 50),
+            'delivery_latency_ms_p99': percentile(latencies, 99)
+        })
+        return metrics
+
+
+# Process-wide outbox (workers are started by the application with start_outbox)
+outbox = Outbox()
+
+
+def start_outbox():
+    """Start draining the outbox, retrying what a stopped process left in flight"""
+    outbox.start()
+
+
+def record_side_effects(effects, language_code='en'):
+    """
+    Journal side effects [(kind, payload), ...] before the guest is answered
+    If the journal cannot be written they are run in a background thread instead (best effort, as before)
+    """
+    try:
+        outbox.record(effects, language_code)
+        return True
+    except Exception as e:
+        print(f"❌ Outbox unavailable, running side effects in the background: {e}")
+
+        def run_directly():
+            for kind, payload in effects:
+                try:
+                    HANDLERS[kind](payload, language_code, 0)
+                except Exception as error:
+                    print(f"❌ Background {kind} failed: {error}")
+
+        bg_thread = threading.Thread(target=run_directly)
+        bg_thread.daemon = True
+        bg_thread.start()
+        return False
+
+
+def get_outbox_metrics():
+    """Outbox metrics for the /metrics endpoint"""
+    return outbox.get_metrics()
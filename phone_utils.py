@@ -0,0 +1,30 @@
+"""
+Utility functions for phone number canonicalization
+Every phone number is stored and matched in E.164 form ("+94771234567"), so "077 123 4567",
+"+94 77 123 4567", "0094771234567" and a sheet cell read back as 771234567 all identify the same guest
+"""
+from functools import lru_cache
+
+from config import PHONE_DEFAULT_COUNTRY_CODE, PHONE_NATIONAL_DIGITS
+
+
+@lru_cache(maxsize=65536)
+def canonical_phone(phone):
+    """E.164 form of a phone number ('' when it has no digits); the default country code fills in local numbers"""
+    if phone is None:
+        return ''
+    text = str(phone).strip()
+    digits = ''.join(char for char in text if char.isdigit())
+    if not digits:
+        return ''
+    
+    if text.startswith('+'):
+        return '+' + digits
+    if digits.startswith('00'):
+        # International dialing prefix
+        return '+' + digits[2:]
+    if digits.startswith(PHONE_DEFAULT_COUNTRY_CODE) and len(digits) == len(PHONE_DEFAULT_COUNTRY_CODE) + PHONE_NATIONAL_DIGITS:
+        # Country code without the plus (also how a "+94..." cell comes back from numericised sheet reads)
+        return '+' + digits
+    # Local number: drop the trunk prefix 0 (already missing when the sheet read it as a number)
+    return '+' + PHONE_DEFAULT_COUNTRY_CODE + digits.lstrip('0')
@@ -15,19 +15,20 @@ from datetime_utils import (
     format_date_readable, 
     format_time_readable
 )
-from sheets_manager import (
-    save_reservation_to_sheets,
+from reservation_storage import (
     check_existing_reservation,
     get_user_reservations,
-    update_reservation_field,
-    delete_reservation_from_sheets
+    delete_reservation
 )
+import table_inventory
 from ml_utils import (
     find_available_table,
+    find_next_available_slots,
     check_table_availability,
     get_model_status
 )
-from email_manager import send_confirmation_email, send_admin_notification
+from outbox import record_side_effects
+from occupancy_ledger import claim_table, release_table, move_booking
 
 def log_function_entry(func_name, parameters):
     """Standardized logging for function entry"""
@@ -183,7 +184,8 @@ def handle_modify_reservation_date(parameters, language_code='en'):
             print(f"📊 Parsed: day_of_week={day_of_week}, hour_of_day={hour_of_day}")
             
             print("🔄 6b. Finding available table...")
-            result, avail_ok = safe_operation("find_available_table", find_available_table, int(guests), day_of_week, hour_of_day, language_code)
+            result, avail_ok = safe_operation("find_available_table", find_available_table, int(guests), day_of_week, hour_of_day, language_code,
+                                              date=formatted_new_date, exclude_phone=reservation.get('Phone', phone))
             
             if not avail_ok or not result or not result.get('available'):
                 response = f"Sorry, we don't have availability for {guests} guests on {formatted_new_date} at {old_time}. Please try a different date or time."
@@ -199,6 +201,14 @@ def handle_modify_reservation_date(parameters, language_code='en'):
         # 🆕 IMMEDIATE CONFIRMATION AFTER VALIDATION
         print("🔄 PHASE 6c: Sending immediate confirmation...")
         new_table = result['table_number']
+        
+        # Move the booking in the occupancy ledger (fails if another guest just took the table)
+        if not move_booking(reservation.get('Phone', phone), old_date, old_time, reservation.get('Table', ''),
+                            formatted_new_date, hour_of_day, new_table):
+            response = f"Sorry, we don't have availability for {guests} guests on {formatted_new_date} at {old_time}. Please try a different date or time."
+            log_function_exit("handle_modify_reservation_date", response, False)
+            return jsonify({'fulfillmentText': response})
+        
         immediate_response = f"✅ Date change confirmed! Your reservation will be updated to {formatted_new_date} and you'll be assigned to Table {new_table}. Processing the changes now..."
         print(f"📤 Immediate confirmation: {immediate_response}")
         
@@ -206,35 +216,12 @@ def handle_modify_reservation_date(parameters, language_code='en'):
         response_json = {'fulfillmentText': immediate_response}
         print(f"🚀 Sending immediate confirmation to user...")
         
-        # Return immediate confirmation - database updates can happen in background
-        print("🔄 PHASE 7: Background database updates...")
-        
-        # Schedule background database updates (optional - for data consistency)
-        def update_reservation_background():
-            try:
-                print("🔄 7a. Background: Updating date...")
-                date_updated, date_update_ok = safe_operation(
-                    "update_date", 
-                    update_reservation_field, 
-                    phone, old_date, old_time, 'date', formatted_new_date, language_code
-                )
-                
-                print("🔄 7b. Background: Updating table...")
-                table_updated, table_update_ok = safe_operation(
-                    "update_table", 
-                    update_reservation_field, 
-                    phone, formatted_new_date, old_time, 'table', new_table, language_code
-                )
-                
-                print(f"📊 Background update results: date_updated={date_updated}, table_updated={table_updated}")
-            except Exception as e:
-                print(f"❌ Background update failed: {e}")
-        
-        # Start background update thread
-        import threading
-        bg_thread = threading.Thread(target=update_reservation_background)
-        bg_thread.daemon = True
-        bg_thread.start()
+        # Return immediate confirmation - the storage update is journaled and applied in the background
+        print("🔄 PHASE 7: Recording the reservation update in the outbox...")
+        record_side_effects([
+            ('update_reservation', {'phone': phone, 'date': old_date, 'time': old_time,
+                                    'updates': {'date': formatted_new_date, 'table': new_table}})
+        ], language_code)
         
         # Return immediate confirmation
         log_function_exit("handle_modify_reservation_date", immediate_response, True)
@@ -327,7 +314,8 @@ def handle_modify_reservation_time(parameters, language_code='en'):
                 print(f"⚠️ Using fallback time format: {formatted_new_time}")
             
             print("🔄 5c. Finding available table...")
-            result, avail_ok = safe_operation("find_available_table", find_available_table, int(guests), day_of_week, hour_of_day, language_code)
+            result, avail_ok = safe_operation("find_available_table", find_available_table, int(guests), day_of_week, hour_of_day, language_code,
+                                              date=old_date, exclude_phone=reservation.get('Phone', phone))
             
             if not avail_ok or not result or not result.get('available'):
                 response = f"Sorry, we don't have availability for {guests} guests on {old_date} at {formatted_new_time}. Please try a different time."
@@ -343,6 +331,14 @@ def handle_modify_reservation_time(parameters, language_code='en'):
         # 🆕 IMMEDIATE CONFIRMATION AFTER VALIDATION
         print("🔄 PHASE 5d: Sending immediate confirmation...")
         new_table = result['table_number']
+        
+        # Move the booking in the occupancy ledger (fails if another guest just took the table)
+        if not move_booking(reservation.get('Phone', phone), old_date, old_time, reservation.get('Table', ''),
+                            old_date, hour_of_day, new_table):
+            response = f"Sorry, we don't have availability for {guests} guests on {old_date} at {formatted_new_time}. Please try a different time."
+            log_function_exit("handle_modify_reservation_time", response, False)
+            return jsonify({'fulfillmentText': response})
+        
         immediate_response = f"✅ Time change confirmed! Your reservation will be updated to {formatted_new_time} and you'll be assigned to Table {new_table}. Processing the changes now..."
         print(f"📤 Immediate confirmation: {immediate_response}")
         
@@ -350,35 +346,12 @@ def handle_modify_reservation_time(parameters, language_code='en'):
         response_json = {'fulfillmentText': immediate_response}
         print(f"🚀 Sending immediate confirmation to user...")
         
-        # Return immediate confirmation - database updates can happen in background
-        print("🔄 PHASE 6: Background database updates...")
-        
-        # Schedule background database updates (optional - for data consistency)
-        def update_reservation_background():
-            try:
-                print("🔄 6a. Background: Updating time...")
-                time_updated, time_update_ok = safe_operation(
-                    "update_time", 
-                    update_reservation_field, 
-                    phone, old_date, old_time, 'time', formatted_new_time, language_code
-                )
-                
-                print("🔄 6b. Background: Updating table...")
-                table_updated, table_update_ok = safe_operation(
-                    "update_table", 
-                    update_reservation_field, 
-                    phone, old_date, formatted_new_time, 'table', new_table, language_code
-                )
-                
-                print(f"📊 Background update results: time_updated={time_updated}, table_updated={table_updated}")
-            except Exception as e:
-                print(f"❌ Background update failed: {e}")
-        
-        # Start background update thread
-        import threading
-        bg_thread = threading.Thread(target=update_reservation_background)
-        bg_thread.daemon = True
-        bg_thread.start()
+        # Return immediate confirmation - the storage update is journaled and applied in the background
+        print("🔄 PHASE 6: Recording the reservation update in the outbox...")
+        record_side_effects([
+            ('update_reservation', {'phone': phone, 'date': old_date, 'time': old_time,
+                                    'updates': {'time': formatted_new_time, 'table': new_table}})
+        ], language_code)
         
         # Return immediate confirmation
         log_function_exit("handle_modify_reservation_time", immediate_response, True)
@@ -413,12 +386,13 @@ def handle_make_reservation(parameters, language_code='en'):
             guest_count = int(float(guest_str)) if guest_str else 2
             
             # Validate guest count range
-            if guest_count < 1 or guest_count > 20:
+            max_guests = table_inventory.max_party_size()
+            if guest_count < 1 or guest_count > max_guests:
                 try:
                     from translations import get_text
                     response = get_text('valid_guest_count', language_code)
                 except:
-                    response = f"I can accommodate between 1 and 20 guests. You requested {guest_count} guests."
+                    response = f"I can accommodate between 1 and {max_guests} guests. You requested {guest_count} guests."
                 print(f"🔧 DEBUG - Returning: {response}")
                 return jsonify({'fulfillmentText': response})
                 
@@ -496,10 +470,17 @@ def handle_make_reservation(parameters, language_code='en'):
         
         # Check availability (now that we know the time is valid)
         try:
-            result = find_available_table(guest_count, day_of_week, hour_of_day, language_code)
+            result = find_available_table(guest_count, day_of_week, hour_of_day, language_code, date=formatted_date)
             
             if not result['available']:
-                response = f"😔 Sorry, we don't have availability for {guest_count} guests on {formatted_date} at {formatted_time}. Please try a different time within our hours (9 AM - 9 PM)."
+                # Offer the nearest open slots instead of making the guest retry hour by hour
+                alternatives = find_next_available_slots(guest_count, date, hour_of_day, window_hours=3, window_days=1,
+                                                         limit=3, language_code=language_code)
+                if alternatives:
+                    options = "; ".join(f"{slot['date_readable']} at {slot['time_readable']}" for slot in alternatives)
+                    response = f"😔 Sorry, we don't have availability for {guest_count} guests on {formatted_date} at {formatted_time}. The nearest available times are: {options}. Would you like one of these?"
+                else:
+                    response = f"😔 Sorry, we don't have availability for {guest_count} guests on {formatted_date} at {formatted_time}. Please try a different time within our hours (9 AM - 9 PM)."
                 print(f"🔧 DEBUG - Returning: {response}")
                 return jsonify({'fulfillmentText': response})
                 
@@ -508,8 +489,20 @@ def handle_make_reservation(parameters, language_code='en'):
             # Fallback: assign table 1 and proceed
             result = {'available': True, 'table_number': 1}
         
-        # Save reservation
+        # Book the table in the occupancy ledger - if another guest took it meanwhile, pick again once
         table_num = result['table_number']
+        try:
+            if not claim_table(formatted_date, hour_of_day, table_num, phone):
+                result = find_available_table(guest_count, day_of_week, hour_of_day, language_code, date=formatted_date)
+                if not result['available'] or not claim_table(formatted_date, hour_of_day, result['table_number'], phone):
+                    response = f"😔 Sorry, we don't have availability for {guest_count} guests on {formatted_date} at {formatted_time}. Please try a different time within our hours (9 AM - 9 PM)."
+                    print(f"🔧 DEBUG - Returning: {response}")
+                    return jsonify({'fulfillmentText': response})
+                table_num = result['table_number']
+        except Exception as e:
+            print(f"❌ Error updating occupancy ledger: {e}")
+        
+        # Save reservation
         reservation_data = {
             'name': str(name).strip(),
             'phone': str(phone).strip(),
@@ -533,32 +526,14 @@ def handle_make_reservation(parameters, language_code='en'):
         
         print(f"🔧 DEBUG - Returning SUCCESS: {response}")
         
-        # Save to Google Sheets and send emails in background (doesn't block response)
-        try:
-            import threading
-            def background_tasks():
-                try:
-                    # Save to sheets
-                    print("📊 Background: Saving to Google Sheets...")
-                    sheets_saved = save_reservation_to_sheets(reservation_data, language_code)
-                    print(f"📊 Background: Sheets saved = {sheets_saved}")
-                    
-                    # Send emails
-                    print("📧 Background: Sending emails...")
-                    send_confirmation_email(reservation_data, language_code)
-                    send_admin_notification(reservation_data, language_code)
-                    print("📧 Background: Emails sent successfully")
-                except Exception as e:
-                    print(f"❌ Background tasks failed: {e}")
-                    # In case of failure, at least the user got the confirmation
-                    # Staff can manually handle the reservation if needed
-            
-            bg_thread = threading.Thread(target=background_tasks)
-            bg_thread.daemon = True
-            bg_thread.start()
-        except:
-            # Even if background thread fails to start, user gets confirmation
-            pass
+        # Journal the storage write and emails in the durable outbox before answering;
+        # the outbox workers perform them in the background (with retries, replayed after a restart)
+        print("📊 Recording reservation save and emails in the outbox...")
+        record_side_effects([
+            ('save_reservation', reservation_data),
+            ('confirmation_email', reservation_data),
+            ('admin_notification', reservation_data)
+        ], language_code)
         
         return jsonify({'fulfillmentText': response})
         
@@ -620,8 +595,9 @@ def handle_modify_reservation_guests(parameters, language_code='en'):
                 print(f"🔢 Converted string to number: {guest_count}")
             
             # Validate guest count range
-            if guest_count < 1 or guest_count > 20:
-                response = "I can accommodate between 1 and 20 guests. Please specify a valid number."
+            max_guests = table_inventory.max_party_size()
+            if guest_count < 1 or guest_count > max_guests:
+                response = f"I can accommodate between 1 and {max_guests} guests. Please specify a valid number."
                 log_function_exit("handle_modify_reservation_guests", response, False)
                 return jsonify({'fulfillmentText': response})
                 
@@ -673,7 +649,8 @@ def handle_modify_reservation_guests(parameters, language_code='en'):
             print(f"📊 Parsed: day_of_week={day_of_week}, hour_of_day={hour_of_day}")
             
             print("🔄 6b. Finding available table...")
-            result, avail_ok = safe_operation("find_available_table", find_available_table, guest_count, day_of_week, hour_of_day)
+            result, avail_ok = safe_operation("find_available_table", find_available_table, guest_count, day_of_week, hour_of_day,
+                                              date=old_date, exclude_phone=reservation.get('Phone', phone))
             
             if not avail_ok or not result or not result.get('available'):
                 response = f"Sorry, we don't have availability for {guest_count} guests on {old_date} at {old_time}. Please try a different time or date."
@@ -689,6 +666,14 @@ def handle_modify_reservation_guests(parameters, language_code='en'):
         # 🆕 IMMEDIATE CONFIRMATION AFTER VALIDATION
         print("🔄 PHASE 6c: Sending immediate confirmation...")
         new_table = result['table_number']
+        
+        # Move the booking in the occupancy ledger (fails if another guest just took the table)
+        if not move_booking(reservation.get('Phone', phone), old_date, old_time, reservation.get('Table', ''),
+                            old_date, hour_of_day, new_table):
+            response = f"Sorry, we don't have availability for {guest_count} guests on {old_date} at {old_time}. Please try a different time or date."
+            log_function_exit("handle_modify_reservation_guests", response, False)
+            return jsonify({'fulfillmentText': response})
+        
         immediate_response = f"✅ Guest count change confirmed! Your reservation will be updated to {guest_count} guests (was {old_guests}) and you'll be assigned to Table {new_table}. Processing the changes now..."
         print(f"📤 Immediate confirmation: {immediate_response}")
         
@@ -696,35 +681,12 @@ def handle_modify_reservation_guests(parameters, language_code='en'):
         response_json = {'fulfillmentText': immediate_response}
         print(f"🚀 Sending immediate confirmation to user...")
         
-        # Return immediate confirmation - database updates can happen in background
-        print("🔄 PHASE 7: Background database updates...")
-        
-        # Schedule background database updates (optional - for data consistency)
-        def update_reservation_background():
-            try:
-                print("🔄 7a. Background: Updating guest count...")
-                guests_updated, guests_update_ok = safe_operation(
-                    "update_guests", 
-                    update_reservation_field, 
-                    phone, old_date, old_time, 'guests', guest_count, language_code
-                )
-                
-                print("🔄 7b. Background: Updating table...")
-                table_updated, table_update_ok = safe_operation(
-                    "update_table", 
-                    update_reservation_field, 
-                    phone, old_date, old_time, 'table', new_table, language_code
-                )
-                
-                print(f"📊 Background update results: guests_updated={guests_updated}, table_updated={table_updated}")
-            except Exception as e:
-                print(f"❌ Background update failed: {e}")
-        
-        # Start background update thread
-        import threading
-        bg_thread = threading.Thread(target=update_reservation_background)
-        bg_thread.daemon = True
-        bg_thread.start()
+        # Return immediate confirmation - the storage update is journaled and applied in the background
+        print("🔄 PHASE 7: Recording the reservation update in the outbox...")
+        record_side_effects([
+            ('update_reservation', {'phone': phone, 'date': old_date, 'time': old_time,
+                                    'updates': {'guests': guest_count, 'table': new_table}})
+        ], language_code)
         
         # Return immediate confirmation
         log_function_exit("handle_modify_reservation_guests", immediate_response, True)
@@ -806,7 +768,13 @@ def handle_modify_reservation(parameters, language_code='en'):
 
 
 def handle_cancel_reservation(parameters, language_code='en'):
-    """Handle reservation cancellation request with multilingual support"""
+    """
+    Handle reservation cancellation request with multilingual support
+    When Google Sheets quota runs out, the delete gives up after SHEETS_INTERACTIVE_MAX_WAIT (TimeoutError, before
+    anything is written): delete_reservation returns False, the reservation stays booked and the guest gets the
+    "issue cancelling your reservation, please call us" reply, so cancelling again later is safe.
+    A lookup that times out with nothing cached for the phone returns no reservations ("couldn't find any")
+    """
     try:
         print(f"🔧 DEBUG - Cancel reservation parameters: {parameters}")
         
@@ -833,8 +801,8 @@ def handle_cancel_reservation(parameters, language_code='en'):
             # Single reservation - delete completely
             reservation = user_reservations[0]
             
-            # Delete the reservation from the sheet
-            success = delete_reservation_from_sheets(
+            # Delete the reservation from storage
+            success = delete_reservation(
                 phone, 
                 reservation.get('Date', ''), 
                 reservation.get('Time', ''),
@@ -842,6 +810,8 @@ def handle_cancel_reservation(parameters, language_code='en'):
             )
             
             if success:
+                # Free the table in the occupancy ledger
+                release_table(reservation.get('Date', ''), str(reservation.get('Time', '')), reservation.get('Table', ''))
                 response = f"✅ Reservation cancelled successfully! Your reservation for {reservation.get('Name', '')} on {reservation.get('Date', '')} at {reservation.get('Time', '')} for {reservation.get('Guests', '')} guests (Table {reservation.get('Table', '')}) has been removed. We're sorry to see you cancel. We hope to see you again soon!"
                 print(f"🔧 DEBUG - Returning SUCCESS: {response}")
                 return jsonify({'fulfillmentText': response})
@@ -928,7 +898,7 @@ def handle_check_table_specific(parameters, language_code='en'):
         # Convert table number
         try:
             if not table_number:
-                response = "Please specify which table number you'd like to check (1-20)."
+                response = f"Please specify which table number you'd like to check (1-{table_inventory.max_table_number()})."
                 print(f"🔧 DEBUG - Returning: {response}")
                 return jsonify({'fulfillmentText': response})
             
@@ -936,15 +906,15 @@ def handle_check_table_specific(parameters, language_code='en'):
             table_str = str(table_number).strip().lower().replace('table', '').replace('number', '').replace('#', '').strip()
             table_num = int(float(table_str))
             
-            # Validate table number range
-            if table_num < 1 or table_num > 20:
-                response = "Please specify a table number between 1 and 20."
+            # Validate the table against the floor plan
+            if not table_inventory.is_valid_table(table_num):
+                response = f"Please specify a table number between 1 and {table_inventory.max_table_number()}."
                 print(f"🔧 DEBUG - Returning: {response}")
                 return jsonify({'fulfillmentText': response})
                 
         except (ValueError, TypeError) as e:
             print(f"❌ Error converting table '{table_number}': {e}")
-            response = "Please provide a valid table number (1-20)."
+            response = f"Please provide a valid table number (1-{table_inventory.max_table_number()})."
             print(f"🔧 DEBUG - Returning: {response}")
             return jsonify({'fulfillmentText': response})
         
@@ -963,8 +933,9 @@ def handle_check_table_specific(parameters, language_code='en'):
                 print(f"❌ Hour validation failed: {error_message}")
                 return jsonify({'fulfillmentText': error_message})
             
-            # Check table availability using ML model
-            is_available = check_table_availability(table_num, 4, day_of_week, hour_of_day, language_code)  # Default 4 guests
+            # Check table availability using ML model (default 4 guests, capped at the table's capacity)
+            guest_count = min(4, table_inventory.get_table(table_num)['capacity'])
+            is_available = check_table_availability(table_num, guest_count, day_of_week, hour_of_day, language_code, date=date)
             
             # Format date and time for user-friendly response
             formatted_date = format_date_readable(date)
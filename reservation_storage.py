@@ -0,0 +1,341 @@
+"""
+Pluggable reservation storage
+One interface (save, find by phone, find by slot, update fields, delete, list by date) with two backends:
+Google Sheets (sheets_manager) and a local SQLite database with indexed lookups.
+The backend is selected with RESERVATION_STORAGE ('sheets' or 'sqlite').
+"""
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from config import RESERVATION_STORAGE, RESERVATION_DB_PATH
+import sheets_manager
+from phone_utils import canonical_phone
+
+# Record keys shared by every backend (the Google Sheets header row)
+RECORD_FIELDS = ['Timestamp', 'Name', 'Phone', 'Email', 'Guests', 'Date', 'Time', 'Table', 'Status']
+
+
+class ReservationStorage(ABC):
+    """
+    Interface implemented by every storage backend - records are dicts keyed by RECORD_FIELDS
+    A backend missing any of these methods cannot be instantiated
+    """
+    name = 'base'
+
+    @abstractmethod
+    def save(self, reservation_data):
+        """Store a new confirmed reservation ({'name', 'phone', 'email', 'guests', 'date', 'time', 'table'})"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def exists(self, name, phone, date, time):
+        """True when an identical confirmed reservation already exists"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def find_by_phone(self, phone):
+        """Confirmed reservations of a phone number"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def find_by_slot(self, date, time, table=None):
+        """Confirmed reservations at a date and time (optionally on one table)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def update_fields(self, phone, date, time, updates):
+        """Update fields ('date', 'time', 'guests', 'table') of the confirmed reservation at date/time"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, phone, date, time):
+        """Delete the confirmed reservation at date/time"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_by_date(self, date):
+        """Confirmed reservations on a date"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_all(self):
+        """Every stored reservation, any status"""
+        raise NotImplementedError
+
+
+class SheetsStorage(ReservationStorage):
+    """Google Sheets backend - delegates to sheets_manager (phone lookups are served by its cache)"""
+    name = 'sheets'
+
+    def save(self, reservation_data):
+        return sheets_manager.save_reservation_to_sheets(reservation_data)
+
+    def exists(self, name, phone, date, time):
+        return sheets_manager.check_existing_reservation(name, phone, date, time)
+
+    def find_by_phone(self, phone):
+        return sheets_manager.get_user_reservations(phone)
+
+    def find_by_slot(self, date, time, table=None):
+        return [record for record in self._confirmed()
+                if str(record.get('Date', '')).strip() == str(date).strip()
+                and str(record.get('Time', '')).strip() == str(time).strip()
+                and (table is None or str(record.get('Table', '')).strip() == str(table))]
+
+    def update_fields(self, phone, date, time, updates):
+        return sheets_manager.update_reservation_fields(phone, date, time, updates)
+
+    def delete(self, phone, date, time):
+        return sheets_manager.delete_reservation_from_sheets(phone, date, time)
+
+    def list_by_date(self, date):
+        return [record for record in self._confirmed() if str(record.get('Date', '')).strip() == str(date).strip()]
+
+    def list_all(self):
+        return sheets_manager.get_reservations_from_sheets()
+
+    def _confirmed(self):
+        """Full sheet download filtered to confirmed reservations"""
+        return [record for record in self.list_all() if str(record.get('Status', '')).strip() == 'Confirmed']
+
+
+class SQLiteStorage(ReservationStorage):
+    """Local SQLite backend with indexes on phone, date and (date, time, table)"""
+    name = 'sqlite'
+
+    # Reservation field -> column
+    FIELD_COLUMNS = {'date': 'date', 'time': 'time', 'guests': 'guests', 'table': 'table_number'}
+    # Schema version (PRAGMA user_version) from which phone_key holds the canonical E.164 phone number
+    PHONE_KEY_VERSION = 1
+
+    def __init__(self, path=RESERVATION_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            if path != ':memory:':
+                self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS reservations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    phone TEXT NOT NULL,
+                    phone_key TEXT NOT NULL,
+                    email TEXT,
+                    guests INTEGER,
+                    date TEXT NOT NULL,
+                    time TEXT NOT NULL,
+                    table_number INTEGER,
+                    status TEXT NOT NULL DEFAULT 'Confirmed'
+                )''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_reservations_phone ON reservations (phone_key, status)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_reservations_date ON reservations (date)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_reservations_slot ON reservations (date, time, table_number)')
+            self._migrate_phone_keys()
+        print(f"✅ SQLite reservation storage ready: {path}")
+
+    def _migrate_phone_keys(self):
+        """Re-key reservations stored before phone numbers were canonicalized (lock and transaction held)"""
+        if self._conn.execute('PRAGMA user_version').fetchone()[0] >= self.PHONE_KEY_VERSION:
+            return
+        rows = self._conn.execute('SELECT id, phone FROM reservations').fetchall()
+        self._conn.executemany('UPDATE reservations SET phone_key = ? WHERE id = ?',
+                               [(canonical_phone(row['phone']), row['id']) for row in rows])
+        self._conn.execute(f'PRAGMA user_version = {self.PHONE_KEY_VERSION}')
+        if rows:
+            print(f"🔧 DEBUG - Canonicalized the phone key of {len(rows)} stored reservations")
+
+    @staticmethod
+    def _record(row):
+        """Database row -> record with the Google Sheets keys"""
+        return {
+            'Timestamp': row['timestamp'],
+            'Name': row['name'],
+            'Phone': row['phone'],
+            'Email': row['email'],
+            'Guests': row['guests'],
+            'Date': row['date'],
+            'Time': row['time'],
+            'Table': row['table_number'],
+            'Status': row['status']
+        }
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return [self._record(row) for row in self._conn.execute(sql, params).fetchall()]
+
+    def _execute(self, sql, params=()):
+        """Run a write statement in its own transaction; returns the number of rows changed"""
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params).rowcount
+
+    def _confirmed_id(self, phone, date, time):
+        """SQL selecting the first confirmed reservation of a phone at date/time"""
+        return ("SELECT id FROM reservations WHERE phone_key = ? AND date = ? AND time = ? "
+                "AND status = 'Confirmed' ORDER BY id LIMIT 1",
+                (canonical_phone(phone), str(date).strip(), str(time).strip()))
+
+    def save(self, reservation_data):
+        try:
+            self._execute(
+                'INSERT INTO reservations (timestamp, name, phone, phone_key, email, guests, date, time, table_number, status) '
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'Confirmed')",
+                (datetime.now().strftime('%Y-%m-%d %H:%M:%S'), reservation_data['name'],
+                 canonical_phone(reservation_data['phone']) or str(reservation_data['phone']),
+                 canonical_phone(reservation_data['phone']), reservation_data.get('email', ''), reservation_data['guests'],
+                 str(reservation_data['date']).strip(), str(reservation_data['time']).strip(), reservation_data['table']))
+            print(f"✅ Reservation saved to SQLite: {reservation_data['name']}")
+            return True
+        except Exception as e:
+            print(f"❌ Error saving to SQLite: {e}")
+            return False
+
+    def exists(self, name, phone, date, time):
+        return bool(self._query(
+            "SELECT * FROM reservations WHERE phone_key = ? AND date = ? AND time = ? AND status = 'Confirmed' "
+            "AND lower(name) = lower(?) LIMIT 1",
+            (canonical_phone(phone), str(date).strip(), str(time).strip(), name)))
+
+    def find_by_phone(self, phone):
+        return self._query("SELECT * FROM reservations WHERE phone_key = ? AND status = 'Confirmed' ORDER BY id",
+                           (canonical_phone(phone),))
+
+    def find_by_slot(self, date, time, table=None):
+        if table is None:
+            return self._query("SELECT * FROM reservations WHERE date = ? AND time = ? AND status = 'Confirmed' ORDER BY id",
+                               (str(date).strip(), str(time).strip()))
+        return self._query("SELECT * FROM reservations WHERE date = ? AND time = ? AND table_number = ? "
+                           "AND status = 'Confirmed' ORDER BY id", (str(date).strip(), str(time).strip(), int(table)))
+
+    def update_fields(self, phone, date, time, updates):
+        unknown = [field for field in updates if field not in self.FIELD_COLUMNS]
+        if unknown or not updates:
+            print(f"❌ Cannot update reservation fields: {unknown or 'nothing to update'}")
+            return False
+
+        assignments = ', '.join(f'{self.FIELD_COLUMNS[field]} = ?' for field in updates)
+        select_sql, select_params = self._confirmed_id(phone, date, time)
+        changed = self._execute(f'UPDATE reservations SET {assignments} WHERE id = ({select_sql})',
+                                tuple(updates.values()) + select_params)
+        if changed:
+            print(f"✅ Updated {', '.join(f'{field}={value!r}' for field, value in updates.items())} for reservation {phone}")
+        else:
+            print(f"❌ Reservation not found for update: phone {phone}")
+        return bool(changed)
+
+    def delete(self, phone, date, time):
+        select_sql, select_params = self._confirmed_id(phone, date, time)
+        deleted = self._execute(f'DELETE FROM reservations WHERE id = ({select_sql})', select_params)
+        if deleted:
+            print(f"✅ Reservation deleted from SQLite: phone {phone}")
+        else:
+            print(f"❌ Reservation not found for deletion: phone {phone}")
+        return bool(deleted)
+
+    def list_by_date(self, date):
+        return self._query("SELECT * FROM reservations WHERE date = ? AND status = 'Confirmed' ORDER BY time, table_number",
+                           (str(date).strip(),))
+
+    def list_all(self):
+        return self._query('SELECT * FROM reservations ORDER BY id')
+
+
+# Available backends by RESERVATION_STORAGE name
+STORAGE_BACKENDS = {
+    'sheets': SheetsStorage,
+    'sqlite': SQLiteStorage
+}
+
+
+def create_storage(name):
+    """Instantiate a backend by name (falls back to Google Sheets for unknown names)"""
+    backend = STORAGE_BACKENDS.get(str(name).strip().lower())
+    if backend is None:
+        print(f"❌ Unknown RESERVATION_STORAGE '{name}', using Google Sheets")
+        backend = SheetsStorage
+    return backend()
+
+
+# Active backend
+storage = create_storage(RESERVATION_STORAGE)
+
+
+def set_storage(backend):
+    """Switch the active backend (a name or a ReservationStorage instance)"""
+    global storage
+    storage = create_storage(backend) if isinstance(backend, str) else backend
+    return storage
+
+
+# Backend-agnostic helpers used by the handlers
+
+def save_reservation(reservation_data, language_code='en'):
+    """Store a new confirmed reservation in the active backend"""
+    return storage.save(reservation_data)
+
+
+def check_existing_reservation(name, phone, date, time):
+    """Check if an identical reservation already exists"""
+    try:
+        return storage.exists(name, phone, date, time)
+    except Exception as e:
+        print(f"❌ Error checking for duplicates: {e}")
+        return False
+
+
+def get_user_reservations(phone_number, language_code='en'):
+    """Confirmed reservations of a phone number"""
+    try:
+        return storage.find_by_phone(phone_number)
+    except Exception as e:
+        print(f"❌ Error getting user reservations: {e}")
+        return []
+
+
+def update_reservation_fields(phone, old_date, old_time, updates, language_code='en'):
+    """Update several fields of one reservation at once"""
+    try:
+        return storage.update_fields(phone, old_date, old_time, updates)
+    except Exception as e:
+        print(f"❌ Error updating reservation fields: {e}")
+        return False
+
+
+def delete_reservation(phone, date, time, language_code='en'):
+    """Delete a reservation"""
+    try:
+        return storage.delete(phone, date, time)
+    except Exception as e:
+        print(f"❌ Error deleting reservation: {e}")
+        return False
+
+
+def find_reservations_by_slot(date, time, table=None):
+    """Confirmed reservations at a date and time"""
+    try:
+        return storage.find_by_slot(date, time, table)
+    except Exception as e:
+        print(f"❌ Error finding reservations by slot: {e}")
+        return []
+
+
+def list_reservations_by_date(date):
+    """Confirmed reservations on a date"""
+    try:
+        return storage.list_by_date(date)
+    except Exception as e:
+        print(f"❌ Error listing reservations by date: {e}")
+        return []
+
+
+def get_all_reservations():
+    """Every stored reservation (used to build the occupancy ledger)"""
+    try:
+        return storage.list_all()
+    except Exception as e:
+        print(f"❌ Error reading reservations: {e}")
+        return []
@@ -3,40 +3,114 @@ Google Sheets management for restaurant reservations
 """
 import os
 import json
+import heapq
+import itertools
+import queue
+import random
+import re
+import threading
+import time
+import zlib
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
 import gspread
+import google.auth.exceptions
+from gspread.utils import rowcol_to_a1, numericise_all
+import requests
+from google.auth.transport.requests import Request as GoogleAuthRequest
 from google.oauth2.service_account import Credentials
 from datetime import datetime
-from config import SCOPES, SHEET_ID
+from metrics_utils import percentile
+from phone_utils import canonical_phone
+from config import (
+    SCOPES, SHEET_ID, SHEETS_TOKEN_REFRESH_MARGIN, SHEETS_RECONNECT_BACKOFF, RESERVATION_CACHE_TTL,
+    SHEETS_APPEND_QUEUE, SHEETS_APPEND_FLUSH_MS, SHEETS_APPEND_MAX_ROWS, SHEETS_APPEND_QUEUE_SIZE,
+    SHEETS_SYNC_BLOCK_ROWS, SHEETS_SYNC_INTERVAL, SHEETS_READ_PER_MINUTE, SHEETS_WRITE_PER_MINUTE,
+    SHEETS_QUOTA_BURST, SHEETS_RATE_LIMIT_RETRIES, SHEETS_BACKOFF_BASE, SHEETS_BACKOFF_MAX,
+    SHEETS_INTERACTIVE_MAX_WAIT
+)
 
 
-def init_google_sheets():
-    """Initialize Google Sheets connection with improved error handling"""
+# Process-wide worksheet handle - created lazily, reused by every call and rebuilt only when it goes bad
+_sheet = None
+_credentials = None
+_client_lock = threading.RLock()
+_next_connect_attempt = 0.0
+
+# Read-through cache of confirmed reservations: hash index from canonical (E.164) phone number to reservations
+# Refreshed from the sheet after RESERVATION_CACHE_TTL seconds; our own writes update it in place (write-through)
+_reservation_cache = {'by_phone': {}, 'loaded_at': None, 'built_at': None}
+_cache_lock = threading.Lock()
+_cache_generation = 0  # Bumped by every write-through and invalidation
+_cache_writes = deque(maxlen=1000)  # Recent write-throughs (generation, phone key, update), re-applied to a racing refresh
+_cache_invalidated_at = 0  # Generation of the last invalidation (a refresh started before it is not trusted)
+reservation_cache_stats = {'hits': 0, 'misses': 0, 'refreshes': 0, 'refresh_errors': 0, 'write_throughs': 0,
+                           'stale_serves': 0}
+
+# Local mirror of the sheet values (columns A:I, header first), kept current by incremental syncs:
+# only the rows after the last ingested one are fetched, and edits/deletions are detected with a CRC per block of rows
+SHEET_COLUMNS = 9
+_mirror = {'rows': None, 'checksums': [], 'synced_at': None, 'next_verify': 0}
+sync_stats = {'syncs': 0, 'tail_rows': 0, 'full_resyncs': 0, 'checksum_mismatches': 0, 'errors': 0, 'stale_serves': 0}
+
+# Row-location index: (canonical phone, date, time) -> sheet row number of the confirmed reservation
+# Maintained across appends and delete_rows shifts; every use is verified with a single-row read
+_row_index = None
+_row_write_lock = threading.RLock()  # Serializes sheet writes with mirror/index maintenance (row numbers must not shift mid-write)
+row_index_stats = {'hits': 0, 'misses': 0, 'stale': 0, 'rebuilds': 0}
+
+# Connection health exposed through /metrics
+sheets_health = {
+    'connected': False,
+    'connected_at': None,
+    'connects': 0,
+    'connect_failures': 0,
+    'reconnects': 0,
+    'token_refreshes': 0,
+    'calls': 0,
+    'errors': 0,
+    'last_error': None,
+    'last_error_at': None,
+    'last_success_at': None
+}
+
+
+def _load_credentials():
+    """Build service account credentials from GOOGLE_CREDENTIALS or credentials.json (None if unavailable)"""
+    # First try environment variables (for production deployment)
+    google_credentials = os.environ.get('GOOGLE_CREDENTIALS')
+    
+    if google_credentials:
+        print("🔧 DEBUG - Found credentials in environment variable")
+        # Production: use environment variable containing service account JSON
+        try:
+            creds_dict = json.loads(google_credentials)
+            return Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
+        except json.JSONDecodeError as e:
+            print(f"❌ Invalid JSON in GOOGLE_CREDENTIALS: {e}")
+            return None
+    
+    print("🔧 DEBUG - Looking for local credentials.json file")
+    # Local development: use credentials file
+    if os.path.exists('credentials.json'):
+        print("🔧 DEBUG - credentials.json file found")
+        try:
+            return Credentials.from_service_account_file('credentials.json', scopes=SCOPES)
+        except Exception as e:
+            print(f"❌ Error loading credentials.json: {e}")
+            return None
+    
+    print("❌ No credentials found - Google Sheets disabled")
+    return None
+
+
+def _connect_google_sheets():
+    """Open a new connection to the reservations worksheet; returns (worksheet, credentials) or (None, None)"""
     try:
-        # First try environment variables (for production deployment)
-        google_credentials = os.environ.get('GOOGLE_CREDENTIALS')
-        
-        if google_credentials:
-            print("🔧 DEBUG - Found credentials in environment variable")
-            # Production: use environment variable containing service account JSON
-            try:
-                creds_dict = json.loads(google_credentials)
-                creds = Credentials.from_service_account_info(creds_dict, scopes=SCOPES)
-            except json.JSONDecodeError as e:
-                print(f"❌ Invalid JSON in GOOGLE_CREDENTIALS: {e}")
-                return None
-        else:
-            print("🔧 DEBUG - Looking for local credentials.json file")
-            # Local development: use credentials file
-            if os.path.exists('credentials.json'):
-                print("🔧 DEBUG - credentials.json file found")
-                try:
-                    creds = Credentials.from_service_account_file('credentials.json', scopes=SCOPES)
-                except Exception as e:
-                    print(f"❌ Error loading credentials.json: {e}")
-                    return None
-            else:
-                print("❌ No credentials found - Google Sheets disabled")
-                return None
+        creds = _load_credentials()
+        if creds is None:
+            return None, None
         
         print("🔧 DEBUG - Attempting to connect to Google Sheets...")
         # Authorize the client and open the spreadsheet with timeout handling
@@ -44,72 +118,914 @@ def init_google_sheets():
             client = gspread.authorize(creds)
             sheet = client.open_by_key(SHEET_ID).sheet1
             
-            # Test the connection by trying a simple operation
+            # Test the connection once, when the handle is created
             try:
-                # Try to get just the first row to test connection
-                test_read = sheet.get_all_values(f'A1:A1')
+                sheet.get_all_values('A1:A1')
                 print("✅ Google Sheets connected and tested successfully!")
-                return sheet
+                return sheet, creds
             except Exception as e:
                 print(f"❌ Google Sheets connection test failed: {e}")
-                return None
+                return None, None
                 
         except Exception as e:
             print(f"❌ Failed to authorize Google Sheets client: {e}")
-            return None
+            return None, None
         
     except Exception as e:
         print(f"❌ Google Sheets initialization error: {e}")
         print(f"🔧 DEBUG - Error type: {type(e)}")
         import traceback
         print(f"📚 Traceback: {traceback.format_exc()}")
-        return None
+        return None, None
 
 
-def save_reservation_to_sheets(reservation_data, language_code='en'):
-    """Save reservation data to Google Sheets with multilingual support"""
+def _refresh_token_if_expiring():
+    """Refresh the access token proactively when it expires within SHEETS_TOKEN_REFRESH_MARGIN (lock held)"""
+    expiry = getattr(_credentials, 'expiry', None)
+    if expiry is not None and (expiry - datetime.utcnow()).total_seconds() > SHEETS_TOKEN_REFRESH_MARGIN:
+        return
     try:
-        # Initialize connection to Google Sheets
+        _credentials.refresh(GoogleAuthRequest())
+        sheets_health['token_refreshes'] += 1
+        print(f"🔑 Google Sheets token refreshed (expires {_credentials.expiry})")
+    except Exception as e:
+        # The handle is unusable without a token - rebuild it on the next call
+        print(f"❌ Google Sheets token refresh failed: {e}")
+        invalidate_google_sheets(e)
+
+
+def init_google_sheets():
+    """
+    Return the shared Google Sheets worksheet handle (None when Sheets is unavailable)
+    The connection is created once and reused; failed connects are retried after SHEETS_RECONNECT_BACKOFF seconds
+    """
+    global _sheet, _credentials, _next_connect_attempt
+    
+    with _client_lock:
+        if _sheet is not None:
+            _refresh_token_if_expiring()
+        if _sheet is not None:
+            return _sheet
+        
+        if time.time() < _next_connect_attempt:
+            return None
+        
+        sheet, creds = _connect_google_sheets()
+        if sheet is None:
+            sheets_health['connect_failures'] += 1
+            _next_connect_attempt = time.time() + SHEETS_RECONNECT_BACKOFF
+            return None
+        
+        if sheets_health['connects']:
+            sheets_health['reconnects'] += 1
+        sheets_health['connects'] += 1
+        sheets_health['connected'] = True
+        sheets_health['connected_at'] = datetime.now().isoformat()
+        _sheet, _credentials = sheet, creds
+        return _sheet
+
+
+def invalidate_google_sheets(error=None):
+    """Drop the shared handle so the next call reconnects (after an auth or transport failure)"""
+    global _sheet, _credentials
+    
+    with _client_lock:
+        if _sheet is not None:
+            print(f"⚠️ Google Sheets connection reset: {error}")
+        _sheet = None
+        _credentials = None
+        sheets_health['connected'] = False
+
+
+def _is_connection_error(error):
+    """True for errors that mean the handle itself has gone bad (expired/revoked auth, broken transport)"""
+    if isinstance(error, (google.auth.exceptions.RefreshError, google.auth.exceptions.TransportError,
+                          requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(error, gspread.exceptions.APIError):
+        return getattr(error.response, 'status_code', None) == 401
+    return False
+
+
+def _is_auth_error(error):
+    """True for authentication failures (the request was rejected, so retrying cannot duplicate a write)"""
+    if isinstance(error, google.auth.exceptions.RefreshError):
+        return True
+    return isinstance(error, gspread.exceptions.APIError) and getattr(error.response, 'status_code', None) == 401
+
+
+def _is_rate_limited(error):
+    """True when Google rejected the request for exceeding the quota (nothing was written)"""
+    return isinstance(error, gspread.exceptions.APIError) and getattr(error.response, 'status_code', None) == 429
+
+
+# Call priorities: interactive lookups are served before background work (append flushes, outbox, syncs)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+_call_context = threading.local()
+
+
+@contextmanager
+def background_calls():
+    """Run the Google Sheets calls made inside the block (in this thread) at background priority"""
+    previous = getattr(_call_context, 'priority', PRIORITY_INTERACTIVE)
+    _call_context.priority = PRIORITY_BACKGROUND
+    try:
+        yield
+    finally:
+        _call_context.priority = previous
+
+
+class QuotaBucket:
+    """
+    Token bucket for one Google Sheets quota (reads or writes)
+    Callers wait in priority order for a token; a 429 pauses the whole bucket for a jittered backoff
+    """
+    
+    def __init__(self, name, per_minute, burst, history=1000):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        self._waiters = []  # heap of (priority, sequence)
+        self._sequence = itertools.count()
+        self._waits = {PRIORITY_INTERACTIVE: deque(maxlen=history), PRIORITY_BACKGROUND: deque(maxlen=history)}
+        self._totals = {'granted': 0, 'rate_limited': 0, 'backoff_seconds': 0.0, 'timeouts': 0}
+    
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def acquire(self, priority=PRIORITY_INTERACTIVE, timeout=None):
+        """Block until this caller is first in line and a token is available; False when timeout seconds pass first"""
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        with self._cond:
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiters, ticket)
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._waiters[0] == ticket and self._tokens >= 1 and now >= self._paused_until:
+                    heapq.heappop(self._waiters)
+                    self._tokens -= 1
+                    self._totals['granted'] += 1
+                    self._cond.notify_all()  # The next caller in line re-checks
+                    granted = True
+                    break
+                if deadline is not None and now >= deadline:
+                    self._waiters.remove(ticket)
+                    heapq.heapify(self._waiters)
+                    self._totals['timeouts'] += 1
+                    self._cond.notify_all()  # A caller behind may now be first in line
+                    granted = False
+                    break
+                # Time until the next token (or the end of a 429 pause); callers behind are woken by notify_all
+                delay = max((1 - self._tokens) / self.rate, self._paused_until - now, 0.01) if self._waiters[0] == ticket else None
+                if deadline is not None:
+                    delay = deadline - now if delay is None else min(delay, deadline - now)
+                self._cond.wait(delay)
+            self._waits[priority].append((time.monotonic() - started) * 1000)
+        return granted
+    
+    def release(self, tokens):
+        """Give back tokens that were taken ahead of time but not used"""
+        with self._cond:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + tokens)
+            self._cond.notify_all()
+    
+    def penalize(self, attempt):
+        """Pause the bucket after a 429: exponential backoff with jitter; returns the delay in seconds"""
+        delay = min(SHEETS_BACKOFF_MAX, SHEETS_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+        with self._cond:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + delay)
+            self._tokens = 0.0
+            self._updated = now
+            self._totals['rate_limited'] += 1
+            self._totals['backoff_seconds'] += delay
+            self._cond.notify_all()
+        return delay
+    
+    def get_metrics(self):
+        """Token level, queue length and wait-time percentiles per priority"""
+        with self._cond:
+            self._refill(time.monotonic())
+            metrics = dict(self._totals)
+            metrics['backoff_seconds'] = round(metrics['backoff_seconds'], 2)
+            waiting = [ticket[0] for ticket in self._waiters]
+            waits = {priority: list(values) for priority, values in self._waits.items()}
+            metrics.update({
+                'per_minute': self.rate * 60,
+                'burst': self.capacity,
+                'tokens': round(self._tokens, 2),
+                'paused_for': round(max(0.0, self._paused_until - time.monotonic()), 2)
+            })
+        for priority, label in ((PRIORITY_INTERACTIVE, 'interactive'), (PRIORITY_BACKGROUND, 'background')):
+            metrics[f'{label}_waiting'] = waiting.count(priority)
+            metrics[f'{label}_wait_ms_p50'] = percentile(waits[priority], 50)
+            metrics[f'{label}_wait_ms_p99'] = percentile(waits[priority], 99)
+        return metrics
+
+
+# Separate budgets for read and write requests (Google enforces them separately)
+quota_buckets = {
+    'read': QuotaBucket('read', SHEETS_READ_PER_MINUTE, SHEETS_QUOTA_BURST),
+    'write': QuotaBucket('write', SHEETS_WRITE_PER_MINUTE, SHEETS_QUOTA_BURST)
+}
+
+
+def _max_wait(priority):
+    """Longest quota wait of a caller: guest-facing (interactive) calls give up, background work waits its turn"""
+    return SHEETS_INTERACTIVE_MAX_WAIT if priority == PRIORITY_INTERACTIVE else None
+
+
+def sheets_call(operation, idempotent=True, write=False):
+    """
+    Run operation(worksheet) on the shared handle and record connection health
+    Every call first takes a token from the read or write quota bucket (interactive callers first, or a token
+    reserved by _sheet_section); a 429 pauses the bucket with jittered exponential backoff and the call is retried
+    After an auth or transport error the handle is rebuilt and the call retried once
+    (non-idempotent writes such as appends are only retried after auth errors)
+    Raises ConnectionError when Google Sheets is unavailable, TimeoutError when an interactive call
+    waits longer than SHEETS_INTERACTIVE_MAX_WAIT for quota
+    """
+    bucket = quota_buckets['write' if write else 'read']
+    priority = getattr(_call_context, 'priority', PRIORITY_INTERACTIVE)
+    reconnected = False
+    rate_limited = 0
+    
+    while True:
         sheet = init_google_sheets()
-        if not sheet:
-            print("❌ Unable to connect to Google Sheets")
-            return False
+        if sheet is None:
+            raise ConnectionError("Google Sheets not available")
+        
+        reserved = getattr(_call_context, 'reserved', None)
+        if reserved and reserved[bucket.name]:
+            reserved[bucket.name] -= 1
+        elif not bucket.acquire(priority, _max_wait(priority)):
+            raise TimeoutError(f"Google Sheets {bucket.name} quota not available within {SHEETS_INTERACTIVE_MAX_WAIT}s")
+        sheets_health['calls'] += 1
+        try:
+            result = operation(sheet)
+            sheets_health['last_success_at'] = datetime.now().isoformat()
+            return result
+        except Exception as e:
+            sheets_health['errors'] += 1
+            sheets_health['last_error'] = f"{type(e).__name__}: {e}"
+            sheets_health['last_error_at'] = datetime.now().isoformat()
+            
+            if _is_rate_limited(e):
+                # Rejected before anything was written, so even appends can be retried
+                if rate_limited >= SHEETS_RATE_LIMIT_RETRIES:
+                    raise
+                delay = bucket.penalize(rate_limited)
+                rate_limited += 1
+                print(f"⚠️ Google Sheets {bucket.name} quota exceeded, backing off {delay:.1f}s (retry {rate_limited})")
+                continue
+            
+            if not _is_connection_error(e):
+                raise
+            invalidate_google_sheets(e)
+            if reconnected or not (idempotent or _is_auth_error(e)):
+                raise
+            reconnected = True
+
+
+@contextmanager
+def _sheet_section(reads=0, writes=0):
+    """
+    Hold _row_write_lock for a sequence of sheet calls, taking their quota tokens BEFORE the lock
+    Waiting for quota inside the lock would make every other caller, interactive lookups included, queue behind
+    background work; only calls beyond the reserved ones (index misses, resyncs, 429 retries) wait inside
+    Interactive callers give up after SHEETS_INTERACTIVE_MAX_WAIT in total (TimeoutError); unused tokens are returned
+    """
+    if getattr(_call_context, 'reserved', None) is not None:
+        # Nested section: the outer one already holds the lock and the tokens
+        with _row_write_lock:
+            yield
+        return
+    
+    priority = getattr(_call_context, 'priority', PRIORITY_INTERACTIVE)
+    max_wait = _max_wait(priority)
+    deadline = None if max_wait is None else time.monotonic() + max_wait
+    
+    def remaining():
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+    
+    reserved = {'read': 0, 'write': 0}
+    try:
+        for name, count in (('read', reads), ('write', writes)):
+            for _ in range(count):
+                if not quota_buckets[name].acquire(priority, remaining()):
+                    raise TimeoutError(f"Google Sheets {name} quota not available within {max_wait}s")
+                reserved[name] += 1
+        wait = remaining()
+        if not _row_write_lock.acquire(timeout=-1 if wait is None else wait):
+            raise TimeoutError(f"Google Sheets busy with another write for more than {max_wait}s")
+        try:
+            _call_context.reserved = reserved
+            yield
+        finally:
+            _call_context.reserved = None
+            _row_write_lock.release()
+    finally:
+        for name, count in reserved.items():
+            if count:
+                quota_buckets[name].release(count)
+
+
+def get_quota_metrics():
+    """Quota scheduler state (tokens, waiting callers, wait times, 429 backoffs) for the /metrics endpoint"""
+    return {name: bucket.get_metrics() for name, bucket in quota_buckets.items()}
+
+
+def get_sheets_health():
+    """Google Sheets connection health for the /metrics endpoint"""
+    with _client_lock:
+        health = dict(sheets_health)
+        expiry = getattr(_credentials, 'expiry', None)
+    health['token_expires_in'] = round((expiry - datetime.utcnow()).total_seconds()) if expiry else None
+    return health
+
+
+def _fetch_all_records():
+    """Every record of the sheet after an incremental sync (raises on failure, unlike get_reservations_from_sheets)"""
+    requested_at = time.time()
+    with _sheet_section(reads=1):
+        synced_at = _mirror['synced_at']
+        if _mirror['rows'] is not None and synced_at is not None and synced_at >= requested_at:
+            # A concurrent refresh synced while this one waited for the lock - its token goes back unused
+            rows = list(_mirror['rows'])
+        else:
+            rows = list(sync_sheet())
+    return _mirror_records(rows)
+
+
+def _build_phone_index(records):
+    """Index confirmed reservations by canonical phone number (canonicalized once per row, here)"""
+    by_phone = {}
+    for record in records:
+        if str(record.get('Status', '')).strip() == 'Confirmed':
+            by_phone.setdefault(canonical_phone(record.get('Phone', '')), []).append(record)
+    return by_phone
+
+
+def _cached_reservations(phone):
+    """
+    Confirmed reservations of a phone number from the read-through cache
+    A stale or empty cache is refreshed with one sheet download; raises when the sheet cannot be read
+    """
+    key = canonical_phone(phone)
+    
+    with _cache_lock:
+        loaded_at = _reservation_cache['loaded_at']
+        if loaded_at is not None and time.time() - loaded_at < RESERVATION_CACHE_TTL:
+            reservation_cache_stats['hits'] += 1
+            return [dict(record) for record in _reservation_cache['by_phone'].get(key, [])]
+        reservation_cache_stats['misses'] += 1
+        generation = _cache_generation
+    
+    # Miss: download outside the lock so cache hits are never blocked by the sheet
+    try:
+        records = _fetch_all_records()
+    except Exception as e:
+        reservation_cache_stats['refresh_errors'] += 1
+        with _cache_lock:
+            if _reservation_cache['built_at'] is None:
+                raise
+            # Quota exhausted or sheet unreachable - an outdated answer beats no answer
+            reservation_cache_stats['stale_serves'] += 1
+            records = [dict(record) for record in _reservation_cache['by_phone'].get(key, [])]
+        print(f"⚠️ Reservation cache refresh failed, serving the previous index: {e}")
+        return records
+    by_phone = _build_phone_index(records)
+    
+    with _cache_lock:
+        reservation_cache_stats['refreshes'] += 1
+        # Writes made during the download may be missing from it - re-apply them (the updates are idempotent)
+        raced = [(write_key, update) for write_generation, write_key, update in _cache_writes
+                 if write_generation > generation]
+        for write_key, update in raced:
+            _apply_cache_update(by_phone, write_key, update)
+        if RESERVATION_CACHE_TTL > 0:
+            # Untrusted only after an invalidation or when more writes raced than the journal holds
+            trusted = _cache_invalidated_at <= generation and len(raced) == _cache_generation - generation
+            _reservation_cache['by_phone'] = by_phone
+            _reservation_cache['built_at'] = time.time()
+            _reservation_cache['loaded_at'] = time.time() if trusted else None
+    return [dict(record) for record in by_phone.get(key, [])]
+
+
+def _matches_slot(record, phone_key, date, time_value):
+    """True when a cached record is the reservation of phone_key at date/time"""
+    return (canonical_phone(record.get('Phone', '')) == phone_key and
+            str(record.get('Date', '')).strip() == str(date).strip() and
+            str(record.get('Time', '')).strip() == str(time_value).strip())
+
+
+def _apply_cache_update(by_phone, key, update):
+    """Replace the records of key in a phone index with update(records) (lock must be held)"""
+    records = update(list(by_phone.get(key, [])))
+    if records:
+        by_phone[key] = records
+    else:
+        by_phone.pop(key, None)
+
+
+def _cache_write_through(phone, update):
+    """
+    Apply update(list of the phone's cached records) to the cache after one of our own sheet writes
+    update must be idempotent: it is applied again to a refresh that was downloading while the write landed
+    """
+    global _cache_generation
+    
+    with _cache_lock:
+        _cache_generation += 1
+        reservation_cache_stats['write_throughs'] += 1
+        key = canonical_phone(phone)
+        _cache_writes.append((_cache_generation, key, update))
+        if _reservation_cache['loaded_at'] is None:
+            return
+        _apply_cache_update(_reservation_cache['by_phone'], key, update)
+
+
+def _cache_update_reservation(phone, date, time_value, changes):
+    """Write-through of updated fields ({'Date': ..., 'Table': ...}) of one reservation"""
+    key = canonical_phone(phone)
+    _cache_write_through(phone, lambda records: [
+        dict(record, **changes) if _matches_slot(record, key, date, time_value) else record for record in records
+    ])
+
+
+def _cache_remove_reservation(phone, date, time_value):
+    """Write-through of a reservation that is no longer confirmed (deleted or cancelled)"""
+    key = canonical_phone(phone)
+    _cache_write_through(phone, lambda records: [
+        record for record in records if not _matches_slot(record, key, date, time_value)
+    ])
+
+
+def invalidate_reservation_cache():
+    """Force the next lookup to re-read the sheet (e.g. after edits made directly in Google Sheets)"""
+    global _cache_generation, _cache_invalidated_at
+    with _cache_lock:
+        _cache_generation += 1
+        _cache_invalidated_at = _cache_generation
+        _reservation_cache['loaded_at'] = None
+
+
+def get_reservation_cache_metrics():
+    """Reservation cache hit/miss counters for the /metrics endpoint"""
+    with _cache_lock:
+        loaded_at = _reservation_cache['loaded_at']
+        return dict(
+            reservation_cache_stats,
+            ttl=RESERVATION_CACHE_TTL,
+            phones=len(_reservation_cache['by_phone']),
+            age=round(time.time() - loaded_at, 1) if loaded_at is not None else None
+        )
+
+
+def _row_key(phone, date, time_value):
+    """Row index key of a reservation"""
+    return canonical_phone(phone), str(date).strip(), str(time_value).strip()
+
+
+def _row_matches(row, key):
+    """True when sheet row values are the confirmed reservation identified by key"""
+    return (len(row) >= 9 and row[8].strip() == 'Confirmed' and          # Status column (I)
+            _row_key(row[2], row[5], row[6]) == key)                     # Phone (C), Date (F), Time (G)
+
+
+def _normalize_row(row):
+    """Sheet row as exactly SHEET_COLUMNS strings (range reads drop trailing blank cells)"""
+    row = [str(cell) for cell in row[:SHEET_COLUMNS]]
+    return row + [''] * (SHEET_COLUMNS - len(row))
+
+
+def _block_checksum(rows):
+    """CRC32 of a block of mirror rows"""
+    return zlib.crc32('\x1e'.join('\x1f'.join(row) for row in rows).encode('utf-8'))
+
+
+def _refresh_checksums(first_block):
+    """Recompute the checksums of every block from first_block on (lock must be held)"""
+    rows = _mirror['rows']
+    del _mirror['checksums'][first_block:]
+    for start in range(first_block * SHEETS_SYNC_BLOCK_ROWS, len(rows), SHEETS_SYNC_BLOCK_ROWS):
+        _mirror['checksums'].append(_block_checksum(rows[start:start + SHEETS_SYNC_BLOCK_ROWS]))
+
+
+def _index_new_rows(first_row, rows):
+    """Add confirmed reservations among rows (starting at sheet row first_row) to the row index (lock must be held)"""
+    if _row_index is None:
+        return
+    for offset, row in enumerate(rows):
+        if row[8].strip() == 'Confirmed':
+            _row_index.setdefault(_row_key(row[2], row[5], row[6]), first_row + offset)  # First match wins, like the old scans
+
+
+def _full_resync():
+    """Download the whole sheet into the mirror and rebuild the row index from it; returns the rows (lock must be held)"""
+    global _row_index
+    rows = [_normalize_row(row) for row in sheets_call(lambda sheet: sheet.get_all_values())]
+    _mirror.update(rows=rows, checksums=[], synced_at=time.time())
+    _refresh_checksums(0)
+    
+    _row_index = {}
+    _index_new_rows(1, rows)
+    row_index_stats['rebuilds'] += 1
+    sync_stats['full_resyncs'] += 1
+    print(f"🔧 DEBUG - Sheet mirror resynced: {len(rows)} rows, {len(_row_index)} confirmed reservations")
+    return rows
+
+
+def sync_sheet():
+    """
+    Bring the local mirror up to date and return its rows (lock held by the caller or taken here)
+    One batch_get reads the tail from the last ingested row on (that row is the anchor that detects deletions)
+    plus one block, in rotation, whose checksum detects edits; any disagreement triggers a full resync
+    Worst-case staleness for an edit made directly in the sheet to an older row: one full rotation, i.e.
+    len(checksums) syncs (syncs run on demand, at most every SHEETS_SYNC_INTERVAL seconds)
+    """
+    with _row_write_lock:
+        rows = _mirror['rows']
+        if not rows:
+            return _full_resync()
+        
+        verify_block = _mirror['next_verify'] % len(_mirror['checksums'])
+        _mirror['next_verify'] = verify_block + 1
+        block_start = verify_block * SHEETS_SYNC_BLOCK_ROWS
+        block_rows = len(rows[block_start:block_start + SHEETS_SYNC_BLOCK_ROWS])
+        ranges = [f'A{len(rows)}:I', f'A{block_start + 1}:I{block_start + block_rows}']
+        
+        try:
+            tail, block = sheets_call(lambda sheet: sheet.batch_get(ranges))
+        except Exception:
+            sync_stats['errors'] += 1
+            raise
+        tail = [_normalize_row(row) for row in tail]
+        # Rows appended since the last sync may fall inside the block range - only the known rows are compared
+        block = [_normalize_row(row) for row in block][:block_rows]
+        
+        if not tail or tail[0] != rows[-1] or _block_checksum(block) != _mirror['checksums'][verify_block]:
+            sync_stats['checksum_mismatches'] += 1
+            print("⚠️ Sheet mirror out of date (rows edited or deleted), full resync")
+            return _full_resync()
         
-        # Prepare data for the spreadsheet row
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        row_data = [
-            timestamp,                      # Column A: Timestamp
-            reservation_data['name'],       # Column B: Customer name
-            reservation_data['phone'],      # Column C: Phone number
-            reservation_data['email'],      # Column D: Email address
-            reservation_data['guests'],     # Column E: Number of guests
-            reservation_data['date'],       # Column F: Reservation date
-            reservation_data['time'],       # Column G: Reservation time
-            reservation_data['table'],      # Column H: Table assignment
-            'Confirmed'                     # Column I: Status
-        ]
+        new_rows = tail[1:]
+        if new_rows:
+            first_row = len(rows) + 1
+            rows.extend(new_rows)
+            _refresh_checksums((first_row - 1) // SHEETS_SYNC_BLOCK_ROWS)
+            _index_new_rows(first_row, new_rows)
+            sync_stats['tail_rows'] += len(new_rows)
+        
+        _mirror['synced_at'] = time.time()
+        sync_stats['syncs'] += 1
+        return rows
+
+
+def _synced_rows():
+    """
+    Copy of the mirror rows, synced first when older than SHEETS_SYNC_INTERVAL
+    Stale rows are served if the sync fails or has to wait too long for quota or for a write in progress
+    """
+    rows, synced_at = _mirror['rows'], _mirror['synced_at']
+    if rows is not None and synced_at is not None and time.time() - synced_at < SHEETS_SYNC_INTERVAL:
+        return list(rows)  # Copied without the lock: writers only append, delete or replace whole rows
+    try:
+        with _sheet_section(reads=1):
+            return list(sync_sheet())
+    except Exception as e:
+        rows = _mirror['rows']
+        if rows is None:
+            raise
+        sync_stats['stale_serves'] += 1
+        print(f"⚠️ Sheet sync failed, serving the local mirror: {e}")
+        return list(rows)
+
+
+def _mirror_records(rows):
+    """
+    Mirror rows as get_all_records() would return them (header keys, numeric strings converted),
+    except the phone column, which stays text so "+94..." and leading zeros survive
+    """
+    if not rows:
+        return []
+    header = rows[0]
+    return [dict(zip(header, numericise_all(row, ignore=[3]))) for row in rows[1:]]
+
+
+def _mirror_set_cells(row_number, changes):
+    """Apply one of our own cell writes ({column: value}, 1-based) to the mirror (lock must be held)"""
+    rows = _mirror['rows']
+    if rows is None or row_number > len(rows):
+        return
+    row = list(rows[row_number - 1])  # Rows are replaced, never mutated, so copies handed out stay consistent
+    for column, value in changes.items():
+        row[column - 1] = str(value)
+    rows[row_number - 1] = row
+    _refresh_checksums((row_number - 1) // SHEETS_SYNC_BLOCK_ROWS)
+
+
+def _rebuild_row_index():
+    """One full read of the sheet (also resyncs the mirror); returns the new index (lock must be held)"""
+    _full_resync()
+    return _row_index
+
+
+def _locate_row(phone, date, time_value):
+    """
+    Sheet row number of a confirmed reservation, or None (lock must be held)
+    The indexed row is verified with a single-row read; a stale or missing entry triggers one full rebuild
+    """
+    key = _row_key(phone, date, time_value)
+    
+    if _row_index is not None and key in _row_index:
+        row_number = _row_index[key]
+        if _row_matches(sheets_call(lambda sheet: sheet.row_values(row_number)), key):
+            row_index_stats['hits'] += 1
+            return row_number
+        row_index_stats['stale'] += 1
+        print(f"⚠️ Row index entry for {key} is stale (row {row_number}), rebuilding")
+    else:
+        row_index_stats['misses'] += 1
+        # Most misses are rows added since the last sync - try the cheap tail fetch first
+        sync_sheet()
+        if _row_index is not None and key in _row_index:
+            return _row_index[key]
+    
+    # The rebuild reads the rows themselves, so its entries need no further verification
+    return _rebuild_row_index().get(key)
+
+
+def _index_appended_rows(response, rows):
+    """Record freshly appended reservations at the rows reported by the append response (lock must be held)"""
+    global _row_index
+    updated_range = ((response or {}).get('updates') or {}).get('updatedRange', '')
+    match = re.search(r'![A-Z]+(\d+)', updated_range)
+    if match is None:
+        # Unknown placement - fall back to a rebuild on the next lookup (the next sync ingests the rows)
+        _row_index = None
+        return
+    
+    first_row = int(match.group(1))
+    rows = [_normalize_row(row) for row in rows]
+    mirror_rows = _mirror['rows']
+    if mirror_rows is not None and first_row == len(mirror_rows) + 1:
+        # Nobody else appended in between - extend the mirror directly; otherwise the next tail sync picks them up
+        mirror_rows.extend(rows)
+        _refresh_checksums((first_row - 1) // SHEETS_SYNC_BLOCK_ROWS)
+    _index_new_rows(first_row, rows)
+
+
+def _index_deleted_row(row_number):
+    """Drop a deleted row and shift every row below it up by one, like delete_rows does (lock must be held)"""
+    global _row_index
+    rows = _mirror['rows']
+    if rows is not None and row_number <= len(rows):
+        del rows[row_number - 1]
+        _refresh_checksums((row_number - 1) // SHEETS_SYNC_BLOCK_ROWS)
+    
+    if _row_index is None:
+        return
+    _row_index = {key: row - 1 if row > row_number else row
+                  for key, row in _row_index.items() if row != row_number}
+
+
+def _index_moved_reservation(old_key, new_key, row_number):
+    """Re-key a reservation whose phone/date/time changed (lock must be held)"""
+    if _row_index is None:
+        return
+    if _row_index.get(old_key) == row_number:
+        del _row_index[old_key]
+    if new_key is not None:
+        _row_index.setdefault(new_key, row_number)
+
+
+def get_sync_metrics():
+    """Sheet mirror sync counters for the /metrics endpoint"""
+    with _row_write_lock:
+        rows, synced_at = _mirror['rows'], _mirror['synced_at']
+        return dict(
+            sync_stats,
+            rows=len(rows) if rows is not None else None,
+            blocks=len(_mirror['checksums']),
+            # Seconds for one verify rotation: the least time an external edit of an older row can go unnoticed
+            verify_rotation_s=len(_mirror['checksums']) * SHEETS_SYNC_INTERVAL,
+            age=round(time.time() - synced_at, 1) if synced_at is not None else None
+        )
+
+
+def get_row_index_metrics():
+    """Row-location index counters for the /metrics endpoint"""
+    index = _row_index
+    return dict(row_index_stats, entries=len(index) if index is not None else None)
+
+
+class AppendQueue:
+    """
+    Write-behind queue for reservation rows: gathers rows from concurrent writers for up to
+    flush_ms or max_rows, writes them with ONE append_rows call and resolves each writer's future
+    once its row is durably in the sheet
+    """
+    
+    def __init__(self, flush_ms=500, max_rows=50, max_pending=500, history=1000):
+        self.flush_wait = flush_ms / 1000.0
+        self.max_rows = max_rows
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._flush_sizes = deque(maxlen=history)      # rows per append_rows call
+        self._flush_latencies = deque(maxlen=history)  # ms spent in each append_rows call
+        self._write_latencies = deque(maxlen=history)  # ms from enqueue to durable write, per row
+        self._totals = {'flushes': 0, 'rows': 0, 'errors': 0, 'rejected': 0}
         
-        # Append the new row to the spreadsheet
-        sheet.append_row(row_data)
+        self._thread = threading.Thread(target=self._run, name='sheets-append-queue')
+        self._thread.daemon = True
+        self._thread.start()
+    
+    def submit(self, row_data):
+        """Queue a row for the next flush; returns a Future resolving to True once written (raises queue.Full when full)"""
+        future = Future()
+        try:
+            self._queue.put_nowait((row_data, future, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self._totals['rejected'] += 1
+            raise
+        return future
+    
+    def _collect(self):
+        """Block for the first row, then gather more until the flush interval or row budget runs out"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.flush_wait
+        while len(batch) < self.max_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run(self):
+        """Worker loop: one append_rows per collected batch (at background quota priority)"""
+        with background_calls():
+            self._flush_forever()
+    
+    def _flush_forever(self):
+        while True:
+            batch = self._collect()
+            rows = [item[0] for item in batch]
+            started = time.perf_counter()
+            try:
+                # Not retried after transport errors - the rows may have landed
+                with _sheet_section(writes=1):
+                    response = sheets_call(lambda sheet: sheet.append_rows(rows), idempotent=False, write=True)
+                    _index_appended_rows(response, rows)
+            except Exception as e:
+                print(f"❌ Error appending {len(rows)} row(s) to Google Sheets: {e}")
+                finished = time.perf_counter()
+                with self._lock:
+                    self._totals['errors'] += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                finished = time.perf_counter()
+                print(f"✅ Appended {len(rows)} reservation row(s) to Google Sheets in one call")
+                for row_data, future, _ in batch:
+                    # Cache first, so a writer woken by its future already sees the reservation
+                    try:
+                        _cache_saved_row(row_data)
+                    except Exception as e:
+                        print(f"⚠️ Could not add an appended row to the reservation cache: {e}")
+                        invalidate_reservation_cache()
+                    if not future.done():
+                        future.set_result(True)
+                with self._lock:
+                    self._write_latencies.extend((finished - item[2]) * 1000 for item in batch)
+
+            with self._lock:
+                self._flush_sizes.append(len(rows))
+                self._flush_latencies.append((finished - started) * 1000)
+                self._totals['flushes'] += 1
+                self._totals['rows'] += len(rows)
+    
+    def get_metrics(self):
+        """Queue depth, flush size and latency statistics over the recent history"""
+        with self._lock:
+            sizes = list(self._flush_sizes)
+            flush_latencies = list(self._flush_latencies)
+            write_latencies = list(self._write_latencies)
+            metrics = dict(self._totals)
+        
+        metrics.update({
+            'flush_ms': self.flush_wait * 1000,
+            'max_rows': self.max_rows,
+            'depth': self._queue.qsize(),
+            'capacity': self._queue.maxsize,
+            'flush_size_mean': sum(sizes) / len(sizes) if sizes else 0.0,
+            'flush_latency_ms_p50': percentile(flush_latencies, 50),
+            'flush_latency_ms_p99': percentile(flush_latencies, 99),
+            'write_latency_ms_p50': percentile(write_latencies, 50),
+            'write_latency_ms_p99': percentile(write_latencies, 99)
+        })
+        return metrics
+
+
+# Coalescing write-behind queue for reservation appends (SHEETS_APPEND_QUEUE=1)
+append_queue = AppendQueue(SHEETS_APPEND_FLUSH_MS, SHEETS_APPEND_MAX_ROWS, SHEETS_APPEND_QUEUE_SIZE) if SHEETS_APPEND_QUEUE else None
+
+
+def get_append_queue_metrics():
+    """Append queue metrics (None when the queue is disabled)"""
+    return append_queue.get_metrics() if append_queue is not None else None
+
+
+def _reservation_row(reservation_data):
+    """Spreadsheet row for a new confirmed reservation"""
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    return [
+        timestamp,                      # Column A: Timestamp
+        reservation_data['name'],       # Column B: Customer name
+        canonical_phone(reservation_data['phone']) or reservation_data['phone'],  # Column C: Phone number (E.164)
+        reservation_data['email'],      # Column D: Email address
+        reservation_data['guests'],     # Column E: Number of guests
+        reservation_data['date'],       # Column F: Reservation date
+        reservation_data['time'],       # Column G: Reservation time
+        reservation_data['table'],      # Column H: Table assignment
+        'Confirmed'                     # Column I: Status
+    ]
+
+
+def _cache_saved_row(row_data):
+    """Write-through: a saved reservation is visible to lookups without re-reading the sheet"""
+    record = dict(zip(['Timestamp', 'Name', 'Phone', 'Email', 'Guests', 'Date', 'Time', 'Table', 'Status'], row_data))
+    key = canonical_phone(row_data[2])
+    # Skipped when the records already hold it (a refresh that downloaded the row after it was appended)
+    _cache_write_through(row_data[2], lambda records: records if any(
+        _matches_slot(existing, key, record['Date'], record['Time']) for existing in records) else records + [record])
+
+
+def queue_reservation_save(reservation_data):
+    """
+    Queue a reservation row on the coalescing append queue without waiting
+    Returns a Future resolving to True once the row is in the sheet (False/exception on failure)
+    Falls back to a direct append when the queue is disabled or full
+    """
+    row_data = _reservation_row(reservation_data)
+    
+    future = None
+    if append_queue is not None:
+        try:
+            future = append_queue.submit(row_data)
+        except queue.Full:
+            print("⚠️ Sheets append queue full, appending directly")
+    
+    if future is None:
+        future = Future()
+        try:
+            # Not retried after transport errors - it may have landed
+            with _sheet_section(writes=1):
+                response = sheets_call(lambda sheet: sheet.append_row(row_data), idempotent=False, write=True)
+                _index_appended_rows(response, [row_data])
+            _cache_saved_row(row_data)
+            future.set_result(True)
+        except Exception as e:
+            future.set_exception(e)
+    
+    return future
+
+
+def save_reservation_to_sheets(reservation_data, language_code='en'):
+    """Save reservation data to Google Sheets with multilingual support (returns once the row is written)"""
+    try:
+        # Coalesced with concurrent saves into one append_rows call
+        queue_reservation_save(reservation_data).result(timeout=60)
         print(f"✅ Reservation saved to Google Sheets: {reservation_data['name']}")
         return True
         
+    except FuturesTimeoutError:
+        print(f"❌ Timed out waiting for the Google Sheets write: {reservation_data['name']}")
+        return False
     except Exception as e:
         print(f"❌ Error saving to Google Sheets: {e}")
         return False
 
 
 def get_reservations_from_sheets():
-    """Retrieve all reservations from the spreadsheet"""
+    """Retrieve all reservations from the spreadsheet (served from the incrementally synced local mirror)"""
     try:
-        # Initialize connection to Google Sheets
-        sheet = init_google_sheets()
-        if not sheet:
-            return []
-        
-        # Get all records (skipping the header row)
-        records = sheet.get_all_records()
-        return records
+        # All records (skipping the header row)
+        return _mirror_records(_synced_rows())
         
     except Exception as e:
         print(f"❌ Error reading from Google Sheets: {e}")
@@ -119,16 +1035,14 @@ def get_reservations_from_sheets():
 def check_existing_reservation(name, phone, date, time):
     """Check if an identical reservation already exists"""
     try:
-        # Get all existing reservations
-        reservations = get_reservations_from_sheets()
+        # Confirmed reservations of this phone number (phone-indexed cache)
+        reservations = _cached_reservations(phone)
         
         # Check for duplicate reservations
         for reservation in reservations:
-            if (reservation.get('Name', '').lower() == name.lower() and
-                reservation.get('Phone', '') == phone and
-                reservation.get('Date', '') == date and
-                reservation.get('Time', '') == time and
-                reservation.get('Status', '') == 'Confirmed'):
+            if (str(reservation.get('Name', '')).lower() == name.lower() and
+                str(reservation.get('Date', '')) == date and
+                str(reservation.get('Time', '')) == time):
                 return True
         return False
         
@@ -140,58 +1054,15 @@ def check_existing_reservation(name, phone, date, time):
 def get_user_reservations(phone_number, language_code='en'):
     """Retrieve all active reservations for a user by phone number with multilingual support"""
     try:
-        # Get all reservations from the spreadsheet with error handling
-        reservations = []
+        print(f"🔧 DEBUG - Looking for phone: '{phone_number}' (type: {type(phone_number)})")
+        
+        # Single dict lookup in the phone-indexed cache (the sheet is only read on a miss)
         try:
-            reservations = get_reservations_from_sheets()
-            if reservations is None:
-                print("❌ get_reservations_from_sheets returned None")
-                return []
+            user_reservations = _cached_reservations(phone_number)
         except Exception as e:
             print(f"❌ Failed to get reservations from sheets: {e}")
             return []
         
-        print(f"🔧 DEBUG - Total reservations in sheet: {len(reservations)}")
-        print(f"🔧 DEBUG - Looking for phone: '{phone_number}' (type: {type(phone_number)})")
-        
-        # Only print detailed debug info for first few reservations to avoid spam
-        for i, reservation in enumerate(reservations[:3]):  # Only first 3 for debug
-            print(f"🔧 DEBUG - Reservation {i+1}:")
-            print(f"    Name: '{reservation.get('Name', '')}' (type: {type(reservation.get('Name', ''))})")
-            print(f"    Phone: '{reservation.get('Phone', '')}' (type: {type(reservation.get('Phone', ''))})")
-            print(f"    Status: '{reservation.get('Status', '')}' (type: {type(reservation.get('Status', ''))})")
-            print(f"    Date: '{reservation.get('Date', '')}' (type: {type(reservation.get('Date', ''))})")
-            print(f"    All keys: {list(reservation.keys())}")
-        
-        if len(reservations) > 3:
-            print(f"🔧 DEBUG - ... and {len(reservations) - 3} more reservations")
-        
-        # Filter reservations for the specific user
-        user_reservations = []
-        
-        for reservation in reservations:
-            try:
-                # Convert to string and strip whitespace for comparison
-                phone_in_sheet = str(reservation.get('Phone', '')).strip()
-                status_in_sheet = str(reservation.get('Status', '')).strip()
-                phone_to_find = str(phone_number).strip()
-                
-                # Enhanced phone number matching (remove common formatting)
-                phone_in_sheet_clean = phone_in_sheet.replace('-', '').replace('(', '').replace(')', '').replace(' ', '')
-                phone_to_find_clean = phone_to_find.replace('-', '').replace('(', '').replace(')', '').replace(' ', '')
-                
-                phone_match = (phone_in_sheet == phone_to_find or 
-                             phone_in_sheet_clean == phone_to_find_clean)
-                status_match = status_in_sheet == 'Confirmed'
-                
-                if phone_match and status_match:
-                    user_reservations.append(reservation)
-                    print(f"✅ MATCH FOUND for phone {phone_number}")
-                
-            except Exception as e:
-                print(f"❌ Error processing reservation: {e}")
-                continue
-        
         print(f"🔧 DEBUG - Found {len(user_reservations)} matching reservations")
         return user_reservations
         
@@ -202,82 +1073,78 @@ def get_user_reservations(phone_number, language_code='en'):
         return []
 
 
-def update_reservation_field(phone, old_date, old_time, field, new_value, language_code='en'):
-    """Update a specific field of a reservation with multilingual support"""
+# Map field names to column numbers (1-based for Google Sheets API)
+RESERVATION_FIELD_COLUMNS = {
+    'guests': 5,  # Column E
+    'date': 6,    # Column F
+    'time': 7,    # Column G
+    'table': 8    # Column H
+}
+
+
+def update_reservation_fields(phone, old_date, old_time, updates, language_code='en'):
+    """
+    Update several fields of one reservation at once, e.g. {'date': ..., 'table': ...}
+    The row is located with a single read and every changed cell is written in ONE batch_update,
+    so the reservation is never left half-updated
+    """
     try:
-        # Initialize connection to Google Sheets
-        sheet = init_google_sheets()
-        if not sheet:
+        unknown = [field for field in updates if field not in RESERVATION_FIELD_COLUMNS]
+        if unknown or not updates:
+            print(f"❌ Cannot update reservation fields: {unknown or 'nothing to update'}")
             return False
         
-        # Get all spreadsheet data
-        all_values = sheet.get_all_values()
-        
-        # Find the row to update by matching phone, date, time, and status
-        for i, row in enumerate(all_values):
-            if (len(row) >= 9 and 
-                row[2].strip() == str(phone).strip() and  # Phone column (C)
-                row[5].strip() == str(old_date).strip() and   # Date column (F)
-                row[6].strip() == str(old_time).strip() and   # Time column (G)
-                row[8].strip() == 'Confirmed'):           # Status column (I)
-                
-                # Map field names to column numbers (1-based for Google Sheets API)
-                field_to_column = {
-                    'date': 6,    # Column F
-                    'time': 7,    # Column G  
-                    'guests': 5,  # Column E
-                    'table': 8    # Column H
-                }
-                
-                # Update the specific field if it exists in the mapping
-                if field in field_to_column:
-                    column_num = field_to_column[field]
-                    sheet.update_cell(i + 1, column_num, new_value)
-                    print(f"✅ Updated {field} to '{new_value}' for reservation {phone}")
-                    return True
+        with _sheet_section(reads=1, writes=1):
+            # Find the row by phone, date, time and status (row index, verified with a single-row read)
+            row_number = _locate_row(phone, old_date, old_time)
+            if row_number is None:
+                print(f"❌ Reservation not found for update: phone {phone}")
+                return False
+            
+            # One range per changed cell, written together (user-entered, like update_cell)
+            data = [{'range': rowcol_to_a1(row_number, RESERVATION_FIELD_COLUMNS[field]), 'values': [[value]]}
+                    for field, value in updates.items()]
+            sheets_call(lambda sheet: sheet.batch_update(data, raw=False), write=True)
+            _mirror_set_cells(row_number, {RESERVATION_FIELD_COLUMNS[field]: value for field, value in updates.items()})
+            _index_moved_reservation(_row_key(phone, old_date, old_time),
+                                     _row_key(phone, updates.get('date', old_date), updates.get('time', old_time)),
+                                     row_number)
         
-        print(f"❌ Reservation not found for update: phone {phone}")
-        return False
+        print(f"✅ Updated {', '.join(f'{field}={value!r}' for field, value in updates.items())} for reservation {phone}")
+        _cache_update_reservation(phone, old_date, old_time,
+                                  {field.capitalize(): value for field, value in updates.items()})
+        return True
         
     except Exception as e:
-        print(f"❌ Error updating reservation field: {e}")
+        print(f"❌ Error updating reservation fields: {e}")
         import traceback
         print(f"❌ TRACEBACK: {traceback.format_exc()}")
         return False
 
 
+def update_reservation_field(phone, old_date, old_time, field, new_value, language_code='en'):
+    """Update a specific field of a reservation with multilingual support"""
+    return update_reservation_fields(phone, old_date, old_time, {field: new_value}, language_code)
+
+
 def delete_reservation_from_sheets(phone, date, time, language_code='en'):
     """Completely delete a reservation from Google Sheets with multilingual support"""
     try:
-        # Initialize connection to Google Sheets
-        sheet = init_google_sheets()
-        if not sheet:
-            return False
-        
-        # Get all spreadsheet data
-        all_values = sheet.get_all_values()
-        
-        # Find the row to delete by matching phone, date, time, and status
-        row_to_delete = None
-        for i, row in enumerate(all_values):
-            if (len(row) >= 9 and 
-                row[2].strip() == str(phone).strip() and  # Phone column (C)
-                row[5].strip() == str(date).strip() and   # Date column (F)
-                row[6].strip() == str(time).strip() and   # Time column (G)
-                row[8].strip() == 'Confirmed'):           # Status column (I)
-                
-                row_to_delete = i + 1  # Google Sheets uses 1-based indexing
-                print(f"🔧 DEBUG - Found reservation to delete at row {row_to_delete}")
-                break
+        with _sheet_section(reads=1, writes=1):
+            # Find the row by phone, date, time and status (row index, verified with a single-row read)
+            row_to_delete = _locate_row(phone, date, time)
+            if row_to_delete is None:
+                print(f"❌ Reservation not found for deletion: phone {phone}")
+                return False
+            print(f"🔧 DEBUG - Found reservation to delete at row {row_to_delete}")
+            
+            # Delete the entire row; rows below it move up by one
+            sheets_call(lambda sheet: sheet.delete_rows(row_to_delete), idempotent=False, write=True)
+            _index_deleted_row(row_to_delete)
         
-        if row_to_delete:
-            # Delete the entire row
-            sheet.delete_rows(row_to_delete)
-            print(f"✅ Reservation deleted from Google Sheets: phone {phone}, row {row_to_delete}")
-            return True
-        else:
-            print(f"❌ Reservation not found for deletion: phone {phone}")
-            return False
+        print(f"✅ Reservation deleted from Google Sheets: phone {phone}, row {row_to_delete}")
+        _cache_remove_reservation(phone, date, time)
+        return True
         
     except Exception as e:
         print(f"❌ Error deleting reservation from sheets: {e}")
@@ -289,29 +1156,23 @@ def delete_reservation_from_sheets(phone, date, time, language_code='en'):
 def update_reservation_status(phone, date, time, new_status, language_code='en'):
     """Update the status of a specific reservation with multilingual support"""
     try:
-        # Initialize connection to Google Sheets
-        sheet = init_google_sheets()
-        if not sheet:
-            return False
-        
-        # Get all spreadsheet data
-        all_values = sheet.get_all_values()
-        
-        # Find the row to update by matching phone, date, time, and current status
-        for i, row in enumerate(all_values):
-            if (len(row) >= 9 and 
-                row[2].strip() == str(phone).strip() and  # Phone column (C)
-                row[5].strip() == str(date).strip() and   # Date column (F)
-                row[6].strip() == str(time).strip() and   # Time column (G)
-                row[8].strip() == 'Confirmed'):           # Status column (I)
-                
-                # Update the status (column 9, index 8 in 0-based, but API uses 1-based)
-                sheet.update_cell(i + 1, 9, new_status)
-                print(f"✅ Reservation status updated to '{new_status}' for {phone}")
-                return True
+        with _sheet_section(reads=1, writes=1):
+            # Find the row by phone, date, time and current status (row index, verified with a single-row read)
+            row_number = _locate_row(phone, date, time)
+            if row_number is None:
+                print(f"❌ Reservation not found for phone {phone}")
+                return False
+            
+            # Update the status (column 9, index 8 in 0-based, but API uses 1-based)
+            sheets_call(lambda sheet: sheet.update_cell(row_number, 9, new_status), write=True)
+            _mirror_set_cells(row_number, {9: new_status})
+            if new_status != 'Confirmed':
+                _index_moved_reservation(_row_key(phone, date, time), None, row_number)
         
-        print(f"❌ Reservation not found for phone {phone}")
-        return False
+        print(f"✅ Reservation status updated to '{new_status}' for {phone}")
+        if new_status != 'Confirmed':
+            _cache_remove_reservation(phone, date, time)
+        return True
         
     except Exception as e:
         print(f"❌ Error updating reservation status: {e}")
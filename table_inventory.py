@@ -0,0 +1,136 @@
+"""
+Restaurant table inventory (floor plan) indexed by capacity
+Loaded once from config so availability and allocation never hard-code table numbers or scan the floor plan
+"""
+import json
+import threading
+from bisect import bisect_left
+
+from config import TABLE_INVENTORY, TABLE_INVENTORY_FILE
+
+# Active inventory - one dict replaced atomically by load_inventory()
+# Keys: tables ({table: entry}), table_numbers (sorted tuple), capacities (sorted distinct capacities),
+# groups (tuple of (capacity, tables) in ascending capacity), fitting (tables seating >= capacities[i], per i)
+inventory = None
+_load_lock = threading.Lock()
+
+
+def _validate_entries(entries):
+    """Normalize inventory entries; raises ValueError on an invalid floor plan"""
+    tables = {}
+    for entry in entries:
+        table = int(entry['table'])
+        capacity = int(entry['capacity'])
+        if table < 1:
+            raise ValueError(f"invalid table number {table}")
+        if capacity < 1:
+            raise ValueError(f"invalid capacity {capacity} for table {table}")
+        if table in tables:
+            raise ValueError(f"duplicate table number {table}")
+        tables[table] = {
+            'table': table,
+            'capacity': capacity,
+            'zone': str(entry.get('zone', 'main')),
+            'combinable': bool(entry.get('combinable', False))
+        }
+    if not tables:
+        raise ValueError("table inventory is empty")
+    return tables
+
+
+def build_inventory(entries):
+    """Build the capacity index for a list of {'table', 'capacity', 'zone', 'combinable'} entries"""
+    tables = _validate_entries(entries)
+
+    by_capacity = {}
+    for table in sorted(tables):
+        by_capacity.setdefault(tables[table]['capacity'], []).append(table)
+    capacities = sorted(by_capacity)
+    groups = tuple((capacity, tuple(by_capacity[capacity])) for capacity in capacities)
+
+    # Precomputed suffixes: fitting[i] = every table seating at least capacities[i] guests
+    fitting = tuple(tuple(table for _, group in groups[i:] for table in group) for i in range(len(groups)))
+
+    return {
+        'tables': tables,
+        'table_numbers': tuple(sorted(tables)),
+        'capacities': capacities,
+        'groups': groups,
+        'fitting': fitting
+    }
+
+
+def load_inventory(entries=None):
+    """Load the floor plan (explicit entries, TABLE_INVENTORY_FILE or config.TABLE_INVENTORY) and install it"""
+    global inventory
+
+    with _load_lock:
+        if entries is None and TABLE_INVENTORY_FILE:
+            try:
+                with open(TABLE_INVENTORY_FILE) as f:
+                    entries = json.load(f)
+                print(f"✅ Table inventory loaded from {TABLE_INVENTORY_FILE}")
+            except Exception as e:
+                print(f"❌ Error loading table inventory file {TABLE_INVENTORY_FILE}: {e}")
+                print("🔧 DEBUG - Using the table inventory from config")
+
+        inventory = build_inventory(entries if entries is not None else TABLE_INVENTORY)
+        print(f"🔧 DEBUG - Table inventory: {len(inventory['tables'])} tables, capacities {inventory['capacities']}")
+        return inventory
+
+
+def get_table(table_number):
+    """Inventory entry of a table, or None when the table does not exist"""
+    return inventory['tables'].get(table_number)
+
+
+def is_valid_table(table_number):
+    """True when the table exists in the floor plan"""
+    return table_number in inventory['tables']
+
+
+def table_numbers():
+    """All table numbers in ascending order"""
+    return inventory['table_numbers']
+
+
+def max_table_number():
+    """Highest table number in the floor plan"""
+    return inventory['table_numbers'][-1]
+
+
+def max_party_size():
+    """Largest party a single table can seat"""
+    return inventory['capacities'][-1]
+
+
+def capacity_groups(guest_count):
+    """(capacity, tables) groups that fit the party, smallest capacity first"""
+    current = inventory
+    index = bisect_left(current['capacities'], guest_count)
+    return current['groups'][index:]
+
+
+def tables_for_party(guest_count):
+    """Every table that seats the party (ascending capacity, then table number)"""
+    current = inventory
+    index = bisect_left(current['capacities'], guest_count)
+    return current['fitting'][index] if index < len(current['fitting']) else ()
+
+
+def get_inventory_summary():
+    """Floor plan summary for status endpoints"""
+    current = inventory
+    zones = {}
+    for entry in current['tables'].values():
+        zones[entry['zone']] = zones.get(entry['zone'], 0) + 1
+    return {
+        'tables': len(current['tables']),
+        'capacities': {capacity: len(group) for capacity, group in current['groups']},
+        'zones': zones,
+        'combinable': sum(1 for entry in current['tables'].values() if entry['combinable'])
+    }
+
+
+# Load the floor plan on import
+load_inventory()
@@ -0,0 +1,16 @@
+"""
+Shared test setup: the repository modules are flat files in the root, and the in-memory worksheet
+lives in benchmarks/. Journal and database files go to a temporary directory (config reads them on import).
+"""
+import os
+import sys
+import tempfile
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(TESTS_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.join(REPO_ROOT, 'benchmarks'))
+
+_workdir = tempfile.mkdtemp(prefix='restaurant-tests-')
+os.environ.setdefault('OUTBOX_DB_PATH', os.path.join(_workdir, 'outbox.db'))
+os.environ.setdefault('RESERVATION_DB_PATH', os.path.join(_workdir, 'reservations.db'))
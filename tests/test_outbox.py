@@ -0,0 +1,100 @@
+"""Outbox journal: lease claiming across processes, lease expiry, dead entries and idempotent retries"""
+import threading
+import time
+
+import pytest
+
+import outbox
+from outbox import Outbox
+
+RESERVATION = {'name': 'Ana Perera', 'phone': '+94771234567', 'date': 'Friday, October 23, 2026', 'time': '7:00 PM'}
+
+
+def _wait_for(condition, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def _rows(box):
+    with box._lock:
+        return box._conn.execute('SELECT id, status, attempts, last_error FROM outbox ORDER BY id').fetchall()
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return str(tmp_path / 'outbox.db')
+
+
+def test_two_outboxes_on_one_journal_run_each_entry_once(journal, monkeypatch):
+    runs = []
+    runs_lock = threading.Lock()
+
+    def handler(payload, language_code, attempt):
+        time.sleep(0.002)
+        with runs_lock:
+            runs.append(payload['n'])
+        return True
+    monkeypatch.setitem(outbox.HANDLERS, 'test_effect', handler)
+
+    # Two processes (e.g. gunicorn workers) sharing the journal file
+    first, second = Outbox(journal, workers=4), Outbox(journal, workers=4)
+    first.record([('test_effect', {'n': n}) for n in range(100)])
+    first.start()
+    second.start()
+
+    assert _wait_for(lambda: not _rows(first))
+    assert sorted(runs) == list(range(100))
+    assert first.get_metrics()['delivered'] + second.get_metrics()['delivered'] == 100
+
+
+def test_expired_lease_returns_entry_to_pending(journal, monkeypatch):
+    monkeypatch.setitem(outbox.HANDLERS, 'test_effect', lambda payload, language_code, attempt: True)
+    box = Outbox(journal, lease_seconds=0.01)
+    box.record([('test_effect', {})])
+
+    # Claimed but never run, as if the process died mid-run
+    claimed, _ = box._claim_due_entries()
+    assert len(claimed) == 1
+    assert _rows(box)[0][1] == 'in_flight'
+
+    time.sleep(0.02)
+    with box._lock:
+        assert box._expire_leases() == 1
+    entry_id, status, attempts, last_error = _rows(box)[0]
+    assert (status, attempts, last_error) == ('pending', 1, 'lease expired')
+
+
+def test_entry_goes_dead_after_max_attempts(journal, monkeypatch):
+    attempts_seen = []
+
+    def failing_handler(payload, language_code, attempt):
+        attempts_seen.append(attempt)
+        return False
+    monkeypatch.setitem(outbox.HANDLERS, 'test_effect', failing_handler)
+
+    box = Outbox(journal, workers=1, max_attempts=3, backoff_base=0.01, backoff_max=0.01)
+    box.record([('test_effect', {})])
+    box.start()
+
+    assert _wait_for(lambda: _rows(box)[0][1] == 'dead')
+    assert _rows(box)[0][1:] == ('dead', 3, 'handler reported failure')
+    assert attempts_seen == [0, 1, 2]
+    assert box.get_metrics()['dead_entries'] == 1
+
+
+def test_retried_save_skips_a_reservation_already_stored(monkeypatch):
+    saved = []
+    monkeypatch.setattr(outbox.reservation_storage, 'check_existing_reservation', lambda *args: True)
+    monkeypatch.setattr(outbox.reservation_storage, 'save_reservation',
+                        lambda payload, language_code: saved.append(payload) or True)
+
+    assert outbox._save_reservation(RESERVATION, 'en', attempt=1)
+    assert saved == []
+
+    # The first attempt writes without checking
+    assert outbox._save_reservation(RESERVATION, 'en', attempt=0)
+    assert saved == [RESERVATION]
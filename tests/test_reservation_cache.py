@@ -0,0 +1,71 @@
+"""Phone-indexed reservation cache in sheets_manager: write-throughs racing with a refresh"""
+import pytest
+
+import sheets_manager
+from fake_sheets import HEADER, FakeWorksheet, install
+
+PHONE = '0771234567'
+
+
+def _row(name, phone, date, time_value, table):
+    return ['2026-10-01 10:00:00', name, phone, f'{name.lower()}@example.com', '2', date, time_value, str(table), 'Confirmed']
+
+
+@pytest.fixture
+def sheet():
+    worksheet = install(FakeWorksheet([HEADER, _row('Ana', '+94771234567', 'Friday, October 23, 2026', '7:00 PM', 3)]))
+    yield worksheet
+    sheets_manager.invalidate_reservation_cache()
+
+
+def _refresh_with_racing_write(monkeypatch, write):
+    """Make the next cache refresh run write() after its download and before the index is installed"""
+    download = sheets_manager._fetch_all_records
+
+    def racing_download():
+        records = download()
+        write()
+        return records
+    monkeypatch.setattr(sheets_manager, '_fetch_all_records', racing_download)
+
+
+def test_write_through_during_refresh_is_kept(sheet, monkeypatch):
+    new_row = _row('Ana', '+94771234567', 'Saturday, October 24, 2026', '8:00 PM', 5)
+    _refresh_with_racing_write(monkeypatch, lambda: sheets_manager._cache_saved_row(new_row))
+
+    reservations = sheets_manager.get_user_reservations(PHONE)
+
+    assert sorted(r['Date'] for r in reservations) == ['Friday, October 23, 2026', 'Saturday, October 24, 2026']
+    # The refresh is trusted: the next lookup is a hit that still sees the write
+    hits = sheets_manager.reservation_cache_stats['hits']
+    assert len(sheets_manager.get_user_reservations(PHONE)) == 2
+    assert sheets_manager.reservation_cache_stats['hits'] == hits + 1
+
+
+def test_update_and_removal_during_refresh_are_kept(sheet, monkeypatch):
+    def write():
+        sheets_manager._cache_update_reservation(PHONE, 'Friday, October 23, 2026', '7:00 PM', {'Table': 9})
+
+    _refresh_with_racing_write(monkeypatch, write)
+    assert [r['Table'] for r in sheets_manager.get_user_reservations(PHONE)] == [9]
+
+    sheets_manager.invalidate_reservation_cache()
+    _refresh_with_racing_write(monkeypatch, lambda: sheets_manager._cache_remove_reservation(
+        PHONE, 'Friday, October 23, 2026', '7:00 PM'))
+    assert sheets_manager.get_user_reservations(PHONE) == []
+
+
+def test_replayed_save_does_not_duplicate_a_downloaded_row(sheet, monkeypatch):
+    # The row reached the sheet before the download, so the refresh already contains it
+    existing = sheet.rows[1]
+    _refresh_with_racing_write(monkeypatch, lambda: sheets_manager._cache_saved_row(existing))
+
+    assert len(sheets_manager.get_user_reservations(PHONE)) == 1
+
+
+def test_invalidation_during_refresh_is_not_trusted(sheet, monkeypatch):
+    _refresh_with_racing_write(monkeypatch, sheets_manager.invalidate_reservation_cache)
+
+    sheets_manager.get_user_reservations(PHONE)
+
+    assert sheets_manager.get_reservation_cache_metrics()['age'] is None
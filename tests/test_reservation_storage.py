@@ -0,0 +1,86 @@
+"""Reservation storage backends: same behaviour through the ReservationStorage interface"""
+import sqlite3
+
+import pytest
+
+import reservation_storage
+import sheets_manager
+from fake_sheets import HEADER, FakeWorksheet, install
+from reservation_storage import ReservationStorage, SheetsStorage, SQLiteStorage
+
+DATE = 'Friday, October 23, 2026'
+RESERVATION = {'name': 'Ana Perera', 'phone': '077 123 4567', 'email': 'ana@example.com',
+               'guests': 4, 'date': DATE, 'time': '7:00 PM', 'table': 3}
+
+
+@pytest.fixture
+def sheets_backend(monkeypatch):
+    install(FakeWorksheet([HEADER]))
+    for name in ('read', 'write'):
+        monkeypatch.setitem(sheets_manager.quota_buckets, name, sheets_manager.QuotaBucket(name, 60000, 100))
+    yield SheetsStorage()
+    sheets_manager.invalidate_reservation_cache()
+
+
+@pytest.fixture(params=['sqlite', 'sheets'])
+def backend(request):
+    if request.param == 'sqlite':
+        return SQLiteStorage(':memory:')
+    return request.getfixturevalue('sheets_backend')
+
+
+def test_incomplete_backend_cannot_be_instantiated():
+    class PartialStorage(ReservationStorage):
+        def save(self, reservation_data):
+            return True
+
+    with pytest.raises(TypeError):
+        PartialStorage()
+
+
+def test_reservation_lifecycle(backend):
+    assert backend.save(dict(RESERVATION))
+    # Any spelling of the phone number finds the reservation
+    assert backend.exists('ana perera', '+94771234567', DATE, '7:00 PM')
+    assert not backend.exists('Ana Perera', '0771234567', DATE, '8:00 PM')
+
+    found = backend.find_by_phone('0771234567')
+    assert len(found) == 1
+    assert found[0]['Name'] == 'Ana Perera'
+    assert found[0]['Phone'] == '+94771234567'
+    assert str(found[0]['Table']) == '3'
+
+    assert backend.update_fields('+94 77 123 4567', DATE, '7:00 PM', {'time': '8:00 PM', 'guests': 2})
+    found = backend.find_by_phone('0771234567')
+    assert [(record['Time'], str(record['Guests'])) for record in found] == [('8:00 PM', '2')]
+    assert not backend.update_fields('0771234567', DATE, '7:00 PM', {'guests': 3})
+
+    assert backend.delete('0771234567', DATE, '8:00 PM')
+    assert backend.find_by_phone('0771234567') == []
+    assert not backend.delete('0771234567', DATE, '8:00 PM')
+
+
+def test_phone_key_migration(tmp_path):
+    # A database written before phone numbers were canonicalized: raw phone keys, user_version 0
+    path = str(tmp_path / 'reservations.db')
+    conn = sqlite3.connect(path)
+    SQLiteStorage(path)._conn.close()
+    conn.execute('PRAGMA user_version = 0')
+    conn.execute("INSERT INTO reservations (timestamp, name, phone, phone_key, email, guests, date, time, table_number, status) "
+                 "VALUES ('2026-10-01 10:00:00', 'Ana', '077-123-4567', '0771234567', '', 2, ?, '7:00 PM', 3, 'Confirmed')",
+                 (DATE,))
+    conn.commit()
+    conn.close()
+
+    storage = SQLiteStorage(path)
+
+    assert [record['Name'] for record in storage.find_by_phone('+94771234567')] == ['Ana']
+    assert storage._conn.execute('PRAGMA user_version').fetchone()[0] == SQLiteStorage.PHONE_KEY_VERSION
+
+
+def test_set_storage_accepts_an_instance(monkeypatch):
+    monkeypatch.setattr(reservation_storage, 'storage', reservation_storage.storage)
+    backend = SQLiteStorage(':memory:')
+    assert reservation_storage.set_storage(backend) is backend
+    assert reservation_storage.save_reservation(dict(RESERVATION))
+    assert reservation_storage.check_existing_reservation('Ana Perera', '0771234567', DATE, '7:00 PM')
@@ -0,0 +1,59 @@
+"""Google Sheets quota buckets: interactive deadlines, returned tokens and background progress"""
+import threading
+import time
+
+import pytest
+
+import sheets_manager
+from sheets_manager import PRIORITY_BACKGROUND, QuotaBucket
+
+
+@pytest.fixture
+def empty_write_bucket(monkeypatch):
+    """Reads plentiful (2 tokens), writes drained: the next write token arrives after one second"""
+    read_bucket, write_bucket = QuotaBucket('read', 60, 2), QuotaBucket('write', 60, 1)
+    assert write_bucket.acquire(PRIORITY_BACKGROUND)
+    monkeypatch.setitem(sheets_manager.quota_buckets, 'read', read_bucket)
+    monkeypatch.setitem(sheets_manager.quota_buckets, 'write', write_bucket)
+    monkeypatch.setattr(sheets_manager, 'SHEETS_INTERACTIVE_MAX_WAIT', 0.2)
+    return read_bucket, write_bucket
+
+
+def test_interactive_section_times_out_and_returns_its_tokens(empty_write_bucket):
+    read_bucket, write_bucket = empty_write_bucket
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        with sheets_manager._sheet_section(reads=1, writes=1):
+            pytest.fail('section entered without a write token')
+    assert time.monotonic() - started < 0.5
+
+    # The read token reserved before the write wait is back in the bucket
+    assert read_bucket.get_metrics()['tokens'] == pytest.approx(2, abs=0.05)
+    assert write_bucket.get_metrics()['timeouts'] == 1
+    # Neither the lock nor the reservation is left behind
+    assert sheets_manager._row_write_lock.acquire(blocking=False)
+    sheets_manager._row_write_lock.release()
+    assert getattr(sheets_manager._call_context, 'reserved', None) is None
+
+
+def test_queued_background_call_is_not_starved_by_interactive_timeouts(empty_write_bucket):
+    _, write_bucket = empty_write_bucket
+    granted = threading.Event()
+
+    def background_write():
+        if write_bucket.acquire(PRIORITY_BACKGROUND):
+            granted.set()
+
+    worker = threading.Thread(target=background_write, daemon=True)
+    worker.start()
+    time.sleep(0.05)  # Queued before the interactive caller, which then goes first in line
+
+    with pytest.raises(TimeoutError):
+        with sheets_manager._sheet_section(writes=1):
+            pass
+    assert not granted.is_set()
+
+    # Once the interactive caller gives up, the background call takes the next token
+    assert granted.wait(2.0)
+    assert write_bucket.get_metrics()['background_waiting'] == 0